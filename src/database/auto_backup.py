@@ -0,0 +1,136 @@
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from tools.utils import Utils
+from database.backup import BackupEngine
+
+
+# Kept apart from the manual backups in `backups/`, so rotation never touches those.
+AUTO_BACKUP_DIR = os.getenv("AUTO_BACKUP_DIR", os.path.join("backups", "auto"))
+AUTO_BACKUP_INTERVAL = float(os.getenv("AUTO_BACKUP_INTERVAL", str(24 * 60 * 60)))
+AUTO_BACKUP_POLL = float(os.getenv("AUTO_BACKUP_POLL", "300"))
+AUTO_BACKUP_KEEP_HOURLY = int(os.getenv("AUTO_BACKUP_KEEP_HOURLY", "24"))
+AUTO_BACKUP_KEEP_DAILY = int(os.getenv("AUTO_BACKUP_KEEP_DAILY", "7"))
+AUTO_BACKUP_KEEP_WEEKLY = int(os.getenv("AUTO_BACKUP_KEEP_WEEKLY", "4"))
+AUTO_BACKUP_MAX_BYTES = int(os.getenv("AUTO_BACKUP_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+
+def select_retained(backups: List[Dict], hourly: int, daily: int, weekly: int) -> List[Dict]:
+    """
+    Grandfather-father-son rotation: keep the newest backup of each of the latest
+    `hourly` hours, `daily` days and `weekly` ISO weeks. The newest backup is always kept.
+    `backups` must be sorted newest first; the result keeps that order.
+    """
+    keep = set()
+    if backups:
+        keep.add(backups[0]["name"])
+
+    for limit, bucket_of in (
+        (hourly, lambda created: created.strftime("%Y-%m-%d %H")),
+        (daily, lambda created: created.strftime("%Y-%m-%d")),
+        (weekly, lambda created: "%d-W%02d" % created.isocalendar()[:2]),
+    ):
+        seen = set()
+        for backup in backups:
+            bucket = bucket_of(datetime.fromisoformat(backup["created_at"]))
+            if bucket in seen:
+                continue
+            if len(seen) >= limit:
+                break
+            seen.add(bucket)
+            keep.add(backup["name"])
+
+    return [backup for backup in backups if backup["name"] in keep]
+
+
+class AutoBackupService:
+    """
+    Honours the `auto_backup` app setting: while enabled, takes a backup on a
+    background thread once per `interval`, then applies the rotation policy and
+    the total size cap. Settings are re-read on every poll, so toggling the
+    option in Settings takes effect without a restart.
+    """
+
+    def __init__(self, backup_dir: str = AUTO_BACKUP_DIR, interval: float = AUTO_BACKUP_INTERVAL,
+                 poll: float = AUTO_BACKUP_POLL, keep_hourly: int = AUTO_BACKUP_KEEP_HOURLY,
+                 keep_daily: int = AUTO_BACKUP_KEEP_DAILY, keep_weekly: int = AUTO_BACKUP_KEEP_WEEKLY,
+                 max_bytes: int = AUTO_BACKUP_MAX_BYTES):
+        self.engine = BackupEngine(backup_dir)
+        self.interval = interval
+        self.poll = poll
+        self.keep_hourly = keep_hourly
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+        self.max_bytes = max_bytes
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._run_lock = threading.Lock()
+
+    def start(self):
+        """Start the background thread (no-op if already running)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="auto-backup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while True:
+            try:
+                if self._is_enabled() and self._is_due():
+                    self.run()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Automatic backup failed: {e}")
+            if self._stop.wait(self.poll):
+                return
+
+    def _is_enabled(self) -> bool:
+        return bool(Utils.load_app_settings().get("auto_backup", False))
+
+    def _is_due(self) -> bool:
+        backups = self.engine.list_backups()
+        if not backups:
+            return True
+        newest = datetime.fromisoformat(backups[0]["created_at"])
+        return (datetime.now() - newest).total_seconds() >= self.interval
+
+    def run(self) -> Optional[Dict]:
+        """Take one backup and apply retention. Returns None if a run is already in progress."""
+        if not self._run_lock.acquire(blocking=False):
+            return None
+        try:
+            manifest = self.engine.create_backup(compress=True, verify=True)
+            self.apply_retention()
+            self.last_error = None
+            return manifest
+        finally:
+            self._run_lock.release()
+
+    def apply_retention(self) -> int:
+        """Delete backups outside the rotation policy, then the oldest until under `max_bytes`. Returns backups removed."""
+        backups = self.engine.list_backups()
+        retained = select_retained(backups, self.keep_hourly, self.keep_daily, self.keep_weekly)
+        retained_names = {backup["name"] for backup in retained}
+
+        removed = 0
+        for backup in backups:
+            if backup["name"] not in retained_names:
+                self.engine.delete_backup(backup)
+                removed += 1
+        self.engine.prune_chunks()
+
+        while len(retained) > 1 and self.engine.total_size() > self.max_bytes:
+            self.engine.delete_backup(retained.pop())
+            self.engine.prune_chunks()
+            removed += 1
+        return removed
+
+
+auto_backup_service = AutoBackupService()
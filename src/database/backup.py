@@ -0,0 +1,228 @@
+import os
+import json
+import zlib
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from database.engine import DB_URL, get_db_connection
+
+
+BACKUP_CHUNK_SIZE = 1024 * 1024
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP = 0.005
+
+# progress(phase, done, total): phase "copy" counts pages, phase "store" counts chunks.
+BackupProgress = Callable[[str, int, int], None]
+
+# One lock per backup directory, shared by every BackupEngine pointed at it.
+_directory_locks: Dict[str, threading.RLock] = {}
+_directory_locks_guard = threading.Lock()
+
+
+def _directory_lock(backup_dir: Path) -> threading.RLock:
+    with _directory_locks_guard:
+        return _directory_locks.setdefault(str(backup_dir.resolve()), threading.RLock())
+
+
+class BackupEngine:
+    """
+    Online, deduplicated backups built on the SQLite backup API.
+
+    A backup first copies a consistent snapshot with `Connection.backup`, a few
+    pages at a time so writers are never blocked for long (WAL content included).
+    The snapshot is then cut into fixed-size chunks stored by SHA-256 under
+    `chunks/`, optionally zlib-compressed; chunks already present from an earlier
+    backup are reused, so a backup after a small change only writes the pages that
+    moved. Each backup is a JSON manifest under `manifests/` listing its chunks.
+    Storing chunks through publishing the manifest, and pruning, hold a lock
+    shared by all engines on the same directory, so a prune never removes the
+    chunks of a backup still being written.
+    """
+
+    def __init__(self, backup_dir: str = "backups", chunk_size: int = BACKUP_CHUNK_SIZE):
+        self.backup_dir = Path(backup_dir)
+        self.chunk_dir = self.backup_dir / "chunks"
+        self.manifest_dir = self.backup_dir / "manifests"
+        self.chunk_size = chunk_size
+        self._lock = _directory_lock(self.backup_dir)
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.chunk_dir / digest[:2] / digest
+
+    def _snapshot(self, target: Path, pages_per_step: int, progress: Optional[BackupProgress]):
+        """Copy the live database into `target` through the backup API."""
+        def report(status, remaining, total):
+            if progress:
+                progress("copy", total - remaining, total)
+
+        dest = sqlite3.connect(str(target))
+        try:
+            with get_db_connection() as source:
+                source.backup(dest, pages=pages_per_step, progress=report, sleep=BACKUP_STEP_SLEEP)
+            dest.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            dest.close()
+
+    def create_backup(self, compress: bool = True, verify: bool = True,
+                      pages_per_step: int = BACKUP_PAGES_PER_STEP,
+                      progress: Optional[BackupProgress] = None) -> Dict:
+        """Take a backup and return its manifest (with `path`, `new_chunks` and `reused_chunks`)."""
+        self.chunk_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+
+        created_at = datetime.now()
+        name = f"finance_backup_{created_at.strftime('%Y%m%d_%H%M%S_%f')}"
+        snapshot = self.backup_dir / f".{name}.snapshot"
+        try:
+            self._snapshot(snapshot, pages_per_step, progress)
+            with self._lock:
+                manifest = self._store(snapshot, name, created_at, compress, progress)
+                # Verify before the manifest is published, so a bad backup is never listed.
+                if verify and not self.verify(manifest):
+                    self.prune_chunks()
+                    raise RuntimeError(f"Backup {name} failed verification")
+
+                manifest_path = self.manifest_dir / f"{name}.json"
+                tmp = manifest_path.with_suffix(".tmp")
+                with open(tmp, 'w') as f:
+                    json.dump(manifest, f, indent=2)
+                os.replace(tmp, manifest_path)
+        finally:
+            if snapshot.exists():
+                snapshot.unlink()
+        manifest["path"] = str(manifest_path)
+        return manifest
+
+    def _store(self, snapshot: Path, name: str, created_at: datetime, compress: bool,
+               progress: Optional[BackupProgress]) -> Dict:
+        """Cut the snapshot into chunks, write the ones not stored yet and return the manifest. Caller holds the lock."""
+        size = snapshot.stat().st_size
+        total_chunks = (size + self.chunk_size - 1) // self.chunk_size
+        whole = hashlib.sha256()
+        chunks: List[str] = []
+        new_chunks = 0
+        stored_bytes = 0
+
+        with open(snapshot, 'rb') as f:
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+                whole.update(data)
+                digest = hashlib.sha256(data).hexdigest()
+                chunks.append(digest)
+
+                path = self._chunk_path(digest)
+                if not path.exists():
+                    path.parent.mkdir(exist_ok=True)
+                    payload = zlib.compress(data, 6) if compress else data
+                    tmp = path.with_suffix(".tmp")
+                    with open(tmp, 'wb') as out:
+                        out.write(payload)
+                    os.replace(tmp, path)
+                    new_chunks += 1
+                    stored_bytes += len(payload)
+                if progress:
+                    progress("store", len(chunks), total_chunks)
+
+        return {
+            "name": name,
+            "created_at": created_at.isoformat(timespec="seconds"),
+            "source": os.path.basename(DB_URL),
+            "size": size,
+            "sha256": whole.hexdigest(),
+            "chunk_size": self.chunk_size,
+            "compressed": compress,
+            "chunks": chunks,
+            "new_chunks": new_chunks,
+            "reused_chunks": len(chunks) - new_chunks,
+            "stored_bytes": stored_bytes,
+        }
+
+    def load_manifest(self, name_or_path: str) -> Dict:
+        path = Path(name_or_path)
+        if not path.exists():
+            path = self.manifest_dir / f"{name_or_path}.json"
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        manifest["path"] = str(path)
+        return manifest
+
+    def list_backups(self) -> List[Dict]:
+        """All manifests, newest first."""
+        if not self.manifest_dir.exists():
+            return []
+        manifests = [self.load_manifest(str(path)) for path in self.manifest_dir.glob("*.json")]
+        return sorted(manifests, key=lambda m: m["created_at"], reverse=True)
+
+    def _read_chunk(self, manifest: Dict, digest: str) -> bytes:
+        with open(self._chunk_path(digest), 'rb') as f:
+            data = f.read()
+        if manifest.get("compressed"):
+            data = zlib.decompress(data)
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Chunk {digest} is corrupt")
+        return data
+
+    def restore(self, manifest: Dict, target: str) -> str:
+        """Reassemble a backup into a standalone database file at `target`."""
+        whole = hashlib.sha256()
+        tmp = f"{target}.tmp"
+        try:
+            with open(tmp, 'wb') as out:
+                for digest in manifest["chunks"]:
+                    data = self._read_chunk(manifest, digest)
+                    whole.update(data)
+                    out.write(data)
+            if whole.hexdigest() != manifest["sha256"]:
+                raise ValueError(f"Backup {manifest['name']} does not match its checksum")
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return target
+
+    def verify(self, manifest: Dict) -> bool:
+        """Check every chunk against its hash, the whole-file checksum, and SQLite's quick_check."""
+        check_path = self.backup_dir / f".{manifest['name']}.verify"
+        try:
+            self.restore(manifest, str(check_path))
+            conn = sqlite3.connect(str(check_path))
+            try:
+                return conn.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+            finally:
+                conn.close()
+        except (OSError, ValueError, zlib.error, sqlite3.DatabaseError):
+            return False
+        finally:
+            if check_path.exists():
+                check_path.unlink()
+
+    def delete_backup(self, manifest: Dict):
+        """Remove a manifest; its chunks are reclaimed by `prune_chunks`."""
+        path = Path(manifest.get("path") or self.manifest_dir / f"{manifest['name']}.json")
+        if path.exists():
+            path.unlink()
+
+    def prune_chunks(self) -> int:
+        """Delete chunks no manifest references. Returns the number removed."""
+        with self._lock:
+            referenced = {digest for manifest in self.list_backups() for digest in manifest["chunks"]}
+            removed = 0
+            if not self.chunk_dir.exists():
+                return removed
+            for path in self.chunk_dir.glob("*/*"):
+                if path.suffix != ".tmp" and path.name not in referenced:
+                    path.unlink()
+                    removed += 1
+            return removed
+
+    def total_size(self) -> int:
+        """Bytes used on disk by all stored chunks."""
+        if not self.chunk_dir.exists():
+            return 0
+        return sum(path.stat().st_size for path in self.chunk_dir.glob("*/*"))
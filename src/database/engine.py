@@ -1,5 +1,9 @@
 import os
+import time
+import atexit
 import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional
 from tools.utils import Utils
 from dotenv import load_dotenv
 from contextlib import contextmanager
@@ -8,63 +12,378 @@ from contextlib import contextmanager
 load_dotenv()
 DATABASE_NAME = os.getenv("DATABASE_NAME", "finance.db")
 DB_URL = Utils.resource_path(f"data/{DATABASE_NAME}")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_HEALTH_CHECK_INTERVAL", "60"))
 
 db_directory = os.path.dirname(DB_URL)
 if not os.path.exists(db_directory):
     os.makedirs(db_directory, exist_ok=True)
 
 
+class _PooledConnection:
+    """A long-lived connection plus the bookkeeping the pool needs for it."""
+    __slots__ = ("conn", "owner", "last_used", "busy_timeout", "changes", "version")
+
+    def __init__(self, conn: sqlite3.Connection, busy_timeout: float):
+        self.conn = conn
+        self.owner: Optional[int] = None
+        self.last_used = time.monotonic()
+        self.busy_timeout = busy_timeout
+        self.changes = 0
+        self.version: Optional[int] = None
+
+
+class ConnectionPool:
+    """
+    Bounded pool of long-lived SQLite connections.
+
+    PRAGMAs are applied once when a connection is opened. A thread gets back
+    the connection it used last whenever that one is idle, so the statement
+    cache stays warm; otherwise any idle connection is handed out, a new one
+    is opened while below `max_size`, or the caller waits for a return.
+
+    `generation` goes up whenever a checkout modified rows, so callers can
+    tell cheaply whether anything was written since they last looked.
+    `external_generation` goes up when another process (or a connection
+    outside this pool) committed to the database: every checkout compares
+    `PRAGMA data_version`, read on a monitor connection that never writes,
+    with the value seen after this pool's own last commit. A connection's own
+    commits never move its own `data_version`, so each pooled connection also
+    reads it at checkout; if it moved by the time a writing checkout is
+    returned, another connection committed meanwhile and that counts as
+    external too, rather than being absorbed with the pool's own commit.
+    """
+
+    def __init__(self, database: str, max_size: int = DB_POOL_SIZE,
+                 health_check_interval: float = DB_HEALTH_CHECK_INTERVAL,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None,
+                 generation: int = 0):
+        self.database = database
+        self.generation = generation
+        self.external_generation = generation
+        self.on_connect = on_connect
+        self.max_size = max(1, max_size)
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Condition()
+        self._idle: List[_PooledConnection] = []
+        self._size = 0
+        self._busy: Dict[int, _PooledConnection] = {}
+        self._closed = False
+        self._monitor: Optional[sqlite3.Connection] = None
+        self._monitor_lock = threading.Lock()
+        self._seen_version: Optional[int] = None
+        self._stats = {
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "reuses": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "health_check_failures": 0,
+        }
+
+    def _open(self, timeout: float) -> _PooledConnection:
+        """Open a new connection and apply the per-connection PRAGMAs."""
+        conn = sqlite3.connect(self.database, timeout=timeout, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+        except sqlite3.Error:
+            conn.close()
+            raise
+
+        conn.row_factory = sqlite3.Row
+        if self.on_connect:
+            self.on_connect(conn)
+        with self._lock:
+            self._stats["connections_opened"] += 1
+        return _PooledConnection(conn, timeout)
+
+    def _discard(self, entry: _PooledConnection):
+        """Close a connection and free its slot in the pool."""
+        try:
+            entry.conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._stats["connections_closed"] += 1
+            self._lock.notify()
+
+    def _is_healthy(self, entry: _PooledConnection) -> bool:
+        """Ping a connection that has been idle longer than the check interval."""
+        if time.monotonic() - entry.last_used < self.health_check_interval:
+            return True
+        try:
+            entry.conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            with self._lock:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    def data_version(self) -> Optional[int]:
+        """`PRAGMA data_version` of the monitor connection; changes after every commit made by any other connection."""
+        with self._monitor_lock:
+            try:
+                if self._monitor is None:
+                    if self._closed:
+                        return None
+                    self._monitor = sqlite3.connect(self.database, check_same_thread=False)
+                return self._monitor.execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error:
+                return None
+
+    @staticmethod
+    def _version_of(conn: sqlite3.Connection) -> Optional[int]:
+        """`PRAGMA data_version` as seen by `conn`, or None if it cannot be read."""
+        try:
+            return conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+    def check_external_writes(self) -> int:
+        """Count a commit made outside this pool since the last check, as seen by `data_version`. Returns `external_generation`."""
+        version = self.data_version()
+        with self._lock:
+            if version is not None:
+                if self._seen_version is not None and version != self._seen_version:
+                    self.external_generation += 1
+                self._seen_version = version
+            return self.external_generation
+
+    def _take_idle(self) -> Optional[_PooledConnection]:
+        """Pop this thread's previous connection if idle, else the most recent idle one. Caller holds the lock."""
+        if not self._idle:
+            return None
+        thread_id = threading.get_ident()
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index].owner == thread_id:
+                return self._idle.pop(index)
+        return self._idle.pop()
+
+    def acquire(self, timeout: float = 30.0) -> sqlite3.Connection:
+        """Check a connection out of the pool, waiting up to `timeout` seconds for one to free up."""
+        deadline = None
+        while True:
+            entry = None
+            with self._lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+
+                entry = self._take_idle()
+                if entry is None and self._size < self.max_size:
+                    self._size += 1
+                elif entry is None:
+                    now = time.monotonic()
+                    if deadline is None:
+                        deadline = now + timeout
+                        self._stats["waits"] += 1
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise sqlite3.OperationalError(
+                            f"Timed out after {timeout:.1f}s waiting for a pooled database connection")
+                    self._lock.wait(remaining)
+                    self._stats["wait_time"] += min(remaining, time.monotonic() - now)
+                    continue
+
+            if entry is None:
+                try:
+                    entry = self._open(timeout)
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+            else:
+                if not self._is_healthy(entry):
+                    self._discard(entry)
+                    continue
+                with self._lock:
+                    self._stats["reuses"] += 1
+
+            if entry.busy_timeout != timeout:
+                entry.conn.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+                entry.busy_timeout = timeout
+
+            entry.version = self._version_of(entry.conn)
+            self.check_external_writes()
+            entry.owner = threading.get_ident()
+            entry.changes = entry.conn.total_changes
+            with self._lock:
+                self._busy[id(entry.conn)] = entry
+                self._stats["checkouts"] += 1
+            return entry.conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, rolling back anything left uncommitted."""
+        with self._lock:
+            entry = self._busy.pop(id(conn), None)
+        if entry is None:
+            conn.close()
+            return
+
+        if conn.total_changes != entry.changes:
+            # The monitor's data_version moved by this commit is ours; a commit made by
+            # any other connection while this one was out also moved the connection's own.
+            version = self.data_version()
+            moved = self._version_of(conn) != entry.version
+            with self._lock:
+                self.generation += 1
+                if moved:
+                    self.external_generation += 1
+                if version is not None:
+                    self._seen_version = version
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            self._discard(entry)
+            return
+
+        entry.last_used = time.monotonic()
+        with self._lock:
+            if self._closed:
+                self._size -= 1
+                self._stats["connections_closed"] += 1
+                conn.close()
+                return
+            self._idle.append(entry)
+            self._lock.notify()
+
+    def close_all(self):
+        """Close every idle connection; busy ones are closed when returned."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._stats["connections_closed"] += len(idle)
+            self._lock.notify_all()
+        for entry in idle:
+            try:
+                entry.conn.close()
+            except sqlite3.Error:
+                pass
+        with self._monitor_lock:
+            if self._monitor is not None:
+                self._monitor.close()
+                self._monitor = None
+
+    def stats(self) -> Dict:
+        """Snapshot of the pool counters."""
+        with self._lock:
+            return {
+                **self._stats,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._busy),
+                "max_size": self.max_size,
+            }
+
+
+_pool = ConnectionPool(DB_URL)
+
+
+def configure_pool(database: str = DB_URL,
+                   on_connect: Optional[Callable[[sqlite3.Connection], None]] = None) -> ConnectionPool:
+    """Replace the shared pool, e.g. to point the services at a scratch database."""
+    global _pool
+    previous, _pool = _pool, ConnectionPool(database, on_connect=on_connect,
+                                         generation=max(_pool.generation, _pool.external_generation) + 1)
+    previous.close_all()
+    return _pool
+
+
+@atexit.register
+def _close_pool():
+    _pool.close_all()
+
+
+def get_pool_stats() -> Dict:
+    """Returns connection pool counters (connections opened, checkouts, wait time, ...)."""
+    return _pool.stats()
+
+
+def get_data_generation() -> int:
+    """A counter that changes whenever rows were written through the shared pool."""
+    return _pool.generation
+
+
+def get_external_generation() -> int:
+    """A counter that changes whenever another process committed to the database; checks `data_version` first."""
+    return _pool.check_external_writes()
+
+
 @contextmanager
 def get_db_connection(timeout: float = 30.0):
     """
     Get a synchronous database connection using a standard context manager.
+    The connection is borrowed from the shared pool and returned on exit.
     """
-    conn = sqlite3.connect(DB_URL, timeout=timeout) 
+    conn = _pool.acquire(timeout)
     try:
-        conn.execute("PRAGMA journal_mode = WAL") 
-        conn.execute("PRAGMA synchronous = NORMAL")
-        conn.execute("PRAGMA foreign_keys = ON")
-        
-        conn.row_factory = sqlite3.Row 
         yield conn
     finally:
-        conn.close() 
-
-
-def setup_database():
-    """Create tables and set WAL mode."""
-    with get_db_connection() as db:
-        db.executescript('''
-        CREATE TABLE IF NOT EXISTS schema_version (
-            version INTEGER PRIMARY KEY
-        );
-        CREATE TABLE IF NOT EXISTS preferences (
-            item TEXT PRIMARY KEY,
-            data TEXT
-        );
-        CREATE TABLE IF NOT EXISTS categories (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL UNIQUE,
-            type TEXT NOT NULL CHECK(type IN ('Expense', 'Income', 'Transfer')),
-            budget REAL,
-            description TEXT,
-            is_active INTEGER DEFAULT 1,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL
-        );
-        CREATE TABLE IF NOT EXISTS transactions (
-            id TEXT PRIMARY KEY,
-            type TEXT NOT NULL CHECK(type IN ('Expense', 'Income', 'Transfer')),
-            amount REAL NOT NULL CHECK(amount > 0),
-            date TEXT NOT NULL,
-            category TEXT,
-            account TEXT NOT NULL,
-            description TEXT,
-            is_active INTEGER DEFAULT 1,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL
-        );
-        ''')
-        
-        db.commit()
+        _pool.release(conn)
+
+
+def run_script(db: sqlite3.Connection, script: str):
+    """
+    Execute a multi-statement SQL script on `db` without committing.
+    Unlike `executescript`, this keeps the statements inside the caller's transaction.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            db.execute(statement)
+            statement = ""
+    if statement.strip():
+        db.execute(statement)
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS preferences (
+    item TEXT PRIMARY KEY,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS categories (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    type TEXT NOT NULL CHECK(type IN ('Expense', 'Income', 'Transfer')),
+    budget REAL,
+    description TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL CHECK(type IN ('Expense', 'Income', 'Transfer')),
+    amount REAL NOT NULL CHECK(amount > 0),
+    date TEXT NOT NULL,
+    category TEXT,
+    account TEXT NOT NULL,
+    description TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+'''
+
+
+def setup_database(db: Optional[sqlite3.Connection] = None):
+    """Create the initial tables. With `db` given, runs inside the caller's transaction."""
+    if db is not None:
+        run_script(db, SCHEMA)
+        return
 
+    with get_db_connection() as conn:
+        run_script(conn, SCHEMA)
+        conn.commit()
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from database.engine import get_db_connection, get_pool_stats
+from services.theme import ThemeService
+
+
+MAINTENANCE_KEY = "maintenance_last_run"
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", str(6 * 60 * 60)))
+MAINTENANCE_IDLE_SECONDS = float(os.getenv("MAINTENANCE_IDLE_SECONDS", "30"))
+
+
+def _optimize(conn) -> str:
+    conn.execute("PRAGMA optimize")
+    return "ok"
+
+
+def _analyze(conn) -> str:
+    conn.execute("ANALYZE")
+    conn.commit()
+    return "ok"
+
+
+def _checkpoint(conn) -> str:
+    busy, log_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    return f"busy={busy}, wal_frames={log_frames}, checkpointed={checkpointed}"
+
+
+def incremental_vacuum_enabled(conn) -> bool:
+    return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def _enable_incremental_vacuum(conn) -> str:
+    # auto_vacuum only changes on a full VACUUM, which rewrites the whole file while
+    # holding the write lock; it is only run when the user asks for it.
+    if incremental_vacuum_enabled(conn):
+        return "already enabled"
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return "enabled incremental auto_vacuum (full VACUUM)"
+
+
+def _incremental_vacuum(conn) -> str:
+    if not incremental_vacuum_enabled(conn):
+        return "skipped: incremental auto_vacuum is not enabled"
+
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute("PRAGMA incremental_vacuum").fetchall()
+    after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return f"freed {before - after} pages"
+
+
+MAINTENANCE_TASKS = [
+    ("optimize", _optimize),
+    ("analyze", _analyze),
+    ("wal_checkpoint", _checkpoint),
+    ("incremental_vacuum", _incremental_vacuum),
+]
+
+
+class MaintenanceScheduler:
+    """
+    Runs PRAGMA optimize, ANALYZE, a WAL checkpoint and incremental vacuum on a
+    background thread once per `interval`, waiting until the connection pool has
+    been idle for `idle_seconds`. The outcome of each run is stored in preferences.
+    Scheduled runs never switch the database to incremental auto_vacuum, as that
+    takes a full VACUUM; only a run started with `enable_auto_vacuum` does.
+    """
+
+    def __init__(self, interval: float = MAINTENANCE_INTERVAL, idle_seconds: float = MAINTENANCE_IDLE_SECONDS):
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_report: Optional[Dict] = None
+
+    def start(self):
+        """Start the idle-time scheduler thread (no-op if already running)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="db-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def is_running(self) -> bool:
+        return self._run_lock.locked()
+
+    def _loop(self):
+        last_checkouts = get_pool_stats()["checkouts"]
+        idle_since = time.monotonic()
+        poll = max(1.0, min(self.idle_seconds, 60.0))
+
+        while not self._stop.wait(poll):
+            stats = get_pool_stats()
+            if stats["checkouts"] != last_checkouts or stats["in_use"]:
+                last_checkouts = stats["checkouts"]
+                idle_since = time.monotonic()
+                continue
+
+            if time.monotonic() - idle_since < self.idle_seconds or not self._is_due():
+                continue
+
+            self.run()
+            last_checkouts = get_pool_stats()["checkouts"]
+            idle_since = time.monotonic()
+
+    def _is_due(self) -> bool:
+        last = self.last_run()
+        if not last:
+            return True
+        try:
+            finished = datetime.fromisoformat(last["finished_at"])
+        except (KeyError, ValueError):
+            return True
+        return (datetime.now() - finished).total_seconds() >= self.interval
+
+    def needs_full_vacuum(self) -> bool:
+        """True while incremental auto_vacuum is off, i.e. enabling it would run a full VACUUM."""
+        with get_db_connection() as conn:
+            return not incremental_vacuum_enabled(conn)
+
+    def run(self, enable_auto_vacuum: bool = False) -> Optional[Dict]:
+        """
+        Run every maintenance task now on the calling thread. With
+        `enable_auto_vacuum`, a database not yet in incremental auto_vacuum mode
+        is switched to it first with a full VACUUM. Returns None if a run is
+        already in progress.
+        """
+        if not self._run_lock.acquire(blocking=False):
+            return None
+        try:
+            started = time.perf_counter()
+            report: Dict = {"started_at": datetime.now().isoformat(timespec="seconds"), "tasks": []}
+            tasks: List[Dict] = report["tasks"]
+            to_run = list(MAINTENANCE_TASKS)
+            if enable_auto_vacuum:
+                to_run.insert(len(to_run) - 1, ("enable_incremental_vacuum", _enable_incremental_vacuum))
+
+            with get_db_connection() as conn:
+                for name, task in to_run:
+                    task_started = time.perf_counter()
+                    try:
+                        result = task(conn)
+                        ok = True
+                    except Exception as e:
+                        result, ok = str(e), False
+                    tasks.append({"name": name, "ok": ok, "result": result,
+                                  "seconds": round(time.perf_counter() - task_started, 3)})
+
+            report["finished_at"] = datetime.now().isoformat(timespec="seconds")
+            report["seconds"] = round(time.perf_counter() - started, 3)
+            ThemeService().update(MAINTENANCE_KEY, json.dumps(report))
+            self._last_report = report
+            return report
+        finally:
+            self._run_lock.release()
+
+    def run_now(self, on_done: Optional[Callable[[Optional[Dict]], None]] = None,
+                enable_auto_vacuum: bool = False) -> threading.Thread:
+        """Run maintenance on a worker thread; `on_done(report)` is called from that thread."""
+        def worker():
+            report = self.run(enable_auto_vacuum)
+            if on_done:
+                on_done(report)
+
+        thread = threading.Thread(target=worker, name="db-maintenance-now", daemon=True)
+        thread.start()
+        return thread
+
+    def last_run(self) -> Optional[Dict]:
+        """The report of the most recent run, or None if maintenance never ran."""
+        if self._last_report is not None:
+            return self._last_report
+        preference = ThemeService().get_by_item(MAINTENANCE_KEY)
+        if not preference or not preference.get('data'):
+            return None
+        try:
+            self._last_report = json.loads(preference['data'])
+        except ValueError:
+            return None
+        return self._last_report
+
+
+scheduler = MaintenanceScheduler()
@@ -1,73 +1,391 @@
 import sqlite3
-from database.engine import get_db_connection, setup_database
+from typing import Callable, List, Optional, Tuple
+from database.engine import get_db_connection, run_script, setup_database
+from database.rollups import create_rollups, rebuild_monthly_totals
+from tools.utils import Utils
+from tools.money import MONEY_SCALE_KEY, Money, scale_for_currency, set_money_scale
+from tools.fingerprint import TransactionFingerprinter
 
 
-def migration_1():
+# progress(message, done, total); `total` is 0 when the amount of work is unknown.
+ProgressCallback = Callable[[str, int, int], None]
+
+
+class BatchedMigration:
+    """
+    A data migration applied in resumable batches.
+
+    `prepare(db)` runs once per attempt and must be idempotent. `batch(db, position, size)`
+    processes the next slice after `position` and returns (new_position, rows_done), with
+    rows_done == 0 once everything is processed. Each batch is committed together with its
+    position, so a crash resumes where it stopped. `finalize(db)` runs in the same
+    transaction as the version bump. `total(db)` estimates the rows for progress reporting.
+    """
+
+    def __init__(self, description: str, prepare: Callable, batch: Callable, finalize: Callable,
+                 total: Callable, batch_size: int = 5000):
+        self.__doc__ = description
+        self.prepare = prepare
+        self.batch = batch
+        self.finalize = finalize
+        self.total = total
+        self.batch_size = batch_size
+
+
+def migration_1(db: sqlite3.Connection):
     """Create initial tables."""
-    print("==> Running migration 1: Creating initial tables...")
-    setup_database()
+    setup_database(db)
 
 
-def migration_2():
+def migration_2(db: sqlite3.Connection):
     """Add indexes to tables."""
-    print("==> Running migration 2: Adding indexes...")
-    with get_db_connection() as db:
-        db.executescript('''
-        CREATE INDEX IF NOT EXISTS idx_category_name ON categories(name);
-        CREATE INDEX IF NOT EXISTS idx_category_type ON categories(type);
-        CREATE INDEX IF NOT EXISTS idx_transaction_date ON transactions(date);
-        CREATE INDEX IF NOT EXISTS idx_transaction_type ON transactions(type);
-        CREATE INDEX IF NOT EXISTS idx_transaction_category ON transactions(category);
-        CREATE INDEX IF NOT EXISTS idx_transaction_account ON transactions(account);
-        CREATE INDEX IF NOT EXISTS idx_preferences_item ON preferences(item);
+    run_script(db, '''
+    CREATE INDEX IF NOT EXISTS idx_category_name ON categories(name);
+    CREATE INDEX IF NOT EXISTS idx_category_type ON categories(type);
+    CREATE INDEX IF NOT EXISTS idx_transaction_date ON transactions(date);
+    CREATE INDEX IF NOT EXISTS idx_transaction_type ON transactions(type);
+    CREATE INDEX IF NOT EXISTS idx_transaction_category ON transactions(category);
+    CREATE INDEX IF NOT EXISTS idx_transaction_account ON transactions(account);
+    CREATE INDEX IF NOT EXISTS idx_preferences_item ON preferences(item);
+    ''')
+
+
+def migration_3(db: sqlite3.Connection):
+    """Add (filter, date, id) indexes for keyset pagination."""
+    run_script(db, '''
+    CREATE INDEX IF NOT EXISTS idx_transaction_date_id ON transactions(date, id);
+    CREATE INDEX IF NOT EXISTS idx_transaction_type_date_id ON transactions(type, date, id);
+    CREATE INDEX IF NOT EXISTS idx_transaction_category_date_id ON transactions(category, date, id);
+    CREATE INDEX IF NOT EXISTS idx_transaction_account_date_id ON transactions(account, date, id);
+    ''')
+
+
+def migration_4(db: sqlite3.Connection):
+    """Add an indexed generated year-month column for sargable month filters."""
+    columns = [row['name'] for row in db.execute("PRAGMA table_xinfo(transactions)")]
+    if 'ym' not in columns:
+        db.execute('''
+        ALTER TABLE transactions ADD COLUMN ym INTEGER
+            GENERATED ALWAYS AS (CAST(substr(date, 1, 4) AS INTEGER) * 100 + CAST(substr(date, 6, 2) AS INTEGER)) VIRTUAL
         ''')
-        
-        db.commit() 
+    db.execute('''
+    CREATE INDEX IF NOT EXISTS idx_transaction_ym
+        ON transactions(ym, type, category, amount) WHERE is_active = 1
+    ''')
+
+
+def migration_5(db: sqlite3.Connection):
+    """Add trigger-maintained monthly rollups."""
+    create_rollups(db)
+    rebuild_monthly_totals(db)
+
+
+def _swap_table(db: sqlite3.Connection, table: str):
+    """Replace `table` with the fully populated `{table}_new`, keeping its indexes and triggers."""
+    dependents = [row['sql'] for row in db.execute(
+        "SELECT sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND tbl_name = ? AND sql IS NOT NULL",
+        (table,))]
+    db.execute(f"DROP TABLE {table}")
+    db.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    for sql in dependents:
+        db.execute(sql)
+
+
+def _money_scale(db: sqlite3.Connection) -> int:
+    """The scale chosen for migration 6, fixed on its first attempt so resumed batches agree."""
+    row = db.execute("SELECT data FROM preferences WHERE item = ?", (MONEY_SCALE_KEY,)).fetchone()
+    if row and row['data']:
+        return int(row['data'])
+    scale = scale_for_currency(Utils.load_app_settings().get("currency", "$"))
+    db.execute("INSERT OR REPLACE INTO preferences (item, data) VALUES (?, ?)", (MONEY_SCALE_KEY, str(scale)))
+    return scale
+
+
+# Running count of amounts migration 6 had to round up to one minor unit; reported by `migrate`.
+MONEY_ROUNDED_UP_KEY = "money_migration_rounded_up"
+
+
+def _migration_6_prepare(db: sqlite3.Connection):
+    _money_scale(db)
+    db.execute('''
+    CREATE TABLE IF NOT EXISTS transactions_new (
+        id TEXT PRIMARY KEY,
+        type TEXT NOT NULL CHECK(type IN ('Expense', 'Income', 'Transfer')),
+        amount INTEGER NOT NULL CHECK(amount > 0),
+        date TEXT NOT NULL,
+        category TEXT,
+        account TEXT NOT NULL,
+        description TEXT,
+        is_active INTEGER DEFAULT 1,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        ym INTEGER GENERATED ALWAYS AS (CAST(substr(date, 1, 4) AS INTEGER) * 100 + CAST(substr(date, 6, 2) AS INTEGER)) VIRTUAL
+    )''')
+
+
+def _migration_6_batch(db: sqlite3.Connection, position: Optional[str], size: int) -> Tuple[Optional[str], int]:
+    last_rowid = int(position or 0)
+    row = db.execute(
+        "SELECT MAX(rowid) AS upto, COUNT(*) AS n FROM (SELECT rowid FROM transactions WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+        (last_rowid, size)).fetchone()
+    if not row['n']:
+        return position, 0
+
+    scale = _money_scale(db)
+    # Amounts under half a minor unit would round to 0 and fail the CHECK; they are stored as 1
+    # minor unit instead, and counted so `migrate` can report them.
+    rounded_up = db.execute(
+        f"SELECT COUNT(*) FROM transactions WHERE rowid > ? AND rowid <= ? AND ROUND(amount * {scale}) < 1",
+        (last_rowid, row['upto'])).fetchone()[0]
+    if rounded_up:
+        db.execute("INSERT INTO preferences (item, data) VALUES (?, ?) "
+                   "ON CONFLICT(item) DO UPDATE SET data = CAST(data AS INTEGER) + excluded.data",
+                   (MONEY_ROUNDED_UP_KEY, rounded_up))
+    db.execute(f'''
+    INSERT INTO transactions_new
+        (rowid, id, type, amount, date, category, account, description, is_active, created_at, updated_at)
+    SELECT rowid, id, type, MAX(CAST(ROUND(amount * {scale}) AS INTEGER), 1), date, category, account,
+           description, is_active, created_at, updated_at
+    FROM transactions
+    WHERE rowid > ? AND rowid <= ?''', (last_rowid, row['upto']))
+    return str(row['upto']), row['n']
+
+
+def _migration_6_finalize(db: sqlite3.Connection):
+    scale = _money_scale(db)
+    _swap_table(db, "transactions")
+
+    db.execute('''
+    CREATE TABLE categories_new (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        type TEXT NOT NULL CHECK(type IN ('Expense', 'Income', 'Transfer')),
+        budget INTEGER,
+        description TEXT,
+        is_active INTEGER DEFAULT 1,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )''')
+    db.execute(f'''
+    INSERT INTO categories_new
+    SELECT id, name, type, CAST(ROUND(budget * {scale}) AS INTEGER), description,
+           is_active, created_at, updated_at
+    FROM categories''')
+    _swap_table(db, "categories")
+
+    db.execute("DROP TABLE monthly_totals")
+    create_rollups(db)
+    rebuild_monthly_totals(db)
+    set_money_scale(scale)
+
+
+migration_6 = BatchedMigration(
+    "Store money as INTEGER minor units.",
+    prepare=_migration_6_prepare,
+    batch=_migration_6_batch,
+    finalize=_migration_6_finalize,
+    total=lambda db: db.execute("SELECT COUNT(*) FROM transactions").fetchone()[0],
+)
+
+
+def migration_7(db: sqlite3.Connection):
+    """Replace single-column indexes with partial composites matching the service queries."""
+    run_script(db, '''
+    DROP INDEX IF EXISTS idx_preferences_item;
+    DROP INDEX IF EXISTS idx_category_name;
+    DROP INDEX IF EXISTS idx_category_type;
+    DROP INDEX IF EXISTS idx_transaction_date;
+    DROP INDEX IF EXISTS idx_transaction_type;
+    DROP INDEX IF EXISTS idx_transaction_category;
+    DROP INDEX IF EXISTS idx_transaction_account;
+    DROP INDEX IF EXISTS idx_transaction_date_id;
+    DROP INDEX IF EXISTS idx_transaction_type_date_id;
+    DROP INDEX IF EXISTS idx_transaction_category_date_id;
+    DROP INDEX IF EXISTS idx_transaction_account_date_id;
+
+    CREATE INDEX IF NOT EXISTS idx_category_active_type_name ON categories(type, name) WHERE is_active = 1;
+    CREATE INDEX IF NOT EXISTS idx_transaction_active_date ON transactions(date, id) WHERE is_active = 1;
+    CREATE INDEX IF NOT EXISTS idx_transaction_active_type_date ON transactions(type, date, id) WHERE is_active = 1;
+    CREATE INDEX IF NOT EXISTS idx_transaction_active_category_date ON transactions(category, date, id) WHERE is_active = 1;
+    CREATE INDEX IF NOT EXISTS idx_transaction_active_account_date ON transactions(account, date, id) WHERE is_active = 1;
+
+    ANALYZE;
+    ''')
+
+
+def migration_8(db: sqlite3.Connection):
+    """Fingerprint transactions with a unique index so re-imports never duplicate rows."""
+    columns = {row['name'] for row in db.execute("PRAGMA table_info(transactions)")}
+    if 'external_id' not in columns:
+        db.execute("ALTER TABLE transactions ADD COLUMN external_id TEXT")
+    if 'fingerprint' not in columns:
+        db.execute("ALTER TABLE transactions ADD COLUMN fingerprint TEXT")
+
+    # Existing identical rows get occurrences 0, 1, 2... just as they would on import.
+    fingerprinter = TransactionFingerprinter()
+    last_rowid = 0
+    while True:
+        rows = db.execute(
+            "SELECT rowid, type, amount, date, account, description, external_id FROM transactions "
+            "WHERE rowid > ? ORDER BY rowid LIMIT 5000", (last_rowid,)).fetchall()
+        if not rows:
+            break
+        db.executemany("UPDATE transactions SET fingerprint = ? WHERE rowid = ?", [
+            (fingerprinter({**dict(row), 'amount': Money(row['amount'])})['fingerprint'], row['rowid'])
+            for row in rows
+        ])
+        last_rowid = rows[-1]['rowid']
+
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_transaction_fingerprint "
+               "ON transactions(fingerprint) WHERE fingerprint IS NOT NULL")
+
+
+def migration_9(db: sqlite3.Connection):
+    """Create the category_rules table for auto-categorisation."""
+    run_script(db, '''
+    CREATE TABLE IF NOT EXISTS category_rules (
+        id TEXT PRIMARY KEY,
+        category TEXT NOT NULL,
+        kind TEXT NOT NULL CHECK(kind IN ('substring', 'regex', 'amount')),
+        pattern TEXT,
+        min_amount INTEGER,
+        max_amount INTEGER,
+        transaction_type TEXT CHECK(transaction_type IN ('Expense', 'Income', 'Transfer')),
+        priority INTEGER NOT NULL DEFAULT 100,
+        is_active INTEGER DEFAULT 1,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_category_rule_active_category ON category_rules(category, priority, created_at) WHERE is_active = 1;
+    ''')
+
+
+def migration_10(db: sqlite3.Connection):
+    """Index transactions by amount for the sortable report table."""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_transaction_active_amount_date ON transactions(amount, date, id) WHERE is_active = 1")
 
 
 MIGRATIONS = [
     migration_1,
     migration_2,
-    # Add more migration functions here as needed
+    migration_3,
+    migration_4,
+    migration_5,
+    migration_6,
+    migration_7,
+    migration_8,
+    migration_9,
+    migration_10,
+    # Add more migration functions (or BatchedMigration instances) here as needed
 ]
 
-def get_current_version() -> int:
-    """Get the current schema version from the database, safely handling non-existent tables."""
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.execute("SELECT version FROM schema_version")
-            row = cursor.fetchone() 
-            return row['version'] if row else 0
-    except sqlite3.OperationalError: 
-        print("==> schema_version table not found, assuming initial run.")
-        return 0
-
-def migrate():
-    """Apply all pending migrations."""
-    current_version = get_current_version() 
-    
-    if current_version == 0:
-        print("==> Initializing database...")
-        migration_1()
-        current_version = 1
-        with get_db_connection() as conn:
-            conn.execute("INSERT INTO schema_version (version) VALUES (?)", (current_version,))
-            conn.commit() 
-    
-    for i in range(current_version, len(MIGRATIONS)):
-        migration_func = MIGRATIONS[i]
-        migration_version = i + 1
-        
-        print(f"==> Applying migration {migration_version}...")
-        migration_func() 
-        
-        with get_db_connection() as conn:
-            conn.execute("UPDATE schema_version SET version = ?", (migration_version,))
-            conn.commit()
-
-    print("==========> Migrations completed successfully <===========")
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def get_current_version(db: sqlite3.Connection) -> int:
+    """
+    Read the schema version from PRAGMA user_version. Databases created before the
+    version moved there still carry it in the legacy schema_version table, which is
+    adopted once.
+    """
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    if version:
+        return version
+
+    legacy = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'").fetchone()
+    if legacy:
+        row = db.execute("SELECT MAX(version) AS version FROM schema_version").fetchone()
+        if row and row['version']:
+            return row['version']
+    return 0
+
+
+def needs_migration() -> bool:
+    """True when the database is behind LATEST_VERSION (a single PRAGMA read when it is not)."""
+    with get_db_connection() as db:
+        return db.execute("PRAGMA user_version").fetchone()[0] != LATEST_VERSION
+
+
+def _apply_batched(db: sqlite3.Connection, version: int, migration: BatchedMigration,
+                   progress: ProgressCallback):
+    """Run a BatchedMigration, committing after each batch along with its resume position."""
+    db.execute("BEGIN")
+    db.execute("CREATE TABLE IF NOT EXISTS migration_progress (version INTEGER PRIMARY KEY, position TEXT, done INTEGER NOT NULL DEFAULT 0)")
+    migration.prepare(db)
+    row = db.execute("SELECT position, done FROM migration_progress WHERE version = ?", (version,)).fetchone()
+    position, done = (row['position'], row['done']) if row else (None, 0)
+    total = migration.total(db)
+    db.commit()
+
+    while True:
+        db.execute("BEGIN")
+        position, rows = migration.batch(db, position, migration.batch_size)
+        if not rows:
+            db.rollback()
+            break
+        done += rows
+        db.execute("INSERT OR REPLACE INTO migration_progress (version, position, done) VALUES (?, ?, ?)",
+                   (version, position, done))
+        db.commit()
+        progress(f"Migration {version}: {migration.__doc__}", done, total)
+
+    db.execute("BEGIN")
+    migration.finalize(db)
+    db.execute("DELETE FROM migration_progress WHERE version = ?", (version,))
+
+
+def _take_notices(db: sqlite3.Connection) -> List[str]:
+    """Messages for the user that migrations left in preferences; removed as they are read."""
+    notices = []
+    row = db.execute("SELECT data FROM preferences WHERE item = ?", (MONEY_ROUNDED_UP_KEY,)).fetchone()
+    if row:
+        db.execute("DELETE FROM preferences WHERE item = ?", (MONEY_ROUNDED_UP_KEY,))
+        if int(row['data']):
+            notices.append(f"{int(row['data'])} transaction amount(s) smaller than half a minor unit "
+                           f"were rounded up to {Money(1)}.")
+    return notices
+
+
+def migrate(progress: Optional[ProgressCallback] = None) -> List[str]:
+    """
+    Apply all pending migrations. Each migration and its version bump commit atomically;
+    an up-to-date database costs a single PRAGMA user_version read. Returns the notices
+    migrations left for the user (e.g. amounts they had to change), which are also
+    passed to `progress`.
+    """
+    notices: List[str] = []
+    with get_db_connection() as db:
+        if db.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION:
+            return notices
+
+        progress = progress or (lambda message, done, total: print(f"==> {message}"))
+        current_version = get_current_version(db)
+
+        for version in range(current_version + 1, LATEST_VERSION + 1):
+            migration = MIGRATIONS[version - 1]
+            progress(f"Migration {version}: {migration.__doc__}", 0, 0)
+            try:
+                if isinstance(migration, BatchedMigration):
+                    _apply_batched(db, version, migration, progress)
+                else:
+                    db.execute("BEGIN")
+                    migration(db)
+                pending = _take_notices(db)
+                db.execute(f"PRAGMA user_version = {version}")
+                db.commit()
+            except Exception:
+                if db.in_transaction:
+                    db.rollback()
+                raise
+            for notice in pending:
+                progress(f"Warning: {notice}", 0, 0)
+            notices.extend(pending)
+
+    progress("Migrations completed successfully", 1, 1)
+    return notices
 
 
 if __name__ == "__main__":
     migrate()
-
@@ -0,0 +1,190 @@
+"""
+Query-plan regression check for the service layer.
+
+Seeds a scratch database through the real migrations and services, runs every
+service query with SQL tracing enabled, and asserts on `EXPLAIN QUERY PLAN`:
+a query must seek an index (SEARCH) unless it is listed as allowed to scan,
+and must never sort through a temp B-tree unless listed as allowed to.
+
+Run from `src/` with `python -m database.query_plans`; exits non-zero on a regression.
+`python -m pytest` runs the same check through tests/test_query_plans.py.
+"""
+import os
+import sys
+import random
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from database import engine
+from database.migrations import migrate
+from services.theme import ThemeService
+from services.category import CategoryService, category_cache
+from services.query_cache import query_cache
+from services.transaction import SORT_KEYS, TransactionService
+from services.category_rule import CategoryRuleService
+
+
+IGNORED_PREFIXES = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA", "INSERT", "ANALYZE", "--", "CREATE", "DROP", "ALTER")
+
+
+def _services() -> Dict:
+    return {
+        'transactions': TransactionService(),
+        'categories': CategoryService(),
+        'preferences': ThemeService(),
+        'rules': CategoryRuleService(),
+    }
+
+
+def _seed(services: Dict, rows: int):
+    """Fill the scratch database with a few years of varied transactions."""
+    rng = random.Random(42)
+    names = ["Groceries", "Rent", "Salary", "Utilities", "Travel", "Dining", "Health", "Fuel"]
+    services['categories'].create_many(
+        {'name': name, 'type': 'Income' if name == 'Salary' else 'Expense', 'budget': 500, 'description': ''}
+        for name in names
+    )
+    start = date(2020, 1, 1)
+    services['transactions'].add_transactions((
+        {
+            'type': rng.choice(['Expense', 'Expense', 'Income', 'Transfer']),
+            'amount': rng.randint(1, 50000) / 100,
+            'date': (start + timedelta(days=rng.randint(0, 2500))).isoformat(),
+            'category': rng.choice(names),
+            'account': rng.choice(["Checking", "Savings", "Cash", "Credit Card"]),
+            'description': f"seed {i}",
+        }
+        for i in range(rows)
+    ), return_ids=False)
+    services['preferences'].update("app_theme", "dark")
+    services['rules'].add_rule("Dining", "substring", "seed 1")
+    services['rules'].add_rule("Health", "amount", min_amount=400, transaction_type="Expense")
+    with engine.get_db_connection() as conn:
+        conn.execute("ANALYZE")
+        conn.commit()
+
+
+def _cases(services: Dict) -> List[Tuple[str, Callable, bool, bool]]:
+    """(name, call, allow_scan, allow_temp_sort) for every service query worth guarding."""
+    ts = services['transactions']
+    cs = services['categories']
+    ps = services['preferences']
+    rs = services['rules']
+    rules = rs.compile_rules()
+    sample = ts.get_transactions_page(limit=1)['items'][0]
+    category = cs.get_all()[0]
+    cursor = (sample['date'], sample['id'])
+
+    return [
+        ("BaseService.get_by_id", lambda: ts.get_by_id(sample['id']), False, False),
+        ("BaseService.get_all", lambda: ts.get_all(), True, False),
+        ("BaseService.update", lambda: ts.update(sample['id'], description="checked"), False, False),
+        ("BaseService.delete", lambda: ts.delete("missing-id"), False, False),
+        ("BaseService.update_many", lambda: ts.update_many([(sample['id'], {'description': 'checked'})]), False, False),
+        ("BaseService.delete_many", lambda: ts.delete_many(["missing-id"]), False, False),
+        ("TransactionService.get_dashboard_summary", lambda: ts.get_dashboard_summary(6, 2022), True, False),
+        ("TransactionService.get_spending_breakdown", lambda: ts.get_spending_breakdown(6, 2022), False, True),
+        ("TransactionService.get_recent_transactions", lambda: ts.get_recent_transactions(5), True, False),
+        ("TransactionService.get_by_date", lambda: ts.get_by_date(sample['date']), False, False),
+        ("TransactionService.stream_by_category", lambda: list(ts.stream_by_category("Rent")), False, False),
+        ("TransactionService.stream_transactions", lambda: list(ts.stream_transactions()), True, False),
+        ("TransactionService.get_transactions_by_type", lambda: ts.get_transactions_by_type("Expense"), False, False),
+        ("TransactionService.get_transactions_by_category", lambda: ts.get_transactions_by_category("Rent"), False, False),
+        ("TransactionService.get_transactions_by_account", lambda: ts.get_transactions_by_account("Cash"), False, False),
+        ("TransactionService.get_transactions_by_date_range", lambda: ts.get_transactions_by_date_range("2021-01-01", "2021-03-31"), False, False),
+        ("TransactionService.get_transactions_page", lambda: ts.get_transactions_page(limit=50), True, False),
+        ("TransactionService.get_transactions_page(after)", lambda: ts.get_transactions_page(after=cursor, limit=50), False, False),
+        ("TransactionService.get_transactions_page(type)", lambda: ts.get_transactions_page(transaction_type="Income", after=cursor), False, False),
+        ("TransactionService.get_transactions_page(category)", lambda: ts.get_transactions_page(category="Rent", after=cursor), False, False),
+        ("TransactionService.get_transactions_page(account)", lambda: ts.get_transactions_page(account="Cash", after=cursor), False, False),
+        ("TransactionService.get_transactions_page(range)", lambda: ts.get_transactions_page(start_date="2021-01-01", end_date="2021-03-31"), False, False),
+        ("TransactionService.add_transaction", lambda: ts.add_transaction({**sample, 'description': "plan check"}), False, False),
+        ("TransactionService.get_report_summary", lambda: ts.get_report_summary(start_date="2021-01-15", end_date="2022-03-10"), False, False),
+        ("TransactionService.get_report_summary(filters)", lambda: ts.get_report_summary(transaction_type="Expense", category="Rent", account="Cash", start_date="2021-01-15", end_date="2021-03-10"), False, False),
+        ("TransactionService.get_report_summary(all time)", lambda: ts.get_report_summary(), True, False),
+        *[(f"TransactionService.get_sorted_page({sort_by}{', desc' if descending else ''})",
+           lambda sort_by=sort_by, descending=descending: ts.get_sorted_page(
+               sort_by, descending, ts.sort_key(sample, sort_by), False, limit=200), False, False)
+          for sort_by in SORT_KEYS for descending in (True, False)],
+        ("TransactionService.get_sorted_page(category, uncategorised)",
+         lambda: ts.get_sorted_page('category', False, (None, sample['date'], sample['id']), False), False, False),
+        ("TransactionService.get_sorted_page(filtered)",
+         lambda: ts.get_sorted_page('date', True, ts.sort_key(sample), False, category="Rent"), False, False),
+        *[(f"TransactionService.get_sort_anchors({sort_by})", lambda sort_by=sort_by: ts.get_sort_anchors(sort_by), True, False)
+          for sort_by in SORT_KEYS],
+        ("TransactionService.get_total_by_type", lambda: ts.get_total_by_type("Expense"), False, False),
+        ("TransactionService.get_total_count", lambda: ts.get_total_count(), True, False),
+        # Category reads are served from category_cache, which loads the whole (small) table once.
+        ("CategoryService.get_all", lambda: cs.get_all(), True, False),
+        ("CategoryService.get_by_id", lambda: cs.get_by_id(category['id']), True, False),
+        ("TransactionService.recategorise", lambda: ts.recategorise(rules, batch_size=1000), False, False),
+        ("TransactionService.recategorise(uncategorised)", lambda: ts.recategorise(rules, only_uncategorised=True), False, False),
+        ("CategoryRuleService.get_active_rules", lambda: rs.get_active_rules(), True, True),
+        ("CategoryRuleService.get_by_category", lambda: rs.get_by_category("Dining"), False, False),
+        ("CategoryRuleService.rename_category", lambda: rs.rename_category("Fuel", "Fuel"), False, False),
+        ("ThemeService.get_by_item", lambda: ps.get_by_item("app_theme"), False, False),
+        ("ThemeService.update", lambda: ps.update("app_theme", "dark"), False, False),
+    ]
+
+
+def _plan_problems(conn: sqlite3.Connection, sql: str, allow_scan: bool, allow_temp_sort: bool) -> List[str]:
+    """Returns the offending plan lines for one statement."""
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    problems = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and detail != "SCAN CONSTANT ROW" and not allow_scan:
+            problems.append(detail)
+        if "USE TEMP B-TREE FOR" in detail and "ORDER BY" in detail and not allow_temp_sort:
+            problems.append(detail)
+    return problems
+
+
+def check_query_plans(rows: int = 5000) -> List[str]:
+    """Seeds a scratch database, runs every case and returns one message per regression."""
+    statements: List[str] = []
+
+    def trace(conn: sqlite3.Connection):
+        conn.set_trace_callback(statements.append)
+
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory() as scratch:
+        engine.configure_pool(os.path.join(scratch, "query_plans.db"))
+        try:
+            migrate(progress=lambda message, done, total: None)
+            services = _services()
+            _seed(services, rows)
+            cases = _cases(services)
+
+            engine.configure_pool(os.path.join(scratch, "query_plans.db"), on_connect=trace)
+            with engine.get_db_connection() as conn:
+                conn.set_trace_callback(None)
+                for name, call, allow_scan, allow_temp_sort in cases:
+                    category_cache.invalidate()
+                    query_cache.clear()
+                    statements.clear()
+                    call()
+                    checked = [sql for sql in statements if not sql.lstrip().upper().startswith(IGNORED_PREFIXES)]
+                    if not checked:
+                        failures.append(f"{name}: no SQL was captured")
+                    for sql in checked:
+                        for problem in _plan_problems(conn, sql, allow_scan, allow_temp_sort):
+                            failures.append(f"{name}: {problem}\n    {' '.join(sql.split())}")
+        finally:
+            engine.configure_pool(engine.DB_URL)
+    return failures
+
+
+def main():
+    failures = check_query_plans()
+    if failures:
+        print("==> Query plan regressions:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("==========> All service query plans use their indexes <===========")
+
+
+if __name__ == "__main__":
+    main()
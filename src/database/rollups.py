@@ -0,0 +1,120 @@
+import sqlite3
+from contextlib import contextmanager
+from typing import Optional
+from database.engine import get_db_connection, run_script
+
+
+ROLLUP_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS monthly_totals (
+    ym INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    account TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ym, type, category, account)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_monthly_totals_insert
+AFTER INSERT ON transactions WHEN NEW.is_active = 1
+BEGIN
+    INSERT INTO monthly_totals (ym, type, category, account, total, count)
+    VALUES (NEW.ym, NEW.type, COALESCE(NEW.category, ''), NEW.account, NEW.amount, 1)
+    ON CONFLICT (ym, type, category, account)
+    DO UPDATE SET total = total + excluded.total, count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_monthly_totals_delete
+AFTER DELETE ON transactions WHEN OLD.is_active = 1
+BEGIN
+    UPDATE monthly_totals SET total = total - OLD.amount, count = count - 1
+    WHERE ym = OLD.ym AND type = OLD.type AND category = COALESCE(OLD.category, '') AND account = OLD.account;
+    DELETE FROM monthly_totals
+    WHERE ym = OLD.ym AND type = OLD.type AND category = COALESCE(OLD.category, '') AND account = OLD.account
+        AND count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_monthly_totals_update
+AFTER UPDATE OF type, amount, date, category, account, is_active ON transactions
+BEGIN
+    UPDATE monthly_totals SET total = total - OLD.amount, count = count - 1
+    WHERE OLD.is_active = 1
+        AND ym = OLD.ym AND type = OLD.type AND category = COALESCE(OLD.category, '') AND account = OLD.account;
+    DELETE FROM monthly_totals
+    WHERE OLD.is_active = 1
+        AND ym = OLD.ym AND type = OLD.type AND category = COALESCE(OLD.category, '') AND account = OLD.account
+        AND count <= 0;
+    INSERT INTO monthly_totals (ym, type, category, account, total, count)
+    SELECT NEW.ym, NEW.type, COALESCE(NEW.category, ''), NEW.account, NEW.amount, 1
+    WHERE NEW.is_active = 1
+    ON CONFLICT (ym, type, category, account)
+    DO UPDATE SET total = total + excluded.total, count = count + 1;
+END;
+'''
+
+REBUILD_QUERY = '''
+INSERT INTO monthly_totals (ym, type, category, account, total, count)
+SELECT ym, type, COALESCE(category, ''), account, SUM(amount), COUNT(*)
+FROM transactions
+WHERE is_active = 1
+GROUP BY ym, type, COALESCE(category, ''), account;
+'''
+
+INSERT_TRIGGER = "trg_monthly_totals_insert"
+
+# Folds rows inserted after a rowid watermark into the rollup in one aggregated upsert.
+APPLY_INSERTED_QUERY = '''
+INSERT INTO monthly_totals (ym, type, category, account, total, count)
+SELECT ym, type, COALESCE(category, ''), account, SUM(amount), COUNT(*)
+FROM transactions
+WHERE rowid > ? AND is_active = 1
+GROUP BY ym, type, COALESCE(category, ''), account
+ON CONFLICT (ym, type, category, account)
+DO UPDATE SET total = total + excluded.total, count = count + excluded.count;
+'''
+
+
+def create_rollups(db: sqlite3.Connection):
+    """Create the monthly_totals table and the triggers that keep it current (caller commits)."""
+    run_script(db, ROLLUP_SCHEMA)
+
+
+def rebuild_monthly_totals(db: Optional[sqlite3.Connection] = None):
+    """
+    Recompute monthly_totals from scratch, e.g. after a bulk repair of the transactions table.
+    With `db` given, runs inside the caller's transaction; otherwise commits on its own connection.
+    """
+    if db is not None:
+        db.execute("DELETE FROM monthly_totals")
+        db.execute(REBUILD_QUERY)
+        return
+
+    with get_db_connection() as conn:
+        conn.execute("BEGIN")
+        rebuild_monthly_totals(conn)
+        conn.commit()
+
+
+@contextmanager
+def deferred_insert_rollup(db: sqlite3.Connection):
+    """
+    For bulk inserts inside the caller's transaction: drops the per-row insert
+    trigger, and on exit folds every row inserted meanwhile into monthly_totals
+    with one GROUP BY upsert before recreating the trigger. Nothing is committed;
+    a rollback restores the trigger with everything else.
+    """
+    row = db.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (INSERT_TRIGGER,)).fetchone()
+    if row is None:
+        yield
+        return
+
+    watermark = db.execute("SELECT COALESCE(MAX(rowid), 0) FROM transactions").fetchone()[0]
+    db.execute(f"DROP TRIGGER {INSERT_TRIGGER}")
+    yield
+    db.execute(APPLY_INSERTED_QUERY, (watermark,))
+    db.execute(row[0])
+
+
+if __name__ == "__main__":
+    rebuild_monthly_totals()
+    print("==========> Monthly totals rebuilt successfully <===========")
@@ -1,5 +1,6 @@
 import tkinter as tk
 from tools.utils import Utils
+from tools.money import Money
 from tkinter import ttk, messagebox
 from services.category import CategoryService
 from services.transaction import TransactionService
@@ -33,13 +34,11 @@ class AddTransactionPage:
         ttk.Radiobutton(type_frame, text="Income", value="Income", variable=self.transaction_type, style='Accent.TRadiobutton').pack(side='left', padx=5)
         ttk.Radiobutton(type_frame, text="Transfer", value="Transfer", variable=self.transaction_type, style='Accent.TRadiobutton').pack(side='left', padx=5)
 
-        self.amount_entry = self._create_input_field(self.main_frame, f"Amount ({self.settings.get('currency', '$')})", ttk.Entry, row=2, column=0, large=True)
+        self.amount_caption = tk.StringVar(value=f"Amount ({self.settings.get('currency', '$')})")
+        self.amount_entry = self._create_input_field(self.main_frame, self.amount_caption, ttk.Entry, row=2, column=0, large=True)
         self.date_entry = self._create_input_field(self.main_frame, "Date", ttk.Entry, row=2, column=1, default_text=f"{self.settings.get('date_format', 'YYYY-MM-DD')}", large=True)
 
-        categories_db = self.category_service.get_all()
-        categories = [cat['name'] for cat in categories_db]
-        categories.extend(Utils.get_default_categories())
-        self.category_combo = self._create_dropdown_field(self.main_frame, "Category", categories, row=4, column=0)
+        self.category_combo = self._create_dropdown_field(self.main_frame, "Category", self._category_names(), row=4, column=0)
         
         accounts = ["Checking", "Savings", "Cash", "Credit Card"]
         self.account_combo = self._create_dropdown_field(self.main_frame, "Account", accounts, row=4, column=1)
@@ -51,9 +50,26 @@ class AddTransactionPage:
         ttk.Button(self.main_frame, text="Save Transaction", style='Accent.TButton', command=self.save_transaction).grid(row=8, column=0, columnspan=2, sticky='ew', pady=(30, 10), ipady=10)
 
 
+    def _category_names(self):
+        categories_db = self.category_service.get_all()
+        categories = [cat['name'] for cat in categories_db]
+        categories.extend(Utils.get_default_categories())
+        return categories
+
+    def refresh(self):
+        """Pick up new categories and settings, keeping what has been typed"""
+        self.settings = Utils.load_app_settings()
+        self.amount_caption.set(f"Amount ({self.settings.get('currency', '$')})")
+        categories = self._category_names()
+        self.category_combo['values'] = categories
+        if self.category_combo.get() not in categories and categories:
+            self.category_combo.set(categories[0])
+
     def _create_input_field(self, parent, label_text, widget_class, row, column, large=False, default_text=""):
+        """`label_text` may be a StringVar for a caption that changes later"""
         padx = (0, 15) if column == 0 else (15, 0)
-        ttk.Label(parent, text=label_text, style='H5.TLabel').grid(row=row, column=column, sticky='w', pady=(15, 5), padx=padx)
+        caption = {'textvariable': label_text} if isinstance(label_text, tk.StringVar) else {'text': label_text}
+        ttk.Label(parent, **caption, style='H5.TLabel').grid(row=row, column=column, sticky='w', pady=(15, 5), padx=padx)
         entry = widget_class(parent)
         entry.grid(row=row + 1, column=column, sticky='ew', ipady=(10 if large else 5), padx=padx)
         if default_text:
@@ -78,7 +94,7 @@ class AddTransactionPage:
             return
         
         try:
-            amount_value = float(amount)
+            amount_value = Money.parse(amount)
             if amount_value <= 0:
                 messagebox.showerror("Error", "Amount must be greater than 0")
                 return
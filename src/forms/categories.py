@@ -1,7 +1,14 @@
 import tkinter as tk
 from tools.utils import Utils
+from tools.money import Money
 from tkinter import ttk, messagebox
 from services.category import CategoryService
+from services.category_rule import CategoryRuleService
+from services.transaction import TransactionService
+from forms.category_rules import CategoryRulesDialog
+from forms.progress_dialog import ProgressDialog
+from forms.loading import LoadingIndicator
+from tools.executor import TaskScope
 
 
 class CategoriesPage:
@@ -19,6 +26,9 @@ class CategoriesPage:
         main_frame.grid_rowconfigure(1, weight=1)
 
         ttk.Label(main_frame, text="Manage Categories", style='H2.TLabel').grid(row=0, column=0, sticky='w', pady=(0, 20))
+        self.loading = LoadingIndicator(main_frame)
+        self.loading.frame.grid(row=0, column=0, sticky='e', pady=(0, 20))
+        self.tasks = TaskScope(main_frame, on_busy=self.loading.set_busy)
         
         content_container = ttk.Frame(main_frame)
         content_container.grid(row=1, column=0, sticky='nsew')
@@ -57,6 +67,7 @@ class CategoriesPage:
         self.context_menu = tk.Menu(self.cat_tree, tearoff=0)
         self.context_menu.add_command(label="Edit", command=self.edit_category)
         self.context_menu.add_command(label="Delete", command=self.delete_category)
+        self.context_menu.add_command(label="Rules", command=self.edit_rules)
         
         button_frame = ttk.Frame(list_frame)
         button_frame.grid(row=1, column=0, columnspan=2, sticky='ew')
@@ -64,6 +75,8 @@ class CategoriesPage:
         ttk.Button(button_frame, text="🗑 Delete Selected", command=self.delete_category).pack(side='left', padx=(0, 5))
         ttk.Button(button_frame, text="✏ Edit Selected", command=self.edit_category).pack(side='left', padx=5)
         ttk.Button(button_frame, text="🔄 Refresh", command=self.load_categories).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="⚙ Rules", command=self.edit_rules).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="🏷 Re-categorise All", command=self.recategorise_all).pack(side='left', padx=5)
 
         self.add_frame = ttk.Frame(content_container, style='Card.TFrame', padding="15")
         self.add_frame.grid(row=0, column=1, sticky='nsew', padx=(15, 0))
@@ -99,14 +112,25 @@ class CategoriesPage:
         
         self.load_categories()
 
+    def refresh(self):
+        """Reload the list, which may have changed while the page was hidden"""
+        self.load_categories()
+
+    def on_hide(self):
+        """Stop the list and lookup queries still running, but not a save or delete; True if any were dropped"""
+        return self.tasks.cancel(keep=("save", "delete"))
+
     def load_categories(self):
         """Load all categories from database"""
-        for item in self.cat_tree.get_children():
-            self.cat_tree.delete(item)
-        
-        try:
+        def fetch():
             categories = self.category_service.get_all()
             categories.extend(Utils.get_default_categories())
+            return categories
+
+        def show(categories):
+            for item in self.cat_tree.get_children():
+                self.cat_tree.delete(item)
+
             for cat in categories:
                 if isinstance(cat, str):
                     cat = {
@@ -122,8 +146,9 @@ class CategoriesPage:
                     cat['type'],
                     budget
                 ))
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load categories: {str(e)}")
+
+        self.tasks.submit(fetch, on_done=show, key="categories",
+                          on_error=lambda e: messagebox.showerror("Error", f"Failed to load categories: {str(e)}"))
 
     def on_category_select(self, event):
         """Handle category selection"""
@@ -164,7 +189,7 @@ class CategoriesPage:
         budget = None
         if budget_str:
             try:
-                budget = float(budget_str.replace('$', '').replace(',', ''))
+                budget = Money.parse(budget_str.replace('$', ''))
                 if budget < 0:
                     messagebox.showerror("Error", "Budget must be a positive number")
                     return
@@ -172,41 +197,31 @@ class CategoriesPage:
                 messagebox.showerror("Error", "Invalid budget amount")
                 return
         
-        try:
-            if self.selected_category_id:
-                result = self.category_service.update(
-                    self.selected_category_id,
-                    name=name,
-                    type=cat_type,
-                    budget=budget,
-                    description=description
-                )
-                if result:
-                    messagebox.showinfo("Success", "Category updated successfully!")
-                else:
-                    messagebox.showerror("Error", "Failed to update category")
+        category_id = self.selected_category_id
+        values = {'name': name, 'type': cat_type, 'budget': budget, 'description': description}
+
+        def save():
+            if category_id:
+                return 'updated', self.category_service.update(category_id, **values)
+            if self.category_service.get_by_name(name):
+                return 'exists', None
+            return 'added', self.category_service.create(**values)
+
+        def done(outcome):
+            action, result = outcome
+            if action == 'exists':
+                messagebox.showerror("Error", f"Category '{name}' already exists")
+                return
+            if result:
+                messagebox.showinfo("Success", f"Category {action} successfully!")
             else:
-                existing = self.category_service.get_by_name(name)
-                if existing:
-                    messagebox.showerror("Error", f"Category '{name}' already exists")
-                    return
-                
-                result = self.category_service.create(
-                    name=name,
-                    type=cat_type,
-                    budget=budget,
-                    description=description
-                )
-                if result:
-                    messagebox.showinfo("Success", "Category added successfully!")
-                else:
-                    messagebox.showerror("Error", "Failed to add category")
-            
+                messagebox.showerror("Error", "Failed to update category" if action == 'updated' else "Failed to add category")
+
             self.load_categories()
             self.clear_form()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+        self.tasks.submit(save, on_done=done, key="save",
+                          on_error=lambda e: messagebox.showerror("Error", f"An error occurred: {str(e)}"))
 
     def edit_category(self):
         """Load selected category into form for editing"""
@@ -223,8 +238,7 @@ class CategoriesPage:
             messagebox.showwarning("Warning", "Default categories cannot be edited")
             return
         
-        try:
-            category = self.category_service.get_by_id(values[0])
+        def show(category):
             if category:
                 self.selected_category_id = category['id']
                 self.name_entry.delete(0, tk.END)
@@ -243,8 +257,9 @@ class CategoriesPage:
                 self.save_button.config(text="Update Category")
             else:
                 messagebox.showerror("Error", "Category not found")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load category: {str(e)}")
+
+        self.tasks.submit(self.category_service.get_by_id, values[0], on_done=show, key="edit",
+                          on_error=lambda e: messagebox.showerror("Error", f"Failed to load category: {str(e)}"))
 
     def delete_category(self):
         """Delete selected category"""
@@ -264,15 +279,55 @@ class CategoriesPage:
         if not messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete '{category_name}'?"):
             return
         
-        try:
-            if self.category_service.delete(values[0]):
+        def done(deleted):
+            if deleted:
                 messagebox.showinfo("Success", "Category deleted successfully!")
                 self.load_categories()
                 self.clear_form()
             else:
                 messagebox.showerror("Error", "Failed to delete category")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+        self.tasks.submit(self.category_service.delete, values[0], on_done=done, key="delete",
+                          on_error=lambda e: messagebox.showerror("Error", f"An error occurred: {str(e)}"))
+
+    def edit_rules(self):
+        """Open the auto-categorisation rules of the selected category"""
+        selection = self.cat_tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", "Please select a category to edit its rules")
+            return
+        CategoryRulesDialog(self.master, self.cat_tree.item(selection[0])['values'][1])
+
+    def recategorise_all(self):
+        """Apply the auto-categorisation rules to every existing transaction"""
+        self.tasks.submit(CategoryRuleService().compile_rules, on_done=self._confirm_recategorise, key="rules",
+                          on_error=lambda e: messagebox.showerror("Error", f"Failed to load rules: {str(e)}"))
+
+    def _confirm_recategorise(self, rules):
+        if not rules:
+            messagebox.showinfo("Info", "No rules defined yet. Select a category and add rules first.")
+            return
+        if not messagebox.askyesno("Confirm Re-categorise",
+                                   f"Apply {len(rules)} rules to all transactions?\n\n"
+                                   "Transactions matching a rule get that rule's category."):
+            return
+
+        transaction_service = TransactionService()
+
+        def task(progress, cancel):
+            return transaction_service.recategorise(rules, progress=progress, cancel=cancel)
+
+        def on_done(result, error):
+            if error is not None:
+                messagebox.showerror("Error", f"Failed to re-categorise: {str(error)}")
+            elif result['cancelled']:
+                messagebox.showinfo("Cancelled", f"Re-categorising stopped after {result['scanned']:,} transactions "
+                                                 f"({result['updated']:,} changed).")
+            else:
+                messagebox.showinfo("Success", f"Scanned {result['scanned']:,} transactions, "
+                                               f"{result['updated']:,} re-categorised.")
+
+        ProgressDialog(self.master, "Re-categorising", "Applying rules...").run(task, on_done)
 
     def clear_form(self):
         """Clear form and reset to add mode"""
@@ -0,0 +1,144 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from tools.money import Money
+from tools.categoriser import RULE_KINDS
+from services.category_rule import CategoryRuleService
+
+
+class CategoryRulesDialog:
+    """
+    Lists and edits the auto-categorisation rules of one category. Rules match
+    the description (substring or regex, case-insensitive) and may be limited
+    to an amount range and a transaction type; amount rules match on the range
+    alone. Lower priority numbers are tried first.
+    """
+
+    def __init__(self, parent, category: str):
+        self.category = category
+        self.rule_service = CategoryRuleService()
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"Rules for {category}")
+        self.window.transient(parent.winfo_toplevel())
+        self.window.grid_columnconfigure(0, weight=1)
+        self.window.grid_rowconfigure(0, weight=1)
+
+        list_frame = ttk.Frame(self.window, padding="15 15 15 5")
+        list_frame.grid(row=0, column=0, sticky='nsew')
+        list_frame.grid_columnconfigure(0, weight=1)
+        list_frame.grid_rowconfigure(0, weight=1)
+
+        columns = ('id', 'kind', 'pattern', 'min', 'max', 'type', 'priority')
+        self.rule_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=8)
+        self.rule_tree.column('id', width=0, stretch=False)
+        for column, text, width in (('kind', 'Kind', 80), ('pattern', 'Pattern', 180), ('min', 'Min', 70),
+                                    ('max', 'Max', 70), ('type', 'Type', 80), ('priority', 'Priority', 60)):
+            self.rule_tree.column(column, width=width)
+            self.rule_tree.heading(column, text=text)
+        self.rule_tree.grid(row=0, column=0, sticky='nsew')
+
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.rule_tree.yview)
+        scrollbar.grid(row=0, column=1, sticky='ns')
+        self.rule_tree.configure(yscrollcommand=scrollbar.set)
+
+        ttk.Button(list_frame, text="🗑 Delete Selected", command=self.delete_rule).grid(row=1, column=0, sticky='w', pady=(10, 0))
+
+        form = ttk.Frame(self.window, padding="15 5 15 15")
+        form.grid(row=1, column=0, sticky='ew')
+        for column in range(4):
+            form.grid_columnconfigure(column, weight=1)
+
+        ttk.Label(form, text="Kind", style='H5.TLabel').grid(row=0, column=0, sticky='w')
+        self.kind_combo = ttk.Combobox(form, values=list(RULE_KINDS), state="readonly", width=12)
+        self.kind_combo.grid(row=1, column=0, sticky='ew', padx=(0, 5))
+        self.kind_combo.set(RULE_KINDS[0])
+
+        ttk.Label(form, text="Pattern", style='H5.TLabel').grid(row=0, column=1, columnspan=3, sticky='w')
+        self.pattern_entry = ttk.Entry(form)
+        self.pattern_entry.grid(row=1, column=1, columnspan=3, sticky='ew')
+
+        ttk.Label(form, text="Min amount", style='H5.TLabel').grid(row=2, column=0, sticky='w', pady=(8, 0))
+        self.min_entry = ttk.Entry(form, width=10)
+        self.min_entry.grid(row=3, column=0, sticky='ew', padx=(0, 5))
+
+        ttk.Label(form, text="Max amount", style='H5.TLabel').grid(row=2, column=1, sticky='w', pady=(8, 0))
+        self.max_entry = ttk.Entry(form, width=10)
+        self.max_entry.grid(row=3, column=1, sticky='ew', padx=(0, 5))
+
+        ttk.Label(form, text="Type", style='H5.TLabel').grid(row=2, column=2, sticky='w', pady=(8, 0))
+        self.type_combo = ttk.Combobox(form, values=["Any", "Expense", "Income", "Transfer"], state="readonly", width=10)
+        self.type_combo.grid(row=3, column=2, sticky='ew', padx=(0, 5))
+        self.type_combo.set("Any")
+
+        ttk.Label(form, text="Priority", style='H5.TLabel').grid(row=2, column=3, sticky='w', pady=(8, 0))
+        self.priority_entry = ttk.Entry(form, width=6)
+        self.priority_entry.grid(row=3, column=3, sticky='ew')
+        self.priority_entry.insert(0, "100")
+
+        ttk.Button(form, text="Add Rule", style='Accent.TButton', command=self.add_rule).grid(
+            row=4, column=0, columnspan=4, sticky='ew', pady=(12, 0), ipady=6)
+
+        self.load_rules()
+
+    def load_rules(self):
+        """Reload the rules of this category"""
+        for item in self.rule_tree.get_children():
+            self.rule_tree.delete(item)
+        try:
+            for rule in self.rule_service.get_by_category(self.category):
+                self.rule_tree.insert('', 'end', values=(
+                    rule['id'],
+                    rule['kind'],
+                    rule.get('pattern') or "",
+                    rule['min_amount'] if rule.get('min_amount') is not None else "",
+                    rule['max_amount'] if rule.get('max_amount') is not None else "",
+                    rule.get('transaction_type') or "Any",
+                    rule['priority'],
+                ))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load rules: {str(e)}", parent=self.window)
+
+    @staticmethod
+    def _amount(value: str):
+        value = value.strip().replace('$', '')
+        return Money.parse(value) if value else None
+
+    def add_rule(self):
+        """Validate the form and store a new rule"""
+        try:
+            priority = int(self.priority_entry.get().strip() or 100)
+            rule_type = self.type_combo.get()
+            result = self.rule_service.add_rule(
+                self.category,
+                self.kind_combo.get(),
+                pattern=self.pattern_entry.get(),
+                min_amount=self._amount(self.min_entry.get()),
+                max_amount=self._amount(self.max_entry.get()),
+                transaction_type=None if rule_type == "Any" else rule_type,
+                priority=priority,
+            )
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self.window)
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {str(e)}", parent=self.window)
+            return
+
+        if not result:
+            messagebox.showerror("Error", "Failed to add rule", parent=self.window)
+            return
+        for entry in (self.pattern_entry, self.min_entry, self.max_entry):
+            entry.delete(0, tk.END)
+        self.load_rules()
+
+    def delete_rule(self):
+        """Delete the selected rule"""
+        selection = self.rule_tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", "Please select a rule to delete", parent=self.window)
+            return
+        try:
+            self.rule_service.delete(self.rule_tree.item(selection[0])['values'][0])
+            self.load_rules()
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {str(e)}", parent=self.window)
@@ -0,0 +1,80 @@
+from tkinter import ttk
+from typing import Callable, Dict, Optional
+
+from tools.chart_cache import ChartSize, chart_cache, fit_chart_size
+from tools.executor import TaskScope
+
+
+# Wait (ms) for a resize to settle before re-rendering the chart.
+CHART_RESIZE_DELAY_MS = 200
+
+
+class ChartView:
+    """
+    Shows a chart rendered by `chart_cache` inside `frame`, sized to fit it.
+    Pages read `size()` on the Tk thread, render at that size on a worker and
+    hand the PNG to `show`. When `frame` is later resized into another
+    CHART_SIZE_STEP bucket, the chart is rendered again on `tasks` and swapped
+    in. With `fixed_height` only the width follows the frame (for frames whose
+    height comes from their content); otherwise both do. `default_size` is
+    used until the frame has been laid out.
+    """
+
+    def __init__(self, frame, tasks: TaskScope, kind: str, draw: Callable, default_size: ChartSize,
+                 padding: int = 0, fixed_height: bool = False):
+        self.frame = frame
+        self.tasks = tasks
+        self.kind = kind
+        self.draw = draw
+        self.default_size = default_size
+        self.padding = padding
+        self.fixed_height = fixed_height
+        self._chart: Optional[tuple] = None
+        self._resize_job = None
+        frame.bind('<Configure>', self._on_configure, add='+')
+
+    def size(self) -> ChartSize:
+        """The chart size that fills the frame right now."""
+        default_width, default_height, dpi = self.default_size
+        width = self.frame.winfo_width() - 2 * self.padding
+        if width <= 1:
+            return self.default_size
+        height = default_height * dpi if self.fixed_height else self.frame.winfo_height() - 2 * self.padding
+        return fit_chart_size(width, int(height), dpi)
+
+    def show(self, png: Optional[bytes], data: Optional[Dict] = None, theme: str = "", size: Optional[ChartSize] = None,
+             empty_text: str = ""):
+        """Show a chart rendered from `data` at `size`, or `empty_text` when `png` is None."""
+        self.tasks.discard(f"chart:{self.kind}")
+        for widget in self.frame.winfo_children():
+            widget.destroy()
+
+        if png is None:
+            self._chart = None
+            ttk.Label(self.frame, text=empty_text, style='H6.TLabel').pack(pady=50)
+            return
+
+        self._chart = (data, theme, size)
+        image = chart_cache.photo(png, master=self.frame)
+        chart_label = ttk.Label(self.frame, image=image)
+        chart_label.image = image
+        chart_label.pack(fill='both', expand=True, padx=self.padding, pady=self.padding)
+
+    def _on_configure(self, event):
+        if str(event.widget) != str(self.frame) or self._chart is None:
+            return
+        if self._resize_job is not None:
+            self.frame.after_cancel(self._resize_job)
+        self._resize_job = self.frame.after(CHART_RESIZE_DELAY_MS, self._resize)
+
+    def _resize(self):
+        self._resize_job = None
+        if self._chart is None or not self.frame.winfo_exists():
+            return
+        data, theme, shown = self._chart
+        size = self.size()
+        if size == shown:
+            return
+        self.tasks.submit(chart_cache.render, self.kind, data, theme, size, self.draw, key=f"chart:{self.kind}",
+                          on_done=lambda png: self.show(png, data, theme, size),
+                          on_error=lambda e: print(f"Error resizing chart: {e}"))
@@ -1,21 +1,30 @@
 import sv_ttk
 import tkinter as tk
-import matplotlib.pyplot as plt
 
 from tkinter import ttk
 from datetime import datetime
 from matplotlib.gridspec import GridSpec
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 from tools.utils import Utils
+from tools.settings_store import SETTINGS_WATCH_MS, settings_store
+from tools.chart_cache import chart_cache
+from tools.executor import TaskScope
+from forms.loading import LoadingIndicator
+from forms.chart_view import ChartView
 from forms.reports import ReportsPage
 from forms.settings import SettingsPage
 from tools.theme_tools import ThemeManager
+from forms.page_manager import PageManager
 from forms.categories import CategoriesPage
 from services.transaction import TransactionService
 from forms.add_transaction import AddTransactionPage
 
 
+# (width in inches, height in inches, dpi) of the monthly spending chart before the page is laid out;
+# afterwards it fills its card.
+SPENDING_CHART_SIZE = (7, 4.5, 100)
+
+
 class DashboardPage:
     def __init__(self, master):
         self.master = master
@@ -40,16 +49,11 @@ class DashboardPage:
         master.grid_rowconfigure(0, weight=1)
 
         self.theme_manager.apply_theme()
+        # Subscribed before the pages, so a theme change is applied before they refresh.
+        settings_store.subscribe(self._on_settings_changed)
         
         self.chart_data = {}
 
-        self.pages = {
-            "dashboard": DashboardPage,
-            "add": AddTransactionPage,
-            "reports": ReportsPage,
-            "categories": CategoriesPage,
-            "settings": SettingsPage,
-        }
 
         self.sidebar_frame = ttk.Frame(master, padding="15 10")
         self.sidebar_frame.grid(row=0, column=0, sticky="nsew")
@@ -75,7 +79,7 @@ class DashboardPage:
             btn.pack(fill='x', ipady=10, pady=4)
             self.nav_widgets[page] = btn
 
-        app_theme = self.settings.get("theme", "dark")
+        app_theme = self.theme_manager.theme
         self.theme_check = ttk.Checkbutton(
             self.sidebar_frame,
             text="🌙 Dark Mode" if app_theme == "dark" else "☀ Light Mode",
@@ -91,6 +95,13 @@ class DashboardPage:
 
         self.center_frame = ttk.Frame(master, padding="20")
         self.center_frame.grid(row=0, column=1, sticky="nsew")
+        self.pages = PageManager(self.center_frame, {
+            "dashboard": self._create_dashboard,
+            "add": AddTransactionPage,
+            "reports": ReportsPage,
+            "categories": CategoriesPage,
+            "settings": SettingsPage,
+        })
 
         self.right_frame = ttk.Frame(master, padding="20 15")
         self.right_frame.grid(row=0, column=2, sticky="nsew")
@@ -100,6 +111,7 @@ class DashboardPage:
 
         self.load_page("dashboard")
         self.is_initialized = True
+        self.master.after(SETTINGS_WATCH_MS, self._watch_settings)
 
     def _set_active_button(self, active_page):
         for page, btn in self.nav_widgets.items():
@@ -109,76 +121,110 @@ class DashboardPage:
                 btn.config(style='TButton')
 
     def load_page(self, page_name):
-        for widget in self.center_frame.winfo_children():
-            widget.destroy()
-
         self._set_active_button(page_name)
 
         if page_name == "dashboard":
-            self._load_dashboard()
             self.right_frame.grid()
             self.master.grid_columnconfigure(2, weight=0, minsize=300)
         else:
             self.right_frame.grid_remove()
             self.master.grid_columnconfigure(2, weight=0, minsize=0)
-            page_class = self.pages.get(page_name)
-            if page_class:
-                page_class(self.center_frame)
+        self.pages.show(page_name)
 
-    def _load_dashboard(self):
-        now = datetime.now()
-        self.settings = Utils.load_app_settings()
+    def _create_dashboard(self, dashboard_frame):
+        """Build the dashboard widgets once; `refresh` fills them in"""
+        currency = self.settings.get('currency', '$')
 
-        summary = self.transaction_service.get_dashboard_summary(now.month, now.year)
-        total_balance = summary['total_balance']
-        monthly_expenses = summary['monthly_expenses']
-        monthly_income = summary['monthly_income']
-        
-        self.chart_data = self.transaction_service.get_spending_breakdown(now.month, now.year)
-
-        self.center_frame.grid_columnconfigure(0, weight=1)
-        self.center_frame.grid_rowconfigure(2, weight=1)
+        dashboard_frame.grid_columnconfigure(0, weight=1)
+        dashboard_frame.grid_rowconfigure(2, weight=1)
 
-        self.balance_card = ttk.Frame(self.center_frame, style='Card.TFrame', padding="20")
+        self.balance_card = ttk.Frame(dashboard_frame, style='Card.TFrame', padding="20")
         self.balance_card.grid(row=0, column=0, sticky="ew", pady=(0, 20))
 
         ttk.Label(self.balance_card, text="CURRENT BALANCE", style='H4.TLabel').pack(anchor='w')
         
-        ttk.Label(
+        self.balance_label = ttk.Label(
             self.balance_card, 
-            text=f"{self.settings.get('currency', '$')}{total_balance:,.2f}",
-            font=("Helvetica", 30, "bold"),
-            foreground=self._get_color('success' if total_balance >= 0 else 'error')
-        ).pack(anchor='w', pady=(5, 10))
+            text=f"{currency}…",
+            font=("Helvetica", 30, "bold")
+        )
+        self.balance_label.pack(anchor='w', pady=(5, 10))
         
-        metrics_frame = ttk.Frame(self.center_frame)
+        metrics_frame = ttk.Frame(dashboard_frame)
         metrics_frame.grid(row=1, column=0, sticky="ew", pady=(0, 20))
         metrics_frame.grid_columnconfigure(0, weight=1)
         metrics_frame.grid_columnconfigure(1, weight=1)
 
-        self._create_metric_card(metrics_frame, 0, "MONTHLY EXPENSES", f"{self.settings.get('currency', '$')}{monthly_expenses:,.2f}", "error")
-        self._create_metric_card(metrics_frame, 1, "MONTHLY INCOME", f"{self.settings.get('currency', '$')}{monthly_income:,.2f}", "success")
+        self.expenses_label = self._create_metric_card(metrics_frame, 0, "MONTHLY EXPENSES", f"{currency}…", "error")
+        self.income_label = self._create_metric_card(metrics_frame, 1, "MONTHLY INCOME", f"{currency}…", "success")
 
-        chart_frame = ttk.Frame(self.center_frame, style='Card.TFrame', padding="20")
-        chart_frame.grid(row=2, column=0, sticky="nsew")
-        
-        ttk.Label(chart_frame, text="Monthly Spending Breakdown", style='H4.TLabel').pack(anchor='w', pady=(0, 10))
+        self.chart_frame = ttk.Frame(dashboard_frame, style='Card.TFrame', padding="20")
+        self.chart_frame.grid(row=2, column=0, sticky="nsew")
         
-        self._create_spending_chart(chart_frame)
+        ttk.Label(self.chart_frame, text="Monthly Spending Breakdown", style='H4.TLabel').pack(anchor='w', pady=(0, 10))
 
-    def _create_spending_chart(self, parent_frame):
+        loading = LoadingIndicator(self.chart_frame)
+        loading.frame.pack(anchor='w')
+        self.chart_body = ttk.Frame(self.chart_frame)
+        self.chart_body.pack(fill='both', expand=True)
+
+        self.dashboard_tasks = TaskScope(dashboard_frame, on_busy=loading.set_busy)
+        self.spending_chart = ChartView(self.chart_body, self.dashboard_tasks, "spending", self._draw_spending_chart,
+                                        SPENDING_CHART_SIZE, padding=10)
+        self.refresh()
+        return self
+
+    def refresh(self):
+        """Reload the figures, the chart and the recent transactions"""
+        now = datetime.now()
+        self.dashboard_tasks.submit(self._fetch_dashboard, now.month, now.year, sv_ttk.get_theme(),
+                                    self.spending_chart.size(), key="dashboard",
+                                    on_done=self._show_dashboard, on_error=self._show_load_error)
+        self.right_tasks.submit(self.transaction_service.get_recent_transactions, limit=5,
+                                on_done=self._show_recent_transactions, key="recent")
+
+    def on_hide(self):
+        """Stop the dashboard and recent-transactions queries still running; True if any were dropped"""
+        dropped = self.dashboard_tasks.cancel()
+        return self.right_tasks.cancel() or dropped
+
+    def _fetch_dashboard(self, month, year, theme, chart_size):
+        """Worker-thread part of the dashboard: everything it needs from disk, and the chart rendered at `chart_size`"""
+        settings = Utils.load_app_settings()
+        summary = self.transaction_service.get_dashboard_summary(month, year)
+        chart_data = self.transaction_service.get_spending_breakdown(month, year)
+        chart = None
+        if chart_data:
+            chart = chart_cache.render("spending", chart_data, theme, chart_size, self._draw_spending_chart)
+        return settings, summary, chart_data, chart, theme, chart_size
+
+    def _show_dashboard(self, data):
+        self.settings, summary, self.chart_data, chart, theme, chart_size = data
+        currency = self.settings.get('currency', '$')
+        total_balance = summary['total_balance']
+
+        self.balance_label.config(text=f"{currency}{total_balance:,.2f}",
+                                  foreground=self._get_color('success' if total_balance >= 0 else 'error'))
+        self.expenses_label.config(text=f"{currency}{summary['monthly_expenses']:,.2f}",
+                                   foreground=self._get_color('error'))
+        self.income_label.config(text=f"{currency}{summary['monthly_income']:,.2f}",
+                                 foreground=self._get_color('success'))
+
+        self.spending_chart.show(chart, self.chart_data, theme, chart_size,
+                                 empty_text="No expense data for this month.")
+
+    def _show_load_error(self, error):
+        self.spending_chart.show(None, empty_text=f"Failed to load the dashboard: {error}")
+
+    @staticmethod
+    def _draw_spending_chart(fig, chart_data, theme):
         """
-        Creates a Matplotlib pie chart with the legend/categories placed on the 
+        Draws a pie chart with the legend/categories placed on the 
         left side of the chart using GridSpec for precise positioning.
         """
-        categories = list(self.chart_data.keys())
-        amounts = list(self.chart_data.values())
-
-        if not amounts:
-             ttk.Label(parent_frame, text="No expense data for this month.", style='H6.TLabel').pack(pady=50)
-             return
+        categories = list(chart_data.keys())
+        amounts = [float(amount) for amount in chart_data.values()]
 
-        fig = plt.Figure(figsize=(7, 4.5), dpi=100)
         gs = GridSpec(1, 2, figure=fig, width_ratios=[1, 2], wspace=0.1) 
         
         ax_pie = fig.add_subplot(gs[0, 1])
@@ -200,6 +246,7 @@ class DashboardPage:
         
         ax_pie.axis('equal')
         
+        legend_color = 'white' if theme == 'dark' else 'black'
         ax_legend.legend(
             wedges,
             categories,
@@ -208,17 +255,11 @@ class DashboardPage:
             frameon=False,
             title_fontsize='large',
             fontsize='medium',
-            labelcolor='black',
-        )
+            labelcolor=legend_color,
+        ).get_title().set_color(legend_color)
 
         ax_legend.axis('off')
         fig.subplots_adjust(wspace=0.1)
-        
-        canvas = FigureCanvasTkAgg(fig, master=parent_frame)
-        canvas_widget = canvas.get_tk_widget()
-        
-        canvas_widget.pack(fill='both', expand=True, padx=10, pady=10)
-        canvas.draw()
 
     def _create_right_panel(self):
         ttk.Button(self.right_frame, text="+ New Expense", style='Accent.TButton', 
@@ -233,8 +274,18 @@ class DashboardPage:
         self.tree.column('category', width=130, stretch=tk.YES)
         self.tree.column('amount', width=130, stretch=tk.YES, anchor='e')
         
-        recent_transactions = self.transaction_service.get_recent_transactions(limit=5)
-        
+        self.right_tasks = TaskScope(self.right_frame)
+
+        self.tree.tag_configure('error', foreground='#F44336')
+        self.tree.tag_configure('success', foreground='#4CAF50')
+        self.tree.tag_configure('info', foreground='#2196F3')
+
+        self.tree.pack(fill='both', expand=True)
+
+    def _show_recent_transactions(self, recent_transactions):
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
         for t in recent_transactions:
             category = t.get('category', 'N/A')
             amount = t['amount']
@@ -244,27 +295,26 @@ class DashboardPage:
 
             self.tree.insert('', 'end', values=(category, f"{self.settings.get('currency', '$')}{amount:.2f}"), tags=(color_tag,))
 
-        self.tree.tag_configure('error', foreground='#F44336')
-        self.tree.tag_configure('success', foreground='#4CAF50')
-        self.tree.tag_configure('info', foreground='#2196F3')
-
-        self.tree.pack(fill='both', expand=True)
-
     def toggle_theme(self):
-        current_theme = sv_ttk.get_theme()
-        if current_theme == "dark":
-            sv_ttk.set_theme("light")
-            self.theme_manager.save_theme_preference("light")
-            self.theme_manager.apply_theme()
-            self.theme_check.config(text="☀ Light Mode")
-        else:
-            sv_ttk.set_theme("dark")
-            self.theme_manager.save_theme_preference("dark")
-            self.theme_manager.apply_theme()
+        self.theme_manager.save_theme_preference("light" if sv_ttk.get_theme() == "dark" else "dark")
+
+    def _on_settings_changed(self, changed):
+        """Apply a theme chosen here, on the settings page or in the settings file"""
+        if "theme" not in changed or changed["theme"] == sv_ttk.get_theme():
+            return
+        self.theme_manager.theme = changed["theme"]
+        self.theme_manager.apply_theme()
+        if changed["theme"] == "dark":
+            self.theme_check.state(['selected'])
             self.theme_check.config(text="🌙 Dark Mode")
-        
-        if self.is_initialized and self.master.title().startswith("Expense Tracker"):
-            self.load_page("dashboard")
+        else:
+            self.theme_check.state(['!selected'])
+            self.theme_check.config(text="☀ Light Mode")
+
+    def _watch_settings(self):
+        """Pick up edits to the settings file made outside the app"""
+        settings_store.reload_if_changed()
+        self.master.after(SETTINGS_WATCH_MS, self._watch_settings)
 
     def _create_metric_card(self, parent, column, title, value, color_tag):
         card = ttk.Frame(parent, style='Card.TFrame', padding="15")
@@ -272,10 +322,11 @@ class DashboardPage:
         
         ttk.Label(card, text=title, style='H5.TLabel').pack(anchor='w')
         
-        ttk.Label(card, text=value, font=("Helvetica", 20, "bold"), 
-                  foreground=self._get_color(color_tag)).pack(anchor='w')
+        value_label = ttk.Label(card, text=value, font=("Helvetica", 20, "bold"), 
+                                foreground=self._get_color(color_tag))
+        value_label.pack(anchor='w')
         
-        return card
+        return value_label
 
     def _get_color(self, tag):
         if sv_ttk.get_theme() == 'dark':
@@ -0,0 +1,25 @@
+from tkinter import ttk
+
+
+class LoadingIndicator:
+    """
+    A caption with an indeterminate progress bar, visible only while busy.
+    Place `frame` with any geometry manager and pass `set_busy` as a TaskScope's `on_busy`.
+    """
+
+    def __init__(self, parent, text: str = "Loading..."):
+        self.frame = ttk.Frame(parent)
+        self.label = ttk.Label(self.frame, text=text, style='H5.TLabel')
+        self.progress_bar = ttk.Progressbar(self.frame, length=120, mode='indeterminate')
+
+    def set_busy(self, busy: bool):
+        if not self.frame.winfo_exists():
+            return
+        if busy:
+            self.label.pack(side='left', padx=(0, 8))
+            self.progress_bar.pack(side='left')
+            self.progress_bar.start(10)
+        else:
+            self.progress_bar.stop()
+            self.progress_bar.pack_forget()
+            self.label.pack_forget()
@@ -0,0 +1,82 @@
+from tkinter import ttk
+from typing import Callable, Dict, Optional
+
+from tools.settings_store import settings_store
+from database.engine import get_data_generation
+
+
+class PageManager:
+    """
+    Keeps one instance of every page alive inside `container`. Each page is
+    built on first visit in a frame of its own; switching pages hides and
+    shows those frames instead of destroying and rebuilding widgets. A page
+    is only asked to `refresh()` when something it shows may have changed
+    while it was hidden: rows written to the database or the app settings
+    (theme included). Settings changes reach the visible page at once,
+    through its `on_settings_changed(changed)` if it has one, else `refresh()`.
+    A page being hidden gets `on_hide()` if it has one, to cancel the work it
+    still has running; when that returns True the page dropped something and
+    is refreshed on its next show.
+    """
+
+    def __init__(self, container, pages: Dict[str, Callable]):
+        self.container = container
+        self.factories = pages
+        self.pages: Dict[str, object] = {}
+        self.frames: Dict[str, ttk.Frame] = {}
+        self.seen: Dict[str, tuple] = {}
+        self.current: Optional[str] = None
+
+        container.grid_columnconfigure(0, weight=1)
+        container.grid_rowconfigure(0, weight=1)
+        settings_store.subscribe(self._on_settings_changed)
+
+    @staticmethod
+    def _state() -> tuple:
+        """What the pages' content depends on, cheap enough to check on every switch."""
+        return get_data_generation(), settings_store.version
+
+    def _on_settings_changed(self, changed):
+        if self.current is None or not self.container.winfo_exists():
+            return
+        page = self.pages[self.current]
+        handler = getattr(page, 'on_settings_changed', None)
+        if handler is not None:
+            handler(changed)
+        elif getattr(page, 'refresh', None) is not None:
+            page.refresh()
+        self.seen[self.current] = self._state()
+
+    def show(self, name: str):
+        """Show page `name`, building it on first use and refreshing it if it is out of date."""
+        if name not in self.factories:
+            return None
+        if self.current is not None and self.current != name:
+            self._hide(self.current)
+
+        state = self._state()
+        if name not in self.pages:
+            frame = ttk.Frame(self.container)
+            frame.grid(row=0, column=0, sticky='nsew')
+            self.frames[name] = frame
+            self.pages[name] = self.factories[name](frame)
+        else:
+            self.frames[name].grid()
+            if self.seen.get(name) != state:
+                refresh = getattr(self.pages[name], 'refresh', None)
+                if refresh is not None:
+                    refresh()
+        self.seen[name] = state
+        self.current = name
+        return self.pages[name]
+
+    def _hide(self, name: str):
+        self.frames[name].grid_remove()
+        on_hide = getattr(self.pages[name], 'on_hide', None)
+        if on_hide is not None and on_hide():
+            self.seen.pop(name, None)
+
+    def invalidate(self, name: Optional[str] = None):
+        """Make the next `show` of page `name` (or of every page) refresh it."""
+        for page in ([name] if name else list(self.seen)):
+            self.seen.pop(page, None)
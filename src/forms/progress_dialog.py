@@ -0,0 +1,98 @@
+import threading
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable, Optional
+
+
+class ProgressDialog:
+    """
+    A small modal window with a progress bar and a Cancel button that runs
+    `task(progress, cancel_event)` on a worker thread. The task reports through
+    `progress(done, total)` (total 0 means unknown) and should stop once
+    `cancel_event` is set. `progress(done, total, phase)` announces a final
+    step that reports no progress and cannot be cancelled: the window then
+    shows `phase` with an indeterminate bar and disables Cancel. When the
+    task ends, the window closes and `on_done(result, error)` runs on the Tk
+    thread. `describe(done, total)` formats the counter shown next to the
+    message (rows by default).
+    """
+
+    def __init__(self, parent, title: str, message: str,
+                 describe: Optional[Callable[[int, int], str]] = None):
+        self.parent = parent
+        self.message = message
+        self.describe = describe or (lambda done, total: f"{done:,} / {total:,}" if total else f"{done:,}")
+        self.cancel_event = threading.Event()
+        self._state = {'done': 0, 'total': 0, 'phase': None}
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.resizable(False, False)
+        self.window.transient(parent.winfo_toplevel())
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.message_label = ttk.Label(self.window, text=message, padding="20 15 20 5")
+        self.message_label.pack(fill='x')
+        self.progress_bar = ttk.Progressbar(self.window, length=360, mode='indeterminate')
+        self.progress_bar.pack(padx=20, pady=5)
+        self.progress_bar.start(10)
+        self.cancel_button = ttk.Button(self.window, text="Cancel", command=self.cancel)
+        self.cancel_button.pack(pady=(5, 15))
+        self._grab()
+
+    def _grab(self):
+        """Route all input to this window while the task runs; retried until the window is viewable."""
+        if not self.window.winfo_exists():
+            return
+        try:
+            self.window.grab_set()
+            self.window.focus_set()
+        except tk.TclError:
+            self.window.after(50, self._grab)
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.cancel_button.config(state='disabled')
+        self.message_label.config(text="Cancelling...")
+
+    def _report(self, done: int, total: int, phase: Optional[str] = None):
+        self._state.update(done=done, total=total, phase=phase)
+
+    def run(self, task: Callable[[Callable[[int, int], None], threading.Event], Any],
+            on_done: Callable[[Optional[Any], Optional[Exception]], None]) -> threading.Thread:
+        result = {'value': None, 'error': None}
+
+        def worker():
+            try:
+                result['value'] = task(self._report, self.cancel_event)
+            except Exception as e:
+                result['error'] = e
+
+        def poll():
+            done, total, phase = self._state['done'], self._state['total'], self._state['phase']
+            if phase is not None:
+                if str(self.progress_bar['mode']) != 'indeterminate':
+                    self.progress_bar.config(mode='indeterminate')
+                    self.progress_bar.start(10)
+                self.cancel_button.config(state='disabled')
+                self.message_label.config(text=f"{phase}...")
+            elif not self.cancel_event.is_set():
+                if total:
+                    if str(self.progress_bar['mode']) != 'determinate':
+                        self.progress_bar.stop()
+                        self.progress_bar.config(mode='determinate', maximum=total)
+                    self.progress_bar['value'] = min(done, total)
+                if done or total:
+                    self.message_label.config(text=f"{self.message} ({self.describe(done, total)})")
+
+            if thread.is_alive():
+                self.window.after(100, poll)
+                return
+            self.window.grab_release()
+            self.window.destroy()
+            on_done(result['value'], result['error'])
+
+        thread = threading.Thread(target=worker, name="progress-task", daemon=True)
+        thread.start()
+        self.window.after(100, poll)
+        return thread
@@ -1,15 +1,24 @@
-import csv
+import sv_ttk
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import ttk, messagebox
-from collections import defaultdict
-from matplotlib.figure import Figure
 from datetime import datetime, timedelta
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 from tools.utils import Utils
+from tools.chart_cache import chart_cache
+from tools.export import EXPORT_FILETYPES, REPORT_EXPORT_COLUMNS, ExportCancelled, write_csv
 from services.category import CategoryService
-from services.transaction import TransactionService
+from services.transaction import SORT_KEYS, TransactionService
+from tools.executor import TaskScope
+from forms.loading import LoadingIndicator
+from forms.chart_view import ChartView
+from forms.virtual_table import VirtualTable
+from forms.progress_dialog import ProgressDialog
+
+
+# (width in inches, height in inches, dpi) of the expense breakdown chart; once the page is laid
+# out its width follows the chart card and the height stays.
+REPORT_CHART_SIZE = (8, 4, 80)
 
 
 class ReportsPage:
@@ -49,7 +58,6 @@ class ReportsPage:
         self.category_var = tk.StringVar(value="All Categories")
         self.category_combo = ttk.Combobox(self.filter_frame, textvariable=self.category_var, state='readonly')
         self.category_combo.pack(fill='x', ipady=5)
-        self.load_categories()
 
         ttk.Label(self.filter_frame, text="Account", style='H5.TLabel').pack(anchor='w', pady=(20, 5))
         self.account_var = tk.StringVar(value="All Accounts")
@@ -98,41 +106,26 @@ class ReportsPage:
         ttk.Label(self.report_content_frame, text="DETAILED TRANSACTIONS", style='H4.TLabel').grid(
             row=3, column=0, sticky='w', pady=(15, 10))
         
-        table_frame = ttk.Frame(self.report_content_frame)
-        table_frame.grid(row=4, column=0, sticky='nsew')
-        table_frame.grid_columnconfigure(0, weight=1)
-        table_frame.grid_rowconfigure(0, weight=1)
-        
-        self.tree = ttk.Treeview(table_frame, columns=('id', 'date', 'type', 'category', 'account', 'amount', 'description'), 
-                                 show='headings', height=10)
-        
-        self.tree.column('id', width=0, stretch=False)
-        self.tree.column('date', width=100)
-        self.tree.column('type', width=80)
-        self.tree.column('category', width=120)
-        self.tree.column('account', width=100)
-        self.tree.column('amount', width=100, anchor='e')
-        self.tree.column('description', width=200)
-        
-        self.tree.heading('id', text='')
-        self.tree.heading('date', text='Date')
-        self.tree.heading('type', text='Type')
-        self.tree.heading('category', text='Category')
-        self.tree.heading('account', text='Account')
-        self.tree.heading('amount', text='Amount')
-        self.tree.heading('description', text='Description')
-        
-        self.tree.grid(row=0, column=0, sticky='nsew')
-        
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.grid(row=0, column=1, sticky='ns')
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        status_frame = ttk.Frame(self.report_content_frame)
+        status_frame.grid(row=5, column=0, sticky='ew', pady=(10, 0))
+        self.status_label = ttk.Label(status_frame, text="", style='H5.TLabel')
+        self.status_label.pack(side='left')
+        self.loading = LoadingIndicator(status_frame)
+        self.loading.frame.pack(side='right')
+
+        self.tasks = TaskScope(self.main_frame, on_busy=self.loading.set_busy)
+        self.chart = ChartView(self.chart_container, self.tasks, "report", self.draw_chart, REPORT_CHART_SIZE,
+                               fixed_height=True)
+        self.table = VirtualTable(self.report_content_frame,
+                                  [('id', '', 0, 'w'), ('date', 'Date', 100, 'w'), ('type', 'Type', 80, 'w'),
+                                   ('category', 'Category', 120, 'w'), ('account', 'Account', 100, 'w'),
+                                   ('amount', 'Amount', 100, 'e'), ('description', 'Description', 200, 'w')],
+                                  self.format_row, self.tasks, sortable=SORT_KEYS)
+        self.table.frame.grid(row=4, column=0, sticky='nsew')
         
         self.report_content_frame.grid_rowconfigure(4, weight=1)
 
-        self.status_label = ttk.Label(self.report_content_frame, text="", style='H5.TLabel')
-        self.status_label.grid(row=5, column=0, sticky='w', pady=(10, 0))
-
+        self.load_categories()
         self.generate_report()
 
     def _create_summary_card(self, parent, title, value, row, col):
@@ -146,15 +139,26 @@ class ReportsPage:
         
         return value_label
 
+    def refresh(self):
+        """Re-run the report with the current filters after the data or settings changed"""
+        self.settings = Utils.load_app_settings()
+        self.load_categories()
+        self.generate_report()
+
+    def on_hide(self):
+        """Stop the report, table and category queries still running; True if any were dropped"""
+        return self.tasks.cancel()
+
     def load_categories(self):
         """Load categories into the filter dropdown"""
-        try:
-            categories = self.category_service.get_all()
+        def show(categories):
             category_names = ["All Categories"] + [cat['name'] for cat in categories]
             self.category_combo['values'] = category_names
-            self.category_combo.set("All Categories")
-        except Exception as e:
-            print(f"Error loading categories: {e}")
+            if self.category_var.get() not in category_names:
+                self.category_combo.set("All Categories")
+
+        self.tasks.submit(self.category_service.get_all, on_done=show, key="categories",
+                          on_error=lambda e: print(f"Error loading categories: {e}"))
 
     def get_date_range(self):
         """Calculate start and end dates based on selected range"""
@@ -184,93 +188,66 @@ class ReportsPage:
 
     def generate_report(self):
         """Generate report based on selected filters"""
-        try:
-            start_date, end_date = self.get_date_range()
-            transactions = self.transaction_service.get_transactions_by_date_range(start_date, end_date)
-
-            filtered_transactions = []
-            for trans in transactions:
-                if self.trans_type.get() != "All" and trans['type'] != self.trans_type.get():
-                    continue
-                
-                if self.category_var.get() != "All Categories" and trans['category'] != self.category_var.get():
-                    continue
-                
-                if self.account_var.get() != "All Accounts" and trans['account'] != self.account_var.get():
-                    continue
-                
-                filtered_transactions.append(trans)
-
-            self.filtered_transactions = filtered_transactions
-            self.update_summary(filtered_transactions)
-            self.update_chart(filtered_transactions)
-            self.update_table(filtered_transactions)
-
-            self.status_label.config(text=f"Showing {len(filtered_transactions)} transactions from {start_date} to {end_date}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
-
-    def update_summary(self, transactions):
-        """Update summary cards with calculated values"""
-        total_income = sum(t['amount'] for t in transactions if t['type'] == 'Income')
-        total_expense = sum(t['amount'] for t in transactions if t['type'] == 'Expense')
+        filters = self.current_filters()
+
+        def show(report):
+            summary, chart, theme, chart_size = report
+            self.update_summary(summary)
+            self.chart.show(chart, summary['expense_by_category'], theme, chart_size,
+                            empty_text="No expense data to display")
+            self.table.load(ReportRows(self.transaction_service, filters), summary['count'])
+
+            self.status_label.config(text=f"Showing {summary['count']} transactions from {filters['start_date']} to {filters['end_date']}")
+
+        self.status_label.config(text="")
+        self.tasks.submit(self.fetch_report, filters, sv_ttk.get_theme(), self.chart.size(), on_done=show, key="report",
+                          on_error=lambda e: messagebox.showerror("Error", f"Failed to generate report: {str(e)}"))
+
+    def update_summary(self, summary):
+        """Update summary cards with the report totals"""
+        total_income = summary['income']
+        total_expense = summary['expense']
         net_balance = total_income - total_expense
 
         self.income_card.config(text=f"{self.settings.get('currency', '$')}{total_income:,.2f}")
         self.expense_card.config(text=f"{self.settings.get('currency', '$')}{total_expense:,.2f}")
         self.balance_card.config(text=f"{self.settings.get('currency', '$')}{net_balance:,.2f}")
 
-    def update_chart(self, transactions):
-        """Update the pie chart with expense breakdown"""
-        for widget in self.chart_container.winfo_children():
-            widget.destroy()
-        
-        expenses = [t for t in transactions if t['type'] == 'Expense']
-        
-        if not expenses:
-            ttk.Label(self.chart_container, text="No expense data to display").pack()
-            return
-        
-        category_totals = defaultdict(float)
-        for expense in expenses:
-            category_totals[expense['category']] += expense['amount']
-        
-        fig = Figure(figsize=(8, 4), dpi=80)
+    def fetch_report(self, filters, theme, chart_size):
+        """Totals filtered in SQL and the expense chart rendered at `chart_size` (runs on a worker thread)"""
+        summary = self.transaction_service.get_report_summary(**filters)
+        chart = None
+        if summary['expense_by_category']:
+            chart = chart_cache.render("report", summary['expense_by_category'], theme, chart_size, self.draw_chart)
+        return summary, chart, theme, chart_size
+
+    @staticmethod
+    def draw_chart(fig, category_totals, theme):
+        """Draw the pie chart of the expense total per category"""
         ax = fig.add_subplot(111)
         
         categories = list(category_totals.keys())
-        values = list(category_totals.values())
+        values = [float(value) for value in category_totals.values()]
         
         colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#F7DC6F', '#BB8FCE', '#85C1E2']
         
         ax.pie(values, labels=categories, autopct='%1.1f%%', startangle=90, colors=colors[:len(categories)])
         ax.axis('equal')
-        
-        canvas = FigureCanvasTkAgg(fig, self.chart_container)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True)
-
-    def update_table(self, transactions):
-        """Update transactions table"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        sorted_transactions = sorted(transactions, key=lambda x: x['date'], reverse=True)
-        
-        for trans in sorted_transactions:
-            amount_str = f"{self.settings.get('currency', '$')}{trans['amount']:,.2f}"
-            if trans['type'] == 'Expense':
-                amount_str = f"-{amount_str}"
-            
-            self.tree.insert('', 'end', values=(
-                trans['id'],
-                trans['date'],
-                trans['type'],
-                trans['category'],
-                trans['account'],
-                amount_str,
-                trans.get('description', '')
-            ))
+
+    def format_row(self, trans):
+        """Table values for one transaction"""
+        amount_str = f"{self.settings.get('currency', '$')}{trans['amount']:,.2f}"
+        if trans['type'] == 'Expense':
+            amount_str = f"-{amount_str}"
+        return (
+            trans['id'],
+            trans['date'],
+            trans['type'],
+            trans['category'],
+            trans['account'],
+            amount_str,
+            trans.get('description', '')
+        )
 
     def reset_filters(self):
         """Reset all filters to default"""
@@ -280,34 +257,66 @@ class ReportsPage:
         self.account_var.set("All Accounts")
         self.generate_report()
 
+    def current_filters(self):
+        """The selected filters as keyword arguments for the transaction queries"""
+        start_date, end_date = self.get_date_range()
+        return {
+            'transaction_type': None if self.trans_type.get() == "All" else self.trans_type.get(),
+            'category': None if self.category_var.get() == "All Categories" else self.category_var.get(),
+            'account': None if self.account_var.get() == "All Accounts" else self.account_var.get(),
+            'start_date': start_date,
+            'end_date': end_date,
+        }
+
     def export_report(self):
         """Export report to CSV"""
-        self.save_to_csv(self.filtered_transactions)
+        self.save_to_csv(self.current_filters())
+
+    def save_to_csv(self, filters):
+        """Stream the transactions matching `filters` to a CSV file on a worker thread"""
+        self.tasks.submit(self.transaction_service.count_transactions, **filters, key="export",
+                          on_done=lambda total: self._save_to_csv(filters, total),
+                          on_error=lambda e: messagebox.showerror("Error", f"Failed to export report: {str(e)}"))
 
-    def save_to_csv(self, transactions):
-        """Save the filtered transactions to a CSV file"""
-        if not transactions:
+    def _save_to_csv(self, filters, total):
+        if not total:
             messagebox.showinfo("Export", "No transactions to export.")
             return
 
         file_path = filedialog.asksaveasfilename(defaultextension=".csv",
-                                                   filetypes=[("CSV files", "*.csv"),
-                                                              ("All files", "*.*")])
+                                                   filetypes=EXPORT_FILETYPES)
         if not file_path:
             return
 
-        try:
-            with open(file_path, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["ID", "Date", "Type", "Category", "Account", "Amount", "Description"])
-                for trans in transactions:
-                    writer.writerow([trans['id'],
-                                     trans['date'],
-                                     trans['type'],
-                                     trans['category'],
-                                     trans['account'],
-                                     trans['amount'],
-                                     trans.get('description', '')])
-            messagebox.showinfo("Export", "Report exported successfully.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export report: {str(e)}")
+        def task(progress, cancel):
+            return write_csv(file_path, REPORT_EXPORT_COLUMNS,
+                             self.transaction_service.stream_transactions(**filters),
+                             total=total, progress=progress, cancel=cancel)
+
+        def on_done(written, error):
+            if isinstance(error, ExportCancelled):
+                messagebox.showinfo("Export", "Export cancelled.")
+            elif error is not None:
+                messagebox.showerror("Error", f"Failed to export report: {str(error)}")
+            else:
+                messagebox.showinfo("Export", f"Report exported successfully ({written} transactions).")
+
+        ProgressDialog(self.parent_frame, "Exporting", "Exporting report...").run(task, on_done)
+
+
+class ReportRows:
+    """The report's transactions as a `VirtualTable` source: sorted, keyset-paged queries under fixed filters."""
+
+    def __init__(self, transaction_service: TransactionService, filters):
+        self.transaction_service = transaction_service
+        self.filters = filters
+
+    def page(self, sort_by, descending, start, inclusive, limit):
+        return self.transaction_service.get_sorted_page(sort_by, descending, start, inclusive, limit, **self.filters)
+
+    def anchors(self, sort_by, descending, every):
+        return self.transaction_service.get_sort_anchors(sort_by, descending, every, **self.filters)
+
+    @staticmethod
+    def key(row, sort_by):
+        return TransactionService.sort_key(row, sort_by)
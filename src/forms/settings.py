@@ -1,32 +1,40 @@
 import os
-import csv
-import json
-import shutil
+import threading
 import tkinter as tk
-from pathlib import Path
 from datetime import datetime
 from tkinter import ttk, messagebox, filedialog
 
 from tools.utils import Utils
+from tools.settings_store import settings_store
+from tools.export import EXPORT_FILETYPES, CATEGORY_EXPORT_COLUMNS, TRANSACTION_EXPORT_COLUMNS, ExportCancelled, write_csv
 from dotenv import load_dotenv
+from database.backup import BackupEngine
 from database.engine import get_db_connection
-from services.category import CategoryService
+from database.maintenance import scheduler as maintenance_scheduler
+from services.category import CategoryService, category_cache
+from services.query_cache import query_cache
 from services.transaction import TransactionService
+from forms.progress_dialog import ProgressDialog
+from forms.loading import LoadingIndicator
+from tools.executor import TaskScope
+from tools.importer import IMPORT_FILETYPES, ImportCancelled, importer_for
 
 
 load_dotenv()
 DATABASE_NAME = os.getenv("DATABASE_NAME", "finance.db")
 DB_URL = Utils.resource_path(f"data/{DATABASE_NAME}")
 
+
+def _describe_bytes(done, total):
+    return f"{done / 1048576:,.1f} / {total / 1048576:,.1f} MB"
+
+
 class SettingsPage:
     def __init__(self, parent_frame):
         self.parent_frame = parent_frame
         self.transaction_service = TransactionService()
         self.category_service = CategoryService()
         
-        self.settings_file = Path(Utils.resource_path(f"data/app_settings.json"))
-        if not self.settings_file.parent.exists():
-            self.settings_file.parent.mkdir(parents=True, exist_ok=True)
         self.settings = self.load_settings()
         
         for widget in self.parent_frame.winfo_children():
@@ -39,9 +47,21 @@ class SettingsPage:
         scrollbar = ttk.Scrollbar(parent_frame, orient="vertical", command=canvas.yview, takefocus=True)
         self.main_frame = ttk.Frame(canvas, padding="10")
         
-        canvas.bind_all("<MouseWheel>", lambda event: canvas.yview_scroll(int(-1*(event.delta/120)), "units"))
-        canvas.bind_all("<Button-4>", lambda event: canvas.yview_scroll(-1, "units"))
-        canvas.bind_all("<Button-5>", lambda event: canvas.yview_scroll(1, "units"))
+        # The page stays alive while other pages are shown, so only take the wheel while the pointer is over it.
+        def bind_wheel(event):
+            canvas.bind_all("<MouseWheel>", lambda event: canvas.yview_scroll(int(-1*(event.delta/120)), "units"))
+            canvas.bind_all("<Button-4>", lambda event: canvas.yview_scroll(-1, "units"))
+            canvas.bind_all("<Button-5>", lambda event: canvas.yview_scroll(1, "units"))
+
+        def unbind_wheel(event):
+            # Moving onto the page content (a child window of the canvas) is not leaving it.
+            if str(event.detail) == 'NotifyInferior':
+                return
+            for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                canvas.unbind_all(sequence)
+
+        canvas.bind("<Enter>", bind_wheel)
+        canvas.bind("<Leave>", unbind_wheel)
         
         self.main_frame.bind(
             "<Configure>",
@@ -58,6 +78,9 @@ class SettingsPage:
 
         ttk.Label(self.main_frame, text="Application Settings", style='H2.TLabel').grid(
             row=0, column=0, sticky='w', pady=(0, 30))
+        self.loading = LoadingIndicator(self.main_frame)
+        self.loading.frame.grid(row=0, column=0, sticky='e', pady=(0, 30))
+        self.tasks = TaskScope(self.main_frame, on_busy=self.loading.set_busy)
 
         self._setup_appearance_settings()
         self._setup_preferences_settings()
@@ -66,32 +89,13 @@ class SettingsPage:
         self._setup_about_section()
 
     def load_settings(self):
-        """Load settings from JSON file"""
-        default_settings = {
-            "currency": "$",
-            "date_format": "YYYY-MM-DD",
-            "theme": "dark",
-            "default_account": "Checking",
-            "show_decimals": True,
-            "auto_backup": False
-        }
-        
-        if self.settings_file.exists():
-            try:
-                with open(self.settings_file, 'r') as f:
-                    return {**default_settings, **json.load(f)}
-            except Exception:
-                return default_settings
-        return default_settings
+        """The current settings, from the shared store"""
+        return settings_store.all()
 
     def save_settings(self):
-        """Save settings to JSON file"""
-        try:
-            with open(self.settings_file, 'w') as f:
-                json.dump(self.settings, f, indent=4)
-            messagebox.showinfo("Success", "Settings saved successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save settings: {str(e)}")
+        """Save the settings; the file is written in the background"""
+        settings_store.update(self.settings)
+        messagebox.showinfo("Success", "Settings saved successfully!")
 
     def _create_section_frame(self, row, title):
         """Create a section frame with title"""
@@ -171,20 +175,25 @@ class SettingsPage:
         db_info_frame = ttk.Frame(section)
         db_info_frame.grid(row=1, column=0, columnspan=2, sticky='ew', pady=(5, 15))
         
-        stats = self.get_database_stats()
-        ttk.Label(db_info_frame, text=f"📊 Total Transactions: {stats['transactions']}", 
-                  style='H5.TLabel').pack(anchor='w', pady=2)
-        ttk.Label(db_info_frame, text=f"📁 Total Categories: {stats['categories']}", 
-                  style='H5.TLabel').pack(anchor='w', pady=2)
-        ttk.Label(db_info_frame, text=f"💽 Database Size: {stats['db_size']}", 
-                  style='H5.TLabel').pack(anchor='w', pady=2)
+        self.transactions_label = ttk.Label(db_info_frame, text="📊 Total Transactions: …", style='H5.TLabel')
+        self.transactions_label.pack(anchor='w', pady=2)
+        self.categories_label = ttk.Label(db_info_frame, text="📁 Total Categories: …", style='H5.TLabel')
+        self.categories_label.pack(anchor='w', pady=2)
+        self.size_label = ttk.Label(db_info_frame, text="💽 Database Size: …", style='H5.TLabel')
+        self.size_label.pack(anchor='w', pady=2)
+
+        self.tasks.submit(self.get_database_stats, on_done=self._show_stats, key="stats")
+        self.maintenance_label = ttk.Label(db_info_frame, text=self._maintenance_summary(),
+                                           style='H5.TLabel')
+        self.maintenance_label.pack(anchor='w', pady=2)
         
         button_frame = ttk.Frame(section)
         button_frame.grid(row=2, column=0, columnspan=2, sticky='ew')
         
-        ttk.Button(button_frame, text="🔄 Backup Database", 
-                   command=self.backup_database, 
-                   style='Accent.TButton').pack(fill='x', pady=(0, 5), ipady=8)
+        self.backup_button = ttk.Button(button_frame, text="🔄 Backup Database", 
+                                        command=self.backup_database, 
+                                        style='Accent.TButton')
+        self.backup_button.pack(fill='x', pady=(0, 5), ipady=8)
         
         ttk.Button(button_frame, text="📤 Export Transactions (CSV)", 
                    command=self.export_transactions).pack(fill='x', pady=(0, 5), ipady=8)
@@ -194,6 +203,10 @@ class SettingsPage:
         
         ttk.Button(button_frame, text="📥 Import Data", 
                    command=self.import_data).pack(fill='x', pady=(0, 5), ipady=8)
+        
+        self.maintenance_button = ttk.Button(button_frame, text="🧹 Run Maintenance Now", 
+                                             command=self.run_maintenance)
+        self.maintenance_button.pack(fill='x', pady=(0, 5), ipady=8)
 
     def _setup_account_settings(self):
         """Setup account management section"""
@@ -223,6 +236,35 @@ class SettingsPage:
         ttk.Label(section, text=about_text.strip(), justify='left').grid(
             row=1, column=0, columnspan=2, sticky='w', pady=(5, 5))
 
+    def _show_stats(self, stats):
+        self.transactions_label.config(text=f"📊 Total Transactions: {stats['transactions']}")
+        self.categories_label.config(text=f"📁 Total Categories: {stats['categories']}")
+        self.size_label.config(text=f"💽 Database Size: {stats['db_size']}")
+
+    def refresh(self):
+        """Show settings changed elsewhere (e.g. the theme switch) and recount the database figures"""
+        self.settings = self.load_settings()
+        self._show_settings()
+        self.tasks.submit(self.get_database_stats, on_done=self._show_stats, key="stats")
+        self.maintenance_label.config(text=self._maintenance_summary())
+
+    def on_hide(self):
+        """Stop the database figures query, but not an export or clear the user started; True if it was dropped"""
+        return self.tasks.cancel(keep=("export", "clear"))
+
+    def on_settings_changed(self, changed):
+        """Settings changed while this page is shown, by this page or by the theme switch"""
+        self.settings = self.load_settings()
+        self._show_settings()
+
+    def _show_settings(self):
+        self.currency_var.set(self.settings.get("currency", "$"))
+        self.date_format_var.set(self.settings.get("date_format", "YYYY-MM-DD"))
+        self.theme_var.set(self.settings.get("theme", "dark"))
+        self.account_var.set(self.settings.get("default_account", "Checking"))
+        self.decimals_var.set(self.settings.get("show_decimals", True))
+        self.auto_backup_var.set(self.settings.get("auto_backup", False))
+
     def update_setting(self, key, value):
         """Update a setting and save"""
         self.settings[key] = value
@@ -256,112 +298,176 @@ class SettingsPage:
                 "db_size": "Unknown"
             }
 
-    def backup_database(self):
-        """Backup the database file"""
+    def _maintenance_summary(self):
+        """One-line description of the last maintenance run"""
         try:
-            if not os.path.exists(DB_URL):
-                messagebox.showerror("Error", "Database file not found")
-                return
-            
-            backup_dir = Path("backups")
-            backup_dir.mkdir(exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = backup_dir / f"finance_backup_{timestamp}.db"
-            
-            shutil.copy2(DB_URL, backup_path)
-            messagebox.showinfo("Success", f"Database backed up successfully!\n\nLocation: {backup_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to backup database: {str(e)}")
+            report = maintenance_scheduler.last_run()
+        except Exception:
+            report = None
+        if not report:
+            return "🧹 Last Maintenance: never"
+        failed = [task['name'] for task in report.get('tasks', []) if not task.get('ok')]
+        status = f", failed: {', '.join(failed)}" if failed else ""
+        return f"🧹 Last Maintenance: {report.get('finished_at', '?').replace('T', ' ')} ({report.get('seconds', 0):.2f}s{status})"
 
-    def export_transactions(self):
-        """Export all transactions to CSV"""
+    def run_maintenance(self):
+        """Run database maintenance on a worker thread"""
+        if maintenance_scheduler.is_running:
+            messagebox.showinfo("Maintenance", "Maintenance is already running.")
+            return
+
+        enable_auto_vacuum = False
         try:
-            transactions = self.transaction_service.get_all()
-            
-            if not transactions:
-                messagebox.showinfo("Info", "No transactions to export")
+            if maintenance_scheduler.needs_full_vacuum():
+                enable_auto_vacuum = messagebox.askyesno(
+                    "Maintenance",
+                    "Free space in the database file is not reclaimed yet.\n\n"
+                    "Enabling it rewrites the whole file once (a full VACUUM). On a large database this can "
+                    "take minutes, needs free disk space about twice the database size, and blocks saving "
+                    "changes until it finishes.\n\nEnable it now?")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to check the database: {str(e)}")
+            return
+
+        self.maintenance_button.config(state='disabled')
+        self.maintenance_label.config(text="🧹 Maintenance running...")
+        thread = maintenance_scheduler.run_now(enable_auto_vacuum=enable_auto_vacuum)
+
+        def poll():
+            if thread.is_alive():
+                self.parent_frame.after(200, poll)
                 return
-            
-            file_path = filedialog.asksaveasfilename(
-                defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
-                initialfile=f"transactions_{datetime.now().strftime('%Y%m%d')}.csv"
-            )
-            
-            if not file_path:
+            self.maintenance_button.config(state='normal')
+            self.maintenance_label.config(text=self._maintenance_summary())
+
+        self.parent_frame.after(200, poll)
+
+    def backup_database(self):
+        """Take an online, deduplicated backup on a worker thread"""
+        if not os.path.exists(DB_URL):
+            messagebox.showerror("Error", "Database file not found")
+            return
+
+        self.backup_button.config(state='disabled', text="🔄 Backing up...")
+        state = {'manifest': None, 'error': None}
+
+        def worker():
+            try:
+                state['manifest'] = BackupEngine("backups").create_backup()
+            except Exception as e:
+                state['error'] = e
+
+        thread = threading.Thread(target=worker, name="db-backup", daemon=True)
+        thread.start()
+
+        def poll():
+            if thread.is_alive():
+                self.parent_frame.after(200, poll)
                 return
-            
-            with open(file_path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["ID", "Type", "Amount", "Date", "Category", "Account", "Description", "Created At", "Updated At"])
-                
-                for trans in transactions:
-                    writer.writerow([
-                        trans['id'],
-                        trans['type'],
-                        trans['amount'],
-                        trans['date'],
-                        trans['category'],
-                        trans['account'],
-                        trans.get('description', ''),
-                        trans['created_at'],
-                        trans['updated_at']
-                    ])
-            
-            messagebox.showinfo("Success", f"Exported {len(transactions)} transactions successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export transactions: {str(e)}")
+            self.backup_button.config(state='normal', text="🔄 Backup Database")
+            if state['error'] is not None:
+                messagebox.showerror("Error", f"Failed to backup database: {str(state['error'])}")
+                return
+            manifest = state['manifest']
+            messagebox.showinfo("Success", 
+                                f"Database backed up and verified successfully!\n\n"
+                                f"Location: {manifest['path']}\n"
+                                f"New chunks: {manifest['new_chunks']}, reused: {manifest['reused_chunks']}")
+
+        self.parent_frame.after(200, poll)
+
+    def export_transactions(self):
+        """Stream all transactions to CSV (optionally gzip-compressed) on a worker thread"""
+        self.tasks.submit(self.transaction_service.get_total_count, on_done=self._export_transactions, key="export",
+                          on_error=lambda e: messagebox.showerror("Error", f"Failed to export transactions: {str(e)}"))
+
+    def _export_transactions(self, total):
+        if not total:
+            messagebox.showinfo("Info", "No transactions to export")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=EXPORT_FILETYPES,
+            initialfile=f"transactions_{datetime.now().strftime('%Y%m%d')}.csv"
+        )
+
+        if not file_path:
+            return
+
+        def task(progress, cancel):
+            return write_csv(file_path, TRANSACTION_EXPORT_COLUMNS,
+                             self.transaction_service.stream_transactions(),
+                             total=total, progress=progress, cancel=cancel)
+
+        def on_done(written, error):
+            if isinstance(error, ExportCancelled):
+                messagebox.showinfo("Export", "Export cancelled.")
+            elif error is not None:
+                messagebox.showerror("Error", f"Failed to export transactions: {str(error)}")
+            else:
+                messagebox.showinfo("Success", f"Exported {written} transactions successfully!")
+
+        ProgressDialog(self.parent_frame, "Exporting", "Exporting transactions...").run(task, on_done)
 
     def export_categories(self):
         """Export all categories to CSV"""
-        try:
-            categories = self.category_service.get_all()
-            
+        def on_error(e):
+            messagebox.showerror("Error", f"Failed to export categories: {str(e)}")
+
+        def write(categories):
             if not categories:
                 messagebox.showinfo("Info", "No categories to export")
                 return
             
             file_path = filedialog.asksaveasfilename(
                 defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+                filetypes=EXPORT_FILETYPES,
                 initialfile=f"categories_{datetime.now().strftime('%Y%m%d')}.csv"
             )
             
             if not file_path:
                 return
             
-            with open(file_path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["ID", "Name", "Type", "Budget", "Description", "Created At", "Updated At"])
-                
-                for cat in categories:
-                    writer.writerow([
-                        cat['id'],
-                        cat['name'],
-                        cat['type'],
-                        cat.get('budget', ''),
-                        cat.get('description', ''),
-                        cat['created_at'],
-                        cat['updated_at']
-                    ])
-            
-            messagebox.showinfo("Success", f"Exported {len(categories)} categories successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export categories: {str(e)}")
+            self.tasks.submit(write_csv, file_path, CATEGORY_EXPORT_COLUMNS, categories, key="export", on_error=on_error,
+                              on_done=lambda count: messagebox.showinfo("Success", f"Exported {count} categories successfully!"))
+
+        self.tasks.submit(self.category_service.get_all, on_done=write, on_error=on_error, key="export")
 
     def import_data(self):
-        """Import data from CSV (placeholder)"""
-        messagebox.showinfo("Import", "Import functionality coming soon!\n\nThis will allow you to import transactions and categories from CSV files.")
+        """Stream a CSV export or a bank statement (OFX/QFX/QIF) into the database on a worker thread"""
+        file_path = filedialog.askopenfilename(filetypes=IMPORT_FILETYPES)
+        if not file_path:
+            return
+
+        def task(progress, cancel):
+            return importer_for(file_path).import_file(file_path, progress=progress, cancel=cancel)
+
+        def on_done(result, error):
+            if isinstance(error, ImportCancelled):
+                result = error.result
+                messagebox.showinfo("Import", f"Import cancelled.\n\nRows imported before cancelling: {result['inserted']}")
+            elif error is not None:
+                messagebox.showerror("Error", f"Failed to import data: {str(error)}")
+            else:
+                message = f"Imported {result['inserted']} of {result['read']} {result['kind']}."
+                if result['skipped']:
+                    message += f"\n{result['skipped']} were already in the database and were skipped."
+                if result['rejects_path']:
+                    message += f"\n\n{result['rejected']} rows were rejected; see:\n{result['rejects_path']}"
+                messagebox.showinfo("Import", message)
+
+        ProgressDialog(self.parent_frame, "Importing", "Importing data...",
+                       describe=_describe_bytes).run(task, on_done)
 
     def reset_application(self):
         """Reset application settings"""
         if messagebox.askyesno("Confirm Reset", "This will reset all application settings to default.\n\nYour data will not be affected.\n\nContinue?"):
             try:
-                if self.settings_file.exists():
-                    self.settings_file.unlink()
+                settings_store.reset()
                 self.settings = self.load_settings()
-                messagebox.showinfo("Success", "Settings reset successfully!\n\nPlease restart the application.")
+                self._show_settings()
+                messagebox.showinfo("Success", "Settings reset successfully!")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to reset settings: {str(e)}")
 
@@ -369,11 +475,17 @@ class SettingsPage:
         """Clear all data from database"""
         if messagebox.askyesno("⚠️ WARNING", "This will permanently delete ALL transactions and categories!\n\nThis action CANNOT be undone!\n\nAre you absolutely sure?"):
             if messagebox.askyesno("⚠️ FINAL WARNING", "Last chance!\n\nDelete ALL data permanently?"):
-                try:
+                def clear():
                     with get_db_connection() as conn:
                         conn.execute("DELETE FROM transactions")
                         conn.execute("DELETE FROM categories")
                         conn.commit()
+                    category_cache.invalidate()
+                    query_cache.note_write("transactions", "categories")
+
+                def done(_):
+                    maintenance_scheduler.run_now()
                     messagebox.showinfo("Success", "All data has been cleared")
-                except Exception as e:
-                    messagebox.showerror("Error", f"Failed to clear data: {str(e)}")
+
+                self.tasks.submit(clear, on_done=done, key="clear",
+                                  on_error=lambda e: messagebox.showerror("Error", f"Failed to clear data: {str(e)}"))
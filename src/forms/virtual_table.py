@@ -0,0 +1,287 @@
+from tkinter import ttk
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from tools.executor import TaskScope
+
+
+# Rows fetched per request; also the spacing of the sort anchors.
+PAGE_SIZE = 200
+# Rows kept loaded above and below the visible window.
+PREFETCH_ROWS = 200
+# Pages kept in memory before the least recently shown are dropped.
+CACHED_PAGES = 40
+# Delay (ms) before fetching after a scroll, so dragging the scrollbar does not queue every page it passes.
+FETCH_DELAY_MS = 40
+
+# (key, heading, width, anchor)
+TableColumn = Tuple[str, str, int, str]
+
+
+class VirtualTable:
+    """
+    A Treeview that shows a result of any size by rendering only the visible
+    rows. The tree holds one item per visible row and its own scrollbar maps
+    onto the whole result; scrolling re-fills those items from a cache of
+    pages, fetched in the background as they come near the window.
+
+    Pages come from a `source` with:
+      - `page(sort_by, descending, start, inclusive, limit)`: rows from keyset position `start`
+      - `anchors(sort_by, descending, every)`: the position of every `every`-th row
+      - `key(row, sort_by)`: the keyset position of a row
+    Until the anchors arrive, pages are reached by following on from the
+    previous one; afterwards any page is one seek away. Clicking a sortable
+    heading re-sorts in the source (i.e. in SQL), toggling the direction.
+    """
+
+    def __init__(self, parent, columns: Sequence[TableColumn], format_row: Callable[[Dict], Sequence],
+                 tasks: TaskScope, sortable: Sequence[str] = (), sort_by: str = 'date',
+                 descending: bool = True, height: int = 10):
+        self.columns = list(columns)
+        self.format_row = format_row
+        self.tasks = tasks
+        self.sortable = set(sortable)
+        self.sort_by = sort_by
+        self.descending = descending
+
+        self.source = None
+        self.total = 0
+        self.offset = 0
+        self.rows = height
+        self.pages: "OrderedDict[int, List[Dict]]" = OrderedDict()
+        self.anchors: Optional[List[Tuple]] = None
+        self.loading: Set[int] = set()
+        self.generation = 0
+        self.selected_id = None
+        self._fetch_pending = False
+
+        self.frame = ttk.Frame(parent)
+        self.frame.grid_columnconfigure(0, weight=1)
+        self.frame.grid_rowconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(self.frame, columns=[column[0] for column in self.columns],
+                                 show='headings', height=height, selectmode='browse')
+        for key, heading, width, anchor in self.columns:
+            self.tree.column(key, width=width, anchor=anchor, stretch=bool(width))
+            self.tree.heading(key, text=heading,
+                              command=(lambda key=key: self.sort(key)) if key in self.sortable else '')
+        self.tree.grid(row=0, column=0, sticky='nsew')
+
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky='ns')
+
+        self.tree.bind('<MouseWheel>', lambda event: self.scroll_by(-3 if event.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda event: self.scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_by(3))
+        for sequence, handler in (('<Up>', lambda: self._move_selection(-1)), ('<Down>', lambda: self._move_selection(1)),
+                                  ('<Prior>', lambda: self.scroll_by(-self.rows)), ('<Next>', lambda: self.scroll_by(self.rows)),
+                                  ('<Home>', lambda: self.scroll_to(0)), ('<End>', lambda: self.scroll_to(self.total))):
+            self.tree.bind(sequence, lambda event, handler=handler: (handler(), 'break')[1])
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<Configure>', lambda event: self._fit_rows())
+        self._update_headings()
+
+    def load(self, source, total: int):
+        """Show `total` rows from `source`, starting at the top."""
+        self.source = source
+        self.total = total
+        self.offset = 0
+        self._reset()
+
+    def sort(self, key: str):
+        """Sort by column `key` in SQL; a second click on the same column reverses the order."""
+        if key == self.sort_by:
+            self.descending = not self.descending
+        else:
+            self.sort_by, self.descending = key, key in ('date', 'amount')
+        self._update_headings()
+        self.offset = 0
+        self._reset()
+
+    def _reset(self):
+        for page in self.loading:
+            self.tasks.discard(f"page:{page}")
+        self.generation += 1
+        self.pages.clear()
+        self.loading.clear()
+        self.anchors = None
+        self._render()
+        if self.source is None or not self.total:
+            return
+        generation = self.generation
+        self.tasks.submit(self.source.anchors, self.sort_by, self.descending, PAGE_SIZE, key="anchors",
+                          on_done=lambda anchors: self._anchors_loaded(generation, anchors),
+                          on_error=lambda e: print(f"Error loading table positions: {e}"))
+        self._fetch_visible()
+
+    def _update_headings(self):
+        for key, heading, _, _ in self.columns:
+            if key == self.sort_by:
+                heading = f"{heading} {'▼' if self.descending else '▲'}"
+            self.tree.heading(key, text=heading)
+
+    # Scrolling
+
+    def scroll_to(self, offset: int):
+        offset = max(0, min(offset, self.total - self.rows))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+            self._schedule_fetch()
+
+    def scroll_by(self, rows: int):
+        self.scroll_to(self.offset + rows)
+
+    def _on_scrollbar(self, action, *args):
+        if action == 'moveto':
+            self.scroll_to(int(float(args[0]) * self.total))
+        elif action == 'scroll':
+            amount, unit = int(args[0]), args[1]
+            self.scroll_by(amount * (self.rows if unit == 'pages' else 1))
+
+    def _move_selection(self, step: int):
+        items = self.tree.get_children()
+        selection = self.tree.selection()
+        index = items.index(selection[0]) + step if selection else 0
+        if index < 0:
+            self.scroll_by(-1)
+            index = 0
+        elif index >= len(items):
+            self.scroll_by(1)
+            index = len(items) - 1
+        items = self.tree.get_children()
+        if items:
+            self.tree.selection_set(items[max(0, min(index, len(items) - 1))])
+
+    def _fit_rows(self):
+        """Match the number of rendered rows to the height the tree has been given."""
+        items = self.tree.get_children()
+        if not items:
+            return
+        box = self.tree.bbox(items[0])
+        if not box:
+            return
+        top, row_height = box[1], box[3]
+        rows = max(1, (self.tree.winfo_height() - top) // max(row_height, 1))
+        if rows != self.rows:
+            self.rows = rows
+            self.offset = max(0, min(self.offset, self.total - self.rows))
+            self._render()
+            self._schedule_fetch()
+
+    # Rendering
+
+    def _row_at(self, position: int) -> Optional[Dict]:
+        page = self.pages.get(position // PAGE_SIZE)
+        if page is None:
+            return None
+        index = position % PAGE_SIZE
+        return page[index] if index < len(page) else None
+
+    def _render(self):
+        count = max(0, min(self.rows, self.total - self.offset))
+        items = list(self.tree.get_children())
+        for item in items[count:]:
+            self.tree.delete(item)
+        for index in range(len(items), count):
+            self.tree.insert('', 'end', iid=f"row{index}")
+
+        selected = None
+        placeholder = ['…' if width else '' for _, _, width, _ in self.columns]
+        for index in range(count):
+            position = self.offset + index
+            row = self._row_at(position)
+            if row is None:
+                self.tree.item(f"row{index}", values=placeholder)
+                continue
+            self.pages.move_to_end(position // PAGE_SIZE)
+            self.tree.item(f"row{index}", values=list(self.format_row(row)))
+            if row.get('id') is not None and row.get('id') == self.selected_id:
+                selected = f"row{index}"
+
+        current = self.tree.selection()
+        if selected and current != (selected,):
+            self.tree.selection_set(selected)
+        elif not selected and current:
+            self.tree.selection_remove(*current)
+
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + count) / self.total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            row = self._row_at(self.offset + self.tree.index(selection[0]))
+            if row is not None:
+                self.selected_id = row.get('id')
+
+    def selected_row(self) -> Optional[Dict]:
+        selection = self.tree.selection()
+        return self._row_at(self.offset + self.tree.index(selection[0])) if selection else None
+
+    # Fetching
+
+    def _schedule_fetch(self):
+        if not self._fetch_pending:
+            self._fetch_pending = True
+            self.frame.after(FETCH_DELAY_MS, self._fetch_visible)
+
+    def _wanted_pages(self) -> range:
+        first = max(0, self.offset - PREFETCH_ROWS) // PAGE_SIZE
+        last = min(self.total - 1, self.offset + self.rows + PREFETCH_ROWS) // PAGE_SIZE
+        return range(first, last + 1)
+
+    def _fetch_visible(self):
+        self._fetch_pending = False
+        if self.source is None or not self.total:
+            return
+        wanted = self._wanted_pages()
+        for page in list(self.loading):
+            if page not in wanted:
+                self.tasks.discard(f"page:{page}")
+                self.loading.discard(page)
+
+        for page in wanted:
+            if page in self.pages or page in self.loading:
+                continue
+            if page == 0:
+                start, inclusive = None, True
+            elif self.anchors is not None and page < len(self.anchors):
+                start, inclusive = self.anchors[page], True
+            elif page - 1 in self.pages:
+                start, inclusive = self.source.key(self.pages[page - 1][-1], self.sort_by), False
+            else:
+                continue
+            self.loading.add(page)
+            generation = self.generation
+            self.tasks.submit(self.source.page, self.sort_by, self.descending, start, inclusive, PAGE_SIZE,
+                              key=f"page:{page}",
+                              on_done=lambda rows, page=page: self._page_loaded(generation, page, rows),
+                              on_error=lambda e, page=page: self._page_failed(generation, page, e))
+
+    def _page_loaded(self, generation: int, page: int, rows: List[Dict]):
+        if generation != self.generation:
+            return
+        self.loading.discard(page)
+        self.pages[page] = rows
+        visible = range(self.offset // PAGE_SIZE, (self.offset + self.rows) // PAGE_SIZE + 1)
+        while len(self.pages) > CACHED_PAGES:
+            oldest = next(iter(self.pages))
+            if oldest in visible:
+                self.pages.move_to_end(oldest)
+                continue
+            del self.pages[oldest]
+        self._render()
+        self._fetch_visible()
+
+    def _page_failed(self, generation: int, page: int, error: Exception):
+        if generation == self.generation:
+            self.loading.discard(page)
+            print(f"Error loading table rows: {error}")
+
+    def _anchors_loaded(self, generation: int, anchors: List[Tuple]):
+        if generation == self.generation:
+            self.anchors = anchors
+            self._fetch_visible()
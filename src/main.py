@@ -1,22 +1,84 @@
+import threading
 import tkinter as tk
+from tkinter import ttk, messagebox
 from datetime import datetime
 from tools.utils import Utils
-from database.migrations import migrate
-from forms.dashboard import DashboardPage 
+from database.migrations import migrate, needs_migration
+from database.maintenance import scheduler as maintenance_scheduler
+from database.auto_backup import auto_backup_service
+from tools.executor import executor
+from tools.settings_store import settings_store
+from forms.dashboard import DashboardPage
 
 
-def main():
-    migrate()
+def run_migrations(root: tk.Tk):
+    """Apply pending migrations on a worker thread behind a small progress window."""
+    if not needs_migration():
+        return
+
+    window = tk.Toplevel(root)
+    window.title("Updating database")
+    window.resizable(False, False)
+    message_label = ttk.Label(window, text="Preparing database upgrade...", padding="20 15 20 5")
+    message_label.pack(fill='x')
+    progress_bar = ttk.Progressbar(window, length=360, mode='indeterminate')
+    progress_bar.pack(padx=20, pady=(5, 20))
+    progress_bar.start(10)
+
+    state = {'message': "", 'done': 0, 'total': 0, 'error': None, 'notices': []}
+
+    def report(message, done, total):
+        state.update(message=message, done=done, total=total)
+
+    def worker():
+        try:
+            state['notices'] = migrate(progress=report)
+        except Exception as e:
+            state['error'] = e
+
+    def poll():
+        if state['message']:
+            text = state['message']
+            if state['total']:
+                text += f" ({state['done']:,} / {state['total']:,})"
+                if str(progress_bar['mode']) != 'determinate':
+                    progress_bar.stop()
+                    progress_bar.config(mode='determinate', maximum=state['total'])
+                progress_bar['value'] = state['done']
+            message_label.config(text=text)
 
+        if thread.is_alive():
+            window.after(100, poll)
+        else:
+            window.destroy()
+
+    thread = threading.Thread(target=worker, name="migrations", daemon=True)
+    thread.start()
+    window.after(100, poll)
+    root.wait_window(window)
+
+    if state['error'] is not None:
+        raise state['error']
+    if state['notices']:
+        messagebox.showwarning("Database updated", "\n\n".join(state['notices']), parent=root)
+
+
+def main():
     root = tk.Tk()
     root.withdraw()
 
+    run_migrations(root)
+    maintenance_scheduler.start()
+    auto_backup_service.start()
+
     root.title(f"Expense Tracker ©{datetime.now().year}")
     Utils.set_app_icon(root, "assets/app_icon.png")
     app = DashboardPage(root)
 
     root.deiconify()
     root.mainloop()
+    settings_store.flush()
+    executor.shutdown()
 
 
 if __name__ == "__main__":
@@ -1,33 +1,97 @@
 import uuid
 import datetime
 import sqlite3
-from typing import Dict, List, Optional
+import contextlib
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+from tools.money import Money
 from database.engine import get_db_connection 
+from services.query_cache import query_cache
+
+
+DEFAULT_CHUNK_SIZE = 1000
+# Page cache (KiB) used while bulk inserting, so index pages stay hot across chunks.
+BULK_CACHE_KIB = 65536
+# A staged insert rebuilds the table's non-unique indexes instead of updating them row by row
+# once it brings at least this many rows, and at least 1/RATIO of the rows already stored.
+REBUILD_INDEXES_MIN_ROWS = 50000
+REBUILD_INDEXES_RATIO = 3
+
+
+def _chunks(items: Iterable, size: int):
+    """Yield successive lists of at most `size` items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class BaseService:
+    # Columns (and aggregate aliases) stored as integer minor units; read back as Money.
+    money_columns: Tuple[str, ...] = ()
+    # Tables whose writes make this service's cached reads stale; defaults to its own table.
+    cache_tables: Tuple[str, ...] = ()
+
     def __init__(self, table_name: str):
         self.table_name = table_name
 
-    def _execute(self, query: str, params=()) -> List[Dict]:
-        """Helper to execute a query and return all results."""
+    def _row_to_dict(self, row) -> Dict:
+        """Converts a row to a dict, wrapping money columns in Money."""
+        record = dict(row)
+        for column in self.money_columns:
+            if record.get(column) is not None:
+                record[column] = Money(record[column])
+        return record
+
+    def _to_db_values(self, values: Dict) -> Dict:
+        """Converts money columns in `values` to integer minor units for storage."""
+        for column in self.money_columns:
+            if values.get(column) is not None:
+                values[column] = Money.from_value(values[column]).minor
+        return values
+
+    def _on_write(self):
+        """Called after a write to this service's table is committed; subclasses drop cached reads here."""
+        query_cache.note_write(self.table_name)
+
+    def _cached(self, query: str, params, fetch) -> List[Dict]:
+        """Rows of a read query from `query_cache`, running `fetch()` on a miss."""
+        tables = self.cache_tables or (self.table_name,)
+        key = query_cache.key(query, params)
+        token = query_cache.token(tables)
+        rows = query_cache.get(key, token)
+        if rows is None:
+            rows = fetch()
+            query_cache.put(key, token, tables, rows)
+        return rows
+
+    def _execute(self, query: str, params=(), cache: bool = False) -> List[Dict]:
+        """Helper to execute a query and return all results. With `cache`, a read is served from `query_cache`."""
+        if cache:
+            return self._cached(query, params, lambda: self._execute(query, params))
         with get_db_connection() as conn:
             cursor = conn.execute(query, params)
             conn.commit()
-            return [dict(row) for row in cursor.fetchall()] 
+            return [self._row_to_dict(row) for row in cursor.fetchall()] 
 
-    def _fetch_one(self, query: str, params=()) -> Optional[Dict]:
-        """Helper to fetch a single result."""
+    def _fetch_one(self, query: str, params=(), cache: bool = False) -> Optional[Dict]:
+        """Helper to fetch a single result. With `cache`, it is served from `query_cache`."""
+        if cache:
+            rows = self._cached(query, params, lambda: self._execute(query, params)[:1])
+            return rows[0] if rows else None
         with get_db_connection() as conn:
             cursor = conn.execute(query, params)
             row = cursor.fetchone()
-            return dict(row) if row else None
+            return self._row_to_dict(row) if row else None
 
     def create(self, **kwargs) -> Optional[Dict]:
         """Creates a new record in the table."""
         record_id = str(uuid.uuid4())
         now = datetime.datetime.now().isoformat()
 
+        self._to_db_values(kwargs)
         kwargs.update({
             'id': record_id,
             'is_active': 1,
@@ -43,6 +107,7 @@ class BaseService:
             try:
                 conn.execute(query, list(kwargs.values()))
                 conn.commit()
+                self._on_write()
                 return self.get_by_id(record_id)
             except sqlite3.IntegrityError:
                 return None
@@ -59,6 +124,7 @@ class BaseService:
 
     def update(self, record_id: str, **kwargs) -> Optional[Dict]:
         """Updates an existing record."""
+        self._to_db_values(kwargs)
         kwargs['updated_at'] = datetime.datetime.now().isoformat()
         set_clause = ', '.join([f"{key} = ?" for key in kwargs])
         query = f"UPDATE {self.table_name} SET {set_clause} WHERE id = ?"
@@ -68,6 +134,7 @@ class BaseService:
             cursor = conn.execute(query, params)
             conn.commit()
             if cursor.rowcount > 0:
+                self._on_write()
                 return self.get_by_id(record_id)
             return None
 
@@ -77,4 +144,340 @@ class BaseService:
         with get_db_connection() as conn:
             cursor = conn.execute(query, (record_id,))
             conn.commit()
+            if cursor.rowcount > 0:
+                self._on_write()
             return cursor.rowcount > 0
+
+    def _bulk_insert_context(self, conn: sqlite3.Connection):
+        """
+        Wraps all inserts of one `create_many` call, inside its transaction.
+        Subclasses override it to replace per-row work (such as triggers) with one set-based step.
+        """
+        return contextlib.nullcontext()
+
+    def _run_chunk(self, conn: sqlite3.Connection, query: str, rows: List[Tuple],
+                   positions: List[int], errors: List[Dict]) -> Tuple[List[bool], int]:
+        """
+        Runs one chunk with executemany inside a savepoint. If any row violates
+        a constraint the chunk is rolled back and replayed row by row so only the
+        offending rows are reported in `errors`, tagged with their input
+        position from `positions`. Returns per-row success flags and the number
+        of rows changed.
+        """
+        conn.execute("SAVEPOINT bulk_chunk")
+        try:
+            cursor = conn.executemany(query, rows)
+            conn.execute("RELEASE SAVEPOINT bulk_chunk")
+            return [True] * len(rows), cursor.rowcount
+        except sqlite3.DatabaseError:
+            conn.execute("ROLLBACK TO SAVEPOINT bulk_chunk")
+            conn.execute("RELEASE SAVEPOINT bulk_chunk")
+
+        results, changed = [], 0
+        for index, row in enumerate(rows):
+            try:
+                changed += conn.execute(query, row).rowcount
+                results.append(True)
+            except sqlite3.DatabaseError as e:
+                errors.append({'index': positions[index], 'error': str(e)})
+                results.append(False)
+        return results, changed
+
+    def _prepare_rows(self, chunk: List[Dict], offset: int, columns: Optional[List[str]],
+                      errors: List[Dict]) -> Tuple[List[str], List[Tuple], List[str], List[int]]:
+        """
+        Converts one chunk of records into insert rows, with money columns in
+        minor units (as `_to_db_values`) plus id, is_active and timestamps.
+        The first record fixes `columns`; records that fail conversion or do
+        not match them are reported in `errors` by their position (`offset` +
+        index). Returns (columns, rows, ids, positions).
+        """
+        now = datetime.datetime.now().isoformat()
+        rows, row_ids, positions = [], [], []
+        if columns is None and chunk:
+            columns = list(chunk[0].keys()) + ['id', 'is_active', 'created_at', 'updated_at']
+        fields = columns[:-4] if columns else []
+        field_set = set(fields)
+        money_positions = [position for position, column in enumerate(fields) if column in self.money_columns]
+        for index, record in enumerate(chunk):
+            if record.keys() != field_set:
+                errors.append({'index': offset + index, 'error': f"columns do not match the first record: {sorted(record)}"})
+                continue
+            values = [record[column] for column in fields]
+            try:
+                for position in money_positions:
+                    if values[position] is not None:
+                        values[position] = Money.from_value(values[position]).minor
+            except ValueError as e:
+                errors.append({'index': offset + index, 'error': str(e)})
+                continue
+            record_id = str(uuid.uuid4())
+            rows.append((*values, record_id, 1, now, now))
+            row_ids.append(record_id)
+            positions.append(offset + index)
+        return columns, rows, row_ids, positions
+
+    def create_many(self, records: Iterable[Dict], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    return_ids: bool = True, ignore_conflicts: bool = False) -> Dict:
+        """
+        Inserts many records in a single transaction using executemany per chunk.
+
+        Returns {"inserted": int, "skipped": int, "ids": [...], "errors": [{"index", "error"}]}.
+        Rows that fail (e.g. CHECK or UNIQUE violations) are reported by their
+        position in `records` and do not abort the rest of the batch. With
+        `ignore_conflicts`, rows that collide with a unique key are skipped
+        (INSERT ... ON CONFLICT DO NOTHING) and counted in `skipped` instead.
+        `ids` is only filled when `return_ids` is True and follows input order.
+        """
+        inserted = 0
+        skipped = 0
+        ids: List[str] = []
+        errors: List[Dict] = []
+        columns: Optional[List[str]] = None
+        query = None
+        offset = 0
+
+        with get_db_connection() as conn:
+            cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+            conn.execute(f"PRAGMA cache_size = {-BULK_CACHE_KIB}")
+            conn.execute("BEGIN")
+            try:
+                with self._bulk_insert_context(conn):
+                    for chunk in _chunks(records, chunk_size):
+                        columns, rows, row_ids, positions = self._prepare_rows(chunk, offset, columns, errors)
+                        if query is None and columns is not None:
+                            placeholders = ', '.join(['?'] * len(columns))
+                            query = f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+                            if ignore_conflicts:
+                                query += " ON CONFLICT DO NOTHING"
+
+                        if rows:
+                            results, changed = self._run_chunk(conn, query, rows, positions, errors)
+                            inserted += changed
+                            skipped += sum(results) - changed
+                            if return_ids:
+                                stored = None
+                                if changed < sum(results):
+                                    stored = set()
+                                    for id_chunk in _chunks(row_ids, 500):
+                                        placeholders = ', '.join(['?'] * len(id_chunk))
+                                        stored.update(row['id'] for row in conn.execute(
+                                            f"SELECT id FROM {self.table_name} WHERE id IN ({placeholders})", id_chunk))
+                                ids.extend(record_id for ok, record_id in zip(results, row_ids)
+                                           if ok and (stored is None or record_id in stored))
+                        offset += len(chunk)
+
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute(f"PRAGMA cache_size = {cache_size}")
+        if inserted:
+            self._on_write()
+
+        errors.sort(key=lambda e: e['index'])
+        return {'inserted': inserted, 'skipped': skipped, 'ids': ids, 'errors': errors}
+
+    def staged_insert(self, ignore_conflicts: bool = False) -> "StagedInsert":
+        """A StagedInsert into this table, for loads too large to insert batch by batch."""
+        return StagedInsert(self, ignore_conflicts)
+
+    @contextlib.contextmanager
+    def _rebuilt_indexes(self, conn: sqlite3.Connection, incoming: int):
+        """
+        Inside the caller's transaction: when `incoming` rows are many next to
+        the rows already stored, drops the table's non-unique indexes and
+        recreates them on exit, since one sorted build is much cheaper than
+        updating each index row by row. Unique indexes stay, as conflicts are
+        detected through them. A rollback restores the indexes with everything else.
+        """
+        stored = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {self.table_name}").fetchone()[0]
+        indexes = []
+        if incoming >= REBUILD_INDEXES_MIN_ROWS and incoming * REBUILD_INDEXES_RATIO >= stored:
+            indexes = [(row[0], row[1]) for row in conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL "
+                "AND sql NOT LIKE 'CREATE UNIQUE%'", (self.table_name,))]
+        for name, _ in indexes:
+            conn.execute(f"DROP INDEX {name}")
+        yield
+        for _, sql in indexes:
+            conn.execute(sql)
+
+    def update_many(self, updates: Iterable[Tuple[str, Dict]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+        """
+        Applies many (record_id, fields) updates in a single transaction.
+        Updates sharing the same set of fields are sent together through executemany.
+
+        Returns {"updated": int, "errors": [{"index", "error"}]}.
+        """
+        updated = 0
+        errors: List[Dict] = []
+        offset = 0
+
+        with get_db_connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                for chunk in _chunks(updates, chunk_size):
+                    now = datetime.datetime.now().isoformat()
+                    groups: Dict[Tuple[str, ...], List[Tuple[int, Tuple]]] = {}
+                    for index, (record_id, fields) in enumerate(chunk):
+                        try:
+                            fields = self._to_db_values(dict(fields))
+                        except ValueError as e:
+                            errors.append({'index': offset + index, 'error': str(e)})
+                            continue
+                        fields = {**fields, 'updated_at': now}
+                        keys = tuple(fields.keys())
+                        groups.setdefault(keys, []).append((offset + index, tuple(fields.values()) + (record_id,)))
+
+                    for keys, items in groups.items():
+                        set_clause = ', '.join([f"{key} = ?" for key in keys])
+                        query = f"UPDATE {self.table_name} SET {set_clause} WHERE id = ?"
+                        positions = [position for position, _ in items]
+                        rows = [row for _, row in items]
+
+                        _, changed = self._run_chunk(conn, query, rows, positions, errors)
+                        updated += changed
+                    offset += len(chunk)
+
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        if updated:
+            self._on_write()
+
+        errors.sort(key=lambda e: e['index'])
+        return {'updated': updated, 'errors': errors}
+
+    def delete_many(self, record_ids: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Deletes many records in a single transaction. Returns the number of rows removed."""
+        query = f"DELETE FROM {self.table_name} WHERE id = ?"
+        with get_db_connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                deleted = 0
+                for chunk in _chunks(record_ids, chunk_size):
+                    deleted += conn.executemany(query, [(record_id,) for record_id in chunk]).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        if deleted:
+            self._on_write()
+        return deleted
+
+
+class StagedInsert:
+    """
+    A large insert loaded in two steps. `add` converts each batch of records
+    as `create_many` does and appends it to a TEMP staging table, which has no
+    indexes, constraints or triggers. `commit` then moves every staged row
+    into the table with a single INSERT ... SELECT in one transaction, inside
+    the service's `_bulk_insert_context` and, for large loads, with the
+    non-unique indexes rebuilt afterwards rather than updated row by row.
+    Nothing is written to the table before `commit`, so closing without it
+    discards the load. Holds one pooled connection until closed; use it as a
+    context manager.
+    """
+
+    def __init__(self, service: BaseService, ignore_conflicts: bool = False):
+        self.service = service
+        self.ignore_conflicts = ignore_conflicts
+        self.staged = 0
+        self.columns: Optional[List[str]] = None
+        self._offset = 0
+        self._stage = f"staged_{service.table_name}"
+        self._cache_size: Optional[int] = None
+        self._connection = get_db_connection()
+        self._conn = self._connection.__enter__()
+        try:
+            self._cache_size = self._conn.execute("PRAGMA cache_size").fetchone()[0]
+            self._conn.execute(f"PRAGMA cache_size = {-BULK_CACHE_KIB}")
+            self._conn.execute(f"DROP TABLE IF EXISTS temp.{self._stage}")
+        except BaseException:
+            # Hand the connection back even if setting it up failed; the original error wins.
+            with contextlib.suppress(sqlite3.Error):
+                self.close()
+            raise
+
+    def __enter__(self) -> "StagedInsert":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, records: List[Dict]) -> List[Dict]:
+        """Stage one batch. Returns the records rejected by conversion, as [{"index", "error"}] within `records`."""
+        errors: List[Dict] = []
+        first = self.columns is None
+        self.columns, rows, _, _ = self.service._prepare_rows(records, 0, self.columns, errors)
+        if first and self.columns is not None:
+            self._conn.execute(f"CREATE TEMP TABLE {self._stage} ({', '.join(self.columns)})")
+        if rows:
+            placeholders = ', '.join(['?'] * len(self.columns))
+            self._conn.executemany(f"INSERT INTO temp.{self._stage} VALUES ({placeholders})", rows)
+            self._conn.commit()
+            self.staged += len(rows)
+        return errors
+
+    def commit(self) -> Dict:
+        """Move the staged rows into the table. Returns {"inserted", "skipped"}; `skipped` counts unique-key conflicts."""
+        inserted = 0
+        if self.staged:
+            columns = ', '.join(self.columns)
+            # In the order added, so of two conflicting rows the first one is kept.
+            query = f"INSERT INTO {self.service.table_name} ({columns}) SELECT {columns} FROM temp.{self._stage} ORDER BY rowid"
+            if self.ignore_conflicts:
+                query += " ON CONFLICT DO NOTHING"
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                incoming = self.staged
+                if self.ignore_conflicts:
+                    incoming -= self._drop_stored(conn)
+                with self.service._rebuilt_indexes(conn, incoming), self.service._bulk_insert_context(conn):
+                    inserted = conn.execute(query).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            if inserted:
+                self.service._on_write()
+        result = {'inserted': inserted, 'skipped': self.staged - inserted}
+        if self.columns is not None:
+            self._conn.execute(f"DELETE FROM temp.{self._stage}")
+            self._conn.commit()
+        self.staged = 0
+        return result
+
+    def _drop_stored(self, conn: sqlite3.Connection) -> int:
+        """
+        Remove staged rows whose value for a single-column unique key is already
+        stored, so that a re-import does not rebuild the indexes for rows it
+        would skip anyway. Returns the number removed.
+        """
+        removed = 0
+        for index in conn.execute(f"PRAGMA index_list({self.service.table_name})").fetchall():
+            if not index['unique']:
+                continue
+            key = [info['name'] for info in conn.execute(f"PRAGMA index_info({index['name']})")]
+            if len(key) == 1 and key[0] in self.columns:
+                removed += conn.execute(
+                    f"DELETE FROM temp.{self._stage} WHERE {key[0]} IN (SELECT {key[0]} FROM {self.service.table_name})").rowcount
+        return removed
+
+    def close(self):
+        """Drop the staging table and return the connection to the pool."""
+        if self._conn is None:
+            return
+        try:
+            if self._conn.in_transaction:
+                self._conn.rollback()
+            self._conn.execute(f"DROP TABLE IF EXISTS temp.{self._stage}")
+            if self._cache_size is not None:
+                self._conn.execute(f"PRAGMA cache_size = {self._cache_size}")
+        finally:
+            self._connection.__exit__(None, None, None)
+            self._conn = None
@@ -1,23 +1,138 @@
+import threading
 from services.base import BaseService
-from typing import Dict, Optional, List
+from services.category_rule import CategoryRuleService
+from typing import Callable, Dict, Optional, List
+
+
+class CategoryCache:
+    """
+    Active categories held in memory, with maps by id, name and type and a
+    name -> budget map. Loaded on the first lookup and shared by every
+    CategoryService (and so by every page); any write through a
+    CategoryService drops it, and the next lookup reloads the table.
+    Lookups hand out copies, so callers may modify what they get.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._categories: Optional[List[Dict]] = None
+        self._by_id: Dict[str, Dict] = {}
+        self._by_name: Dict[str, Dict] = {}
+        self._by_type: Dict[str, List[Dict]] = {}
+        self._budgets: Dict[str, object] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure(self, load: Callable[[], List[Dict]]):
+        """Count the lookup and load the maps if needed. Caller holds the lock."""
+        if self._categories is not None:
+            self.hits += 1
+            return
+        self.misses += 1
+        categories = load()
+        self._categories = categories
+        self._by_id = {category['id']: category for category in categories}
+        self._by_name = {category['name']: category for category in categories}
+        self._by_type = {}
+        for category in sorted(categories, key=lambda category: category['name']):
+            self._by_type.setdefault(category['type'], []).append(category)
+        self._budgets = {category['name']: category.get('budget') for category in categories}
+
+    def all(self, load: Callable[[], List[Dict]]) -> List[Dict]:
+        with self._lock:
+            self._ensure(load)
+            return [dict(category) for category in self._categories]
+
+    def by_id(self, record_id: str, load: Callable[[], List[Dict]]) -> Optional[Dict]:
+        with self._lock:
+            self._ensure(load)
+            category = self._by_id.get(record_id)
+            return dict(category) if category else None
+
+    def by_name(self, name: str, load: Callable[[], List[Dict]]) -> Optional[Dict]:
+        with self._lock:
+            self._ensure(load)
+            category = self._by_name.get(name)
+            return dict(category) if category else None
+
+    def by_type(self, cat_type: str, load: Callable[[], List[Dict]]) -> List[Dict]:
+        with self._lock:
+            self._ensure(load)
+            return [dict(category) for category in self._by_type.get(cat_type, [])]
+
+    def budgets(self, load: Callable[[], List[Dict]]) -> Dict[str, object]:
+        with self._lock:
+            self._ensure(load)
+            return dict(self._budgets)
+
+    def count(self, load: Callable[[], List[Dict]]) -> int:
+        with self._lock:
+            self._ensure(load)
+            return len(self._categories)
+
+    def invalidate(self):
+        with self._lock:
+            self._categories = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'categories': len(self._categories or ()), 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+category_cache = CategoryCache()
 
 
 class CategoryService(BaseService):
+    money_columns = ('budget',)
+
     def __init__(self):
         super().__init__("categories")
 
+    def _on_write(self):
+        super()._on_write()
+        category_cache.invalidate()
+
+    def _load_all(self) -> List[Dict]:
+        return super().get_all()
+
+    def get_all(self) -> List[Dict]:
+        """Fetches all active categories (cached)."""
+        return category_cache.all(self._load_all)
+
+    def get_by_id(self, record_id: str) -> Optional[Dict]:
+        """Fetches an active category by its ID (cached)."""
+        return category_cache.by_id(record_id, self._load_all)
+
     def get_by_name(self, name: str) -> Optional[Dict]:
-        """Fetches a category by its unique name."""
-        query = "SELECT * FROM categories WHERE name = ? AND is_active = 1"
-        return self._fetch_one(query, (name,))
-    
+        """Fetches a category by its unique name (cached)."""
+        return category_cache.by_name(name, self._load_all)
+
     def get_by_type(self, cat_type: str) -> List[Dict]:
-        """Fetches all categories of a specific type (Expense,  or Income)."""
-        query = "SELECT * FROM categories WHERE type = ? AND is_active = 1 ORDER BY name"
-        return self._execute(query, (cat_type,))
+        """Fetches all categories of a specific type (Expense,  or Income), by name (cached)."""
+        return category_cache.by_type(cat_type, self._load_all)
+
+    def get_budgets(self) -> Dict[str, object]:
+        """Maps each category name to its budget, or None (cached)."""
+        return category_cache.budgets(self._load_all)
 
     def get_total_count(self) -> int:
-        """Returns the total number of active categories."""
-        query = "SELECT COUNT(*) as count FROM categories WHERE is_active = 1"
-        result = self._fetch_one(query)
-        return result['count'] if result else 0
+        """Returns the total number of active categories (cached)."""
+        return category_cache.count(self._load_all)
+
+    def update(self, record_id: str, **kwargs) -> Optional[Dict]:
+        """Updates a category; renaming it carries its auto-categorisation rules along."""
+        previous = self.get_by_id(record_id) if 'name' in kwargs else None
+        result = super().update(record_id, **kwargs)
+        if result and previous and previous['name'] != result['name']:
+            CategoryRuleService().rename_category(previous['name'], result['name'])
+        return result
+
+    def delete(self, record_id: str) -> bool:
+        """Deletes a category together with its auto-categorisation rules."""
+        category = self.get_by_id(record_id)
+        deleted = super().delete(record_id)
+        if deleted and category:
+            CategoryRuleService().delete_for_category(category['name'])
+        return deleted
@@ -0,0 +1,64 @@
+import re
+from services.base import BaseService
+from tools.categoriser import RULE_KINDS, CategoryRules
+from typing import Dict, List, Optional
+
+
+class CategoryRuleService(BaseService):
+    money_columns = ('min_amount', 'max_amount')
+
+    def __init__(self):
+        super().__init__("category_rules")
+
+    def get_active_rules(self) -> List[Dict]:
+        """Fetches every active rule in the order they are tried (lowest priority first)."""
+        query = "SELECT * FROM category_rules WHERE is_active = 1 ORDER BY priority, created_at"
+        return self._execute(query)
+
+    def get_by_category(self, category: str) -> List[Dict]:
+        """Fetches the rules that assign `category`."""
+        query = "SELECT * FROM category_rules WHERE category = ? AND is_active = 1 ORDER BY priority, created_at"
+        return self._execute(query, (category,))
+
+    def add_rule(self, category: str, kind: str, pattern: Optional[str] = None, min_amount=None,
+                 max_amount=None, transaction_type: Optional[str] = None, priority: int = 100) -> Optional[Dict]:
+        """Validates and stores a rule. Raises ValueError for a rule that could never match."""
+        if kind not in RULE_KINDS:
+            raise ValueError(f"Invalid rule kind: {kind!r}")
+        pattern = (pattern or "").strip() or None
+        if kind in ('substring', 'regex') and not pattern:
+            raise ValueError("A pattern is required")
+        if kind == 'regex':
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression: {e}")
+        if kind == 'amount':
+            pattern = None
+            if min_amount is None and max_amount is None:
+                raise ValueError("An amount rule needs a minimum or a maximum")
+        if min_amount is not None and max_amount is not None and min_amount > max_amount:
+            raise ValueError("The minimum amount is above the maximum")
+
+        return self.create(
+            category=category,
+            kind=kind,
+            pattern=pattern,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            transaction_type=transaction_type or None,
+            priority=priority,
+        )
+
+    def delete_for_category(self, category: str) -> int:
+        """Removes every rule of `category`. Returns the number removed."""
+        return self.delete_many(rule['id'] for rule in self.get_by_category(category))
+
+    def rename_category(self, old_name: str, new_name: str) -> int:
+        """Points the rules of a renamed category at its new name."""
+        return self.update_many(
+            (rule['id'], {'category': new_name}) for rule in self.get_by_category(old_name))['updated']
+
+    def compile_rules(self) -> CategoryRules:
+        """All active rules compiled into a single matcher."""
+        return CategoryRules(self.get_active_rules())
@@ -0,0 +1,117 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from database.engine import get_external_generation
+
+
+# Upper bound (approximate bytes) on the query results kept in memory.
+QUERY_CACHE_BYTES = int(os.getenv("QUERY_CACHE_BYTES", str(16 * 1024 * 1024)))
+
+
+def _result_size(rows: List[Dict]) -> int:
+    """Rough in-memory size of a result: the list, each row dict and its keys and values."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for key, value in row.items():
+            size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+
+class QueryCache:
+    """
+    Results of read queries that services opt into (`cache=True` on
+    `_execute`/`_fetch_one`), keyed on the SQL text and its parameters.
+
+    Each result is stored with the write generation of every table it reads
+    from, plus the pool's external generation. Writes through a service bump
+    its table's generation (`note_write`), and any commit made by another
+    process moves `PRAGMA data_version`, which bumps the external generation;
+    either way older results stop matching and are fetched again. A result is
+    only stored if nothing was written while it was being read. Least
+    recently used results are dropped once the total exceeds `max_bytes`;
+    results larger than an eighth of it are not kept at all. Lookups hand out
+    copies, so callers may modify what they get.
+    """
+
+    def __init__(self, max_bytes: int = QUERY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._results: "OrderedDict[Hashable, Tuple[Tuple, List[Dict], int]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(query: str, params) -> Hashable:
+        if isinstance(params, dict):
+            return query, tuple(sorted(params.items()))
+        return query, tuple(params)
+
+    def token(self, tables: Iterable[str]) -> Tuple:
+        """What a result read now from `tables` depends on; take it before running the query."""
+        external = get_external_generation()
+        with self._lock:
+            return (external,) + tuple(self._generations.get(table, 0) for table in tables)
+
+    def get(self, key: Hashable, token: Tuple) -> Optional[List[Dict]]:
+        """The cached rows for `key` if they were read under `token`, else None."""
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] == token:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return [dict(row) for row in entry[1]]
+            self.misses += 1
+            if entry is not None:
+                self._drop(key)
+                self.invalidations += 1
+            return None
+
+    def put(self, key: Hashable, token: Tuple, tables: Iterable[str], rows: List[Dict]):
+        """Store `rows` read under `token`, unless a write made them stale in the meantime."""
+        if self.token(tables) != token:
+            return
+        size = _result_size(rows)
+        if size > self.max_bytes // 8:
+            return
+        with self._lock:
+            if key in self._results:
+                self._drop(key)
+            self._results[key] = (token, [dict(row) for row in rows], size)
+            self._size += size
+            while self._size > self.max_bytes and self._results:
+                self._drop(next(iter(self._results)))
+                self.evictions += 1
+
+    def _drop(self, key: Hashable):
+        """Remove one result. Caller holds the lock."""
+        _, _, size = self._results.pop(key)
+        self._size -= size
+
+    def note_write(self, *tables: str):
+        """Mark everything read from `tables` as stale; called after a committed write."""
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._size = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'results': len(self._results), 'bytes': self._size, 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'invalidations': self.invalidations,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+query_cache = QueryCache()
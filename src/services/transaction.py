@@ -1,64 +1,104 @@
-from services.base import BaseService
-from typing import Dict, List, Generator, Optional, Union
+import json
+import base64
+import datetime
+import threading
+from tools.money import Money
+from tools.fingerprint import TransactionFingerprinter, fingerprint_base, with_occurrence
+from services.base import DEFAULT_CHUNK_SIZE, BaseService, _chunks
+from typing import Callable, Dict, Iterable, List, Generator, Optional, Set, Tuple, Union
 from database.engine import get_db_connection
+from database.rollups import deferred_insert_rollup
+
+
+def encode_cursor(date: str, record_id: str) -> str:
+    """Packs a (date, id) keyset position into an opaque URL-safe token."""
+    return base64.urlsafe_b64encode(json.dumps([date, record_id]).encode()).decode()
+
+
+def decode_cursor(cursor: Union[str, Tuple[str, str]]) -> Tuple[str, str]:
+    """Accepts either a token from `encode_cursor` or a raw (date, id) tuple."""
+    if isinstance(cursor, (tuple, list)):
+        date, record_id = cursor
+        return date, record_id
+    try:
+        date, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date, record_id
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from e
+
+
+# Sortable columns -> their full ORDER BY key. Each ends in (date, id) so that
+# it is unique and matches one of the partial (column, date, id) indexes.
+SORT_KEYS = {
+    'date': ('date', 'id'),
+    'type': ('type', 'date', 'id'),
+    'category': ('category', 'date', 'id'),
+    'account': ('account', 'date', 'id'),
+    'amount': ('amount', 'date', 'id'),
+}
+# Columns a transaction's fingerprint is computed from.
+FINGERPRINT_COLUMNS = frozenset(('date', 'type', 'amount', 'account', 'description', 'external_id'))
+# Sort columns that may hold NULL (sorted first ascending, last descending).
+NULLABLE_SORT_COLUMNS = ('category',)
 
 
 class TransactionService(BaseService):
+    money_columns = ('amount', 'total', 'total_balance', 'monthly_expenses', 'monthly_income', 'total_amount')
+
     def __init__(self):
         super().__init__("transactions")
 
     def get_dashboard_summary(self, month: int, year: int) -> Dict:
-        """Calculates total balance, monthly income, and monthly expenses."""
-        month_filter = f"{year}-{month:02d}-%"
+        """Calculates total balance, monthly income, and monthly expenses from the monthly_totals rollup."""
+        ym = year * 100 + month
         
         query_balance = """
-        SELECT SUM(CASE WHEN type = 'Income' THEN amount ELSE 0 END) - 
-               SUM(CASE WHEN type = 'Expense' THEN amount ELSE 0 END) AS total_balance
-        FROM transactions WHERE is_active = 1;
+        SELECT SUM(CASE WHEN type = 'Income' THEN total ELSE 0 END) - 
+               SUM(CASE WHEN type = 'Expense' THEN total ELSE 0 END) AS total_balance
+        FROM monthly_totals;
         """
         
         query_metrics = f"""
         SELECT 
-            SUM(CASE WHEN type = 'Expense' THEN amount ELSE 0 END) AS monthly_expenses,
-            SUM(CASE WHEN type = 'Income' THEN amount ELSE 0 END) AS monthly_income
-        FROM transactions
-        WHERE is_active = 1 AND date LIKE ?;
+            SUM(CASE WHEN type = 'Expense' THEN total ELSE 0 END) AS monthly_expenses,
+            SUM(CASE WHEN type = 'Income' THEN total ELSE 0 END) AS monthly_income
+        FROM monthly_totals
+        WHERE ym = ?;
         """
         
-        balance_row = self._fetch_one(query_balance)
-        metrics_row = self._fetch_one(query_metrics, (month_filter,))
+        balance_row = self._fetch_one(query_balance, cache=True)
+        metrics_row = self._fetch_one(query_metrics, (ym,), cache=True)
         
         return {
-            'total_balance': balance_row['total_balance'] if balance_row and balance_row['total_balance'] is not None else 0.0,
-            'monthly_expenses': metrics_row['monthly_expenses'] if metrics_row and metrics_row['monthly_expenses'] is not None else 0.0,
-            'monthly_income': metrics_row['monthly_income'] if metrics_row and metrics_row['monthly_income'] is not None else 0.0,
+            'total_balance': balance_row['total_balance'] if balance_row and balance_row['total_balance'] is not None else Money(0),
+            'monthly_expenses': metrics_row['monthly_expenses'] if metrics_row and metrics_row['monthly_expenses'] is not None else Money(0),
+            'monthly_income': metrics_row['monthly_income'] if metrics_row and metrics_row['monthly_income'] is not None else Money(0),
         }
 
-    def get_spending_breakdown(self, month: int, year: int, as_list: bool = False) -> Union[Dict[str, float], List[Dict[str, float]]]:
+    def get_spending_breakdown(self, month: int, year: int, as_list: bool = False) -> Union[Dict[str, Money], List[Dict[str, Money]]]:
         """Gets expense totals grouped by category for the chart.
 
         - Default return value: dict mapping category -> total_amount (backwards compatible).
-        - If `as_list=True`, returns a list of {"category_name": <str>, "total_amount": <float>} sorted by amount desc — better for chart libraries.
+        - If `as_list=True`, returns a list of {"category_name": <str>, "total_amount": <Money>} sorted by amount desc — better for chart libraries.
         """
-        month_filter = f"{year}-{month:02d}-%"
+        ym = year * 100 + month
         query = """
         SELECT 
-            COALESCE(NULLIF(t.category, ''), 'Uncategorized') AS category_name,
-            COALESCE(SUM(t.amount), 0.0) AS total_amount
-        FROM transactions t
-        WHERE t.type = 'Expense'
-            AND t.is_active = 1 
-            AND t.date LIKE ?
-        GROUP BY t.category
+            COALESCE(NULLIF(m.category, ''), 'Uncategorized') AS category_name,
+            COALESCE(SUM(m.total), 0) AS total_amount
+        FROM monthly_totals m
+        WHERE m.ym = ?
+            AND m.type = 'Expense'
+        GROUP BY category_name
         ORDER BY total_amount DESC;
         """
         
-        rows = self._execute(query, (month_filter,))
+        rows = self._execute(query, (ym,), cache=True)
 
-        result_map: Dict[str, float] = {}
+        result_map: Dict[str, Money] = {}
         for row in rows:
             category = row.get('category_name') if isinstance(row, dict) else row['category_name']
-            amount = float(row.get('total_amount') if isinstance(row, dict) else row['total_amount'])
+            amount = row.get('total_amount') if isinstance(row, dict) else row['total_amount']
             result_map[category] = amount
 
         if as_list:
@@ -80,7 +120,7 @@ class TransactionService(BaseService):
         LIMIT ?;
         """
         
-        return self._execute(query, (limit,))
+        return self._execute(query, (limit,), cache=True)
 
     
     def get_by_date(self, date_str: str) -> List[Dict]:
@@ -88,39 +128,183 @@ class TransactionService(BaseService):
         query = f"SELECT * FROM {self.table_name} WHERE date = ? AND is_active = 1"
         return self._execute(query, (date_str,))
 
+    def _bulk_insert_context(self, conn):
+        """Bulk inserts update monthly_totals once per call instead of once per row."""
+        return deferred_insert_rollup(conn)
+
     def stream_by_category(self, category: str, batch_size: int = 500) -> Generator[Dict, None, None]:
         """Stream transactions for a specific category from the database in batches."""
         with get_db_connection() as db:
-            with db.execute('SELECT * FROM transactions WHERE category = ? AND is_active = 1', (category,)) as cursor:
-                while True:
-                    rows = cursor.fetchmany(batch_size)
-                    if not rows:
-                        break
-                    for row in rows:
-                        yield dict(row)
-
-    def stream_transactions(self, batch_size: int = 500) -> Generator[Dict, None, None]:
-        """Stream transactions from the database in batches."""
+            cursor = db.execute('SELECT * FROM transactions WHERE category = ? AND is_active = 1', (category,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_dict(row)
+
+    def stream_transactions(self, batch_size: int = 500, transaction_type: Optional[str] = None,
+                            category: Optional[str] = None, account: Optional[str] = None,
+                            start_date: Optional[str] = None, end_date: Optional[str] = None) -> Generator[Dict, None, None]:
+        """Stream transactions from the database in batches, newest first, optionally filtered."""
+        conditions, params = self._filter_conditions(transaction_type, category, account, start_date, end_date)
         with get_db_connection() as db:
-            with db.execute('SELECT * FROM transactions WHERE is_active = 1 ORDER BY date DESC') as cursor:
-                while True:
-                    rows = cursor.fetchmany(batch_size)
-                    if not rows:
-                        break
-                    for row in rows:
-                        yield dict(row)
+            cursor = db.execute(f'SELECT * FROM transactions WHERE {" AND ".join(conditions)} ORDER BY date DESC, id DESC', params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_dict(row)
+
+    def _next_fingerprint(self, record: Dict, external_id: Optional[str] = None,
+                          exclude_id: Optional[str] = None, taken: Iterable[str] = ()) -> str:
+        """
+        The fingerprint for one more transaction like `record`: the first
+        occurrence not yet stored (on a row other than `exclude_id`) nor in `taken`.
+        """
+        base = fingerprint_base(record['date'], record['type'], Money.from_value(record['amount']).minor,
+                                record['account'], record.get('description'), external_id)
+        occurrence = 0
+        while True:
+            fingerprint = with_occurrence(base, occurrence)
+            if fingerprint not in taken and not self._fetch_one(
+                    f"SELECT 1 AS found FROM {self.table_name} WHERE fingerprint = ? AND id IS NOT ?",
+                    (fingerprint, exclude_id)):
+                return fingerprint
+            occurrence += 1
+
+    def _refingerprint(self, updates: List[Tuple[str, Dict]], taken: Set[str]) -> List[Tuple[str, Dict]]:
+        """
+        Adds a recomputed fingerprint to each (record_id, fields) update that
+        changes a column the fingerprint is made of, so a re-import matches the
+        edited row rather than its old values. Fingerprints handed out are added
+        to `taken`. Rows with invalid fields are left for the update to reject.
+        """
+        ids = [record_id for record_id, fields in updates
+               if 'fingerprint' not in fields and not FINGERPRINT_COLUMNS.isdisjoint(fields)]
+        if not ids:
+            return updates
+        placeholders = ', '.join(['?'] * len(ids))
+        current = {row['id']: row for row in self._execute(
+            f"SELECT id, type, amount, date, account, description, external_id FROM {self.table_name} "
+            f"WHERE id IN ({placeholders})", ids)}
+
+        result = []
+        for record_id, fields in updates:
+            row = current.get(record_id)
+            if row is not None and 'fingerprint' not in fields and not FINGERPRINT_COLUMNS.isdisjoint(fields):
+                record = {**row, **fields}
+                try:
+                    fingerprint = self._next_fingerprint(record, (record.get('external_id') or "").strip() or None,
+                                                         exclude_id=record_id, taken=taken)
+                except (KeyError, ValueError):
+                    pass
+                else:
+                    taken.add(fingerprint)
+                    fields = {**fields, 'fingerprint': fingerprint}
+            result.append((record_id, fields))
+        return result
+
+    def update(self, record_id: str, **kwargs) -> Optional[Dict]:
+        """Updates a transaction, recomputing its fingerprint if a column it is made of changes."""
+        [(_, fields)] = self._refingerprint([(record_id, kwargs)], set())
+        return super().update(record_id, **fields)
+
+    def update_many(self, updates: Iterable[Tuple[str, Dict]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+        """BaseService.update_many, recomputing fingerprints as `update` does."""
+        taken: Set[str] = set()
+        refingerprinted = (update for chunk in _chunks(updates, chunk_size)
+                           for update in self._refingerprint(chunk, taken))
+        return super().update_many(refingerprinted, chunk_size)
 
     def add_transaction(self, transaction_data: Dict) -> Optional[Dict]:
         """Add a new transaction to the database"""
-        return self.create(**{
+        record = {
             'type': transaction_data['type'],
             'amount': transaction_data['amount'],
             'date': transaction_data['date'],
             'category': transaction_data['category'],
             'account': transaction_data['account'],
             'description': transaction_data.get('description', '')
-        })
-    
+        }
+        return self.create(**record, fingerprint=self._next_fingerprint(record))
+
+    def add_transactions(self, transactions: Iterable[Dict], chunk_size: int = 1000,
+                         return_ids: bool = True,
+                         fingerprinter: Optional[TransactionFingerprinter] = None) -> Dict:
+        """
+        Add many transactions in one batched write, idempotently: each row is
+        fingerprinted (see TransactionFingerprinter) and rows already stored are
+        skipped through INSERT ... ON CONFLICT DO NOTHING. Pass the same
+        `fingerprinter` to every call that belongs to one import. See
+        BaseService.create_many for the result shape.
+        """
+        fingerprinter = fingerprinter or TransactionFingerprinter()
+        rejected: List[Dict] = []
+
+        def records():
+            for index, transaction_data in enumerate(transactions):
+                try:
+                    record = {
+                        'type': transaction_data['type'],
+                        'amount': transaction_data['amount'],
+                        'date': transaction_data['date'],
+                        'category': transaction_data['category'],
+                        'account': transaction_data['account'],
+                        'description': transaction_data.get('description', ''),
+                        'external_id': transaction_data.get('external_id'),
+                    }
+                except KeyError as e:
+                    rejected.append({'index': index, 'error': f"missing field {e}"})
+                    continue
+                yield fingerprinter(record)
+
+        result = self.create_many(records(), chunk_size=chunk_size, return_ids=return_ids, ignore_conflicts=True)
+        if rejected:
+            # create_many numbers the rows it was given; map them back to input positions.
+            for error in result['errors']:
+                for skipped in rejected:
+                    if skipped['index'] <= error['index']:
+                        error['index'] += 1
+            result['errors'] = sorted(result['errors'] + rejected, key=lambda e: e['index'])
+        return result
+
+    def recategorise(self, rules, only_uncategorised: bool = False, batch_size: int = 5000,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     cancel: Optional[threading.Event] = None) -> Dict:
+        """
+        Re-apply auto-categorisation `rules` (a CategoryRules) to every active
+        transaction, scanning in rowid order and writing only the rows whose
+        category changes, one transaction per batch. Rows no rule matches keep
+        their category. Returns {"scanned", "updated", "cancelled"}.
+        """
+        result = {'scanned': 0, 'updated': 0, 'cancelled': False}
+        total = self.get_total_count() if progress else 0
+        last_rowid = 0
+        while True:
+            if cancel is not None and cancel.is_set():
+                result['cancelled'] = True
+                break
+            condition = " AND category IS NULL" if only_uncategorised else ""
+            rows = self._execute(
+                f"SELECT rowid AS row_id, id, type, amount, description, category FROM {self.table_name} "
+                f"WHERE rowid > ? AND is_active = 1{condition} ORDER BY rowid LIMIT ?", (last_rowid, batch_size))
+            if not rows:
+                break
+            changes = []
+            for row in rows:
+                category = rules.categorise(row['description'], row['amount'], row['type'])
+                if category and category != row['category']:
+                    changes.append((row['id'], {'category': category}))
+            if changes:
+                result['updated'] += self.update_many(changes, chunk_size=len(changes))['updated']
+            result['scanned'] += len(rows)
+            last_rowid = rows[-1]['row_id']
+            if progress:
+                progress(result['scanned'], total)
+        return result
+
     def get_transactions_by_type(self, transaction_type: str) -> List[Dict]:
         """Get all transactions of a specific type (Expense, Income, Transfer)"""
         query = f"SELECT * FROM {self.table_name} WHERE type = ? AND is_active = 1 ORDER BY date DESC"
@@ -141,14 +325,245 @@ class TransactionService(BaseService):
         query = f"SELECT * FROM {self.table_name} WHERE date BETWEEN ? AND ? AND is_active = 1 ORDER BY date DESC"
         return self._execute(query, (start_date, end_date))
     
-    def get_total_by_type(self, transaction_type: str) -> float:
+    @staticmethod
+    def _filter_conditions(transaction_type: Optional[str] = None, category: Optional[str] = None,
+                           account: Optional[str] = None, start_date: Optional[str] = None,
+                           end_date: Optional[str] = None) -> Tuple[List[str], List]:
+        """Builds the WHERE conditions and parameters shared by the filtered transaction queries."""
+        conditions = ["is_active = 1"]
+        params: List = []
+        if transaction_type:
+            conditions.append("type = ?")
+            params.append(transaction_type)
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        if account:
+            conditions.append("account = ?")
+            params.append(account)
+        if start_date:
+            conditions.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("date <= ?")
+            params.append(end_date)
+        return conditions, params
+
+    def count_transactions(self, transaction_type: Optional[str] = None, category: Optional[str] = None,
+                           account: Optional[str] = None, start_date: Optional[str] = None,
+                           end_date: Optional[str] = None) -> int:
+        """Counts active transactions matching the same filters as `stream_transactions`."""
+        conditions, params = self._filter_conditions(transaction_type, category, account, start_date, end_date)
+        result = self._fetch_one(f"SELECT COUNT(*) as count FROM {self.table_name} WHERE {' AND '.join(conditions)}", params, cache=True)
+        return result['count'] if result else 0
+
+    def get_transactions_page(self, transaction_type: Optional[str] = None, category: Optional[str] = None,
+                              account: Optional[str] = None, start_date: Optional[str] = None,
+                              end_date: Optional[str] = None,
+                              after: Optional[Union[str, Tuple[str, str]]] = None,
+                              limit: int = 100) -> Dict:
+        """
+        Fetches one page of transactions, newest first, using a keyset seek on (date, id).
+
+        `after` is the `next_cursor` of the previous page (or a raw (date, id) tuple).
+        Returns {"items": [...], "next_cursor": str or None}; `next_cursor` is None on the last page.
+        """
+        conditions, params = self._filter_conditions(transaction_type, category, account, start_date, end_date)
+        if after is not None:
+            conditions.append("(date, id) < (?, ?)")
+            params.extend(decode_cursor(after))
+
+        query = f"""
+        SELECT * FROM {self.table_name}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY date DESC, id DESC
+        LIMIT ?
+        """
+        rows = self._execute(query, (*params, limit + 1))
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['date'], rows[-1]['id'])
+        return {'items': rows, 'next_cursor': next_cursor}
+
+    @staticmethod
+    def _report_spans(start_date: Optional[str], end_date: Optional[str]):
+        """
+        Splits a date range into the whole months it covers, as a (first ym, last ym)
+        pair with None for an open end, and the partial months at either end as
+        (start, end) date ranges. The months are None when the range holds no whole month.
+        """
+        start = datetime.date.fromisoformat(start_date) if start_date else None
+        end = datetime.date.fromisoformat(end_date) if end_date else None
+        first_full = start
+        if start and start.day != 1:
+            first_full = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        last_full = end
+        if end and (end + datetime.timedelta(days=1)).day != 1:
+            last_full = end.replace(day=1) - datetime.timedelta(days=1)
+
+        if first_full and last_full and first_full > last_full:
+            return None, [(start_date, end_date)]
+        partial = []
+        if start and first_full != start:
+            partial.append((start_date, (first_full - datetime.timedelta(days=1)).isoformat()))
+        if end and last_full != end:
+            partial.append((end.replace(day=1).isoformat(), end_date))
+        months = (first_full.year * 100 + first_full.month if first_full else None,
+                  last_full.year * 100 + last_full.month if last_full else None)
+        return months, partial
+
+    def get_report_summary(self, transaction_type: Optional[str] = None, category: Optional[str] = None,
+                           account: Optional[str] = None, start_date: Optional[str] = None,
+                           end_date: Optional[str] = None) -> Dict:
+        """
+        Totals for the report filters, computed in SQL: whole months inside the
+        range come from the monthly_totals rollup and only the partial months at
+        either end are aggregated from transactions.
+
+        Returns {"income", "expense", "transfer", "count", "expense_by_category"},
+        the last being category -> total, largest first.
+        """
+        months, partial = self._report_spans(start_date, end_date)
+        groups: List[Dict] = []
+
+        for span_start, span_end in partial:
+            conditions, params = self._filter_conditions(transaction_type, category, account, span_start, span_end)
+            groups += self._execute(f"""
+            SELECT type, COALESCE(category, '') AS category, SUM(amount) AS total, COUNT(*) AS count
+            FROM {self.table_name}
+            WHERE {' AND '.join(conditions)}
+            GROUP BY type, COALESCE(category, '')
+            """, params, cache=True)
+
+        if months is not None:
+            conditions, params = [], []
+            for column, value in (('type', transaction_type), ('category', category), ('account', account)):
+                if value:
+                    conditions.append(f"{column} = ?")
+                    params.append(value)
+            for operator, ym in ((">=", months[0]), ("<=", months[1])):
+                if ym is not None:
+                    conditions.append(f"ym {operator} ?")
+                    params.append(ym)
+            groups += self._execute(f"""
+            SELECT type, category, SUM(total) AS total, SUM(count) AS count
+            FROM monthly_totals
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            GROUP BY type, category
+            """, params, cache=True)
+
+        totals = {'Income': Money(0), 'Expense': Money(0), 'Transfer': Money(0)}
+        by_category: Dict[str, Money] = {}
+        count = 0
+        for group in groups:
+            totals[group['type']] += group['total']
+            count += group['count']
+            if group['type'] == 'Expense':
+                name = group['category'] or 'Uncategorized'
+                by_category[name] = by_category.get(name, Money(0)) + group['total']
+
+        return {
+            'income': totals['Income'],
+            'expense': totals['Expense'],
+            'transfer': totals['Transfer'],
+            'count': count,
+            'expense_by_category': dict(sorted(by_category.items(), key=lambda item: item[1], reverse=True)),
+        }
+
+    @staticmethod
+    def sort_key(row: Dict, sort_by: str = 'date') -> Tuple:
+        """The keyset position of `row` under `sort_by`, as stored in the database."""
+        return tuple(int(row[column]) if isinstance(row[column], Money) else row[column]
+                     for column in SORT_KEYS[sort_by])
+
+    @staticmethod
+    def _keyset_segments(sort_by: str, descending: bool, start: Optional[Tuple], inclusive: bool) -> List[Tuple[str, List]]:
+        """
+        The WHERE conditions, in order, that together select the rows at or after
+        `start`. A nullable sort column gives two segments, one for NULLs and one
+        for values, so that each stays a plain index seek.
+        """
+        columns = SORT_KEYS[sort_by]
+        operator = ("<" if descending else ">") + ("=" if inclusive else "")
+
+        def after(keys: Tuple[str, ...], values: Tuple) -> Tuple[str, List]:
+            return f"({', '.join(keys)}) {operator} ({', '.join('?' * len(keys))})", list(values)
+
+        if columns[0] not in NULLABLE_SORT_COLUMNS:
+            return [after(columns, start) if start is not None else ("1", [])]
+
+        nulls, values = f"{columns[0]} IS NULL", f"{columns[0]} IS NOT NULL"
+        # NULLs sort first ascending and last descending.
+        if start is None:
+            return [(values, []), (nulls, [])] if descending else [(nulls, []), (values, [])]
+        if start[0] is None:
+            condition, params = after(columns[1:], start[1:])
+            segment = (f"{nulls} AND {condition}", params)
+            return [segment] if descending else [segment, (values, [])]
+        return [after(columns, start), (nulls, [])] if descending else [after(columns, start)]
+
+    def get_sorted_page(self, sort_by: str = 'date', descending: bool = True, start: Optional[Tuple] = None,
+                        inclusive: bool = True, limit: int = 100, transaction_type: Optional[str] = None,
+                        category: Optional[str] = None, account: Optional[str] = None,
+                        start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
+        """
+        Up to `limit` filtered transactions in `sort_by` order, beginning at the
+        keyset position `start` (a `sort_key`; excluded unless `inclusive`), or
+        at the top when `start` is None.
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Cannot sort by {sort_by!r}")
+        conditions, params = self._filter_conditions(transaction_type, category, account, start_date, end_date)
+        direction = " DESC" if descending else ""
+        rows: List[Dict] = []
+        for condition, keyset_params in self._keyset_segments(sort_by, descending, start, inclusive):
+            query = f"""
+            SELECT * FROM {self.table_name}
+            WHERE {' AND '.join(conditions)} AND {condition}
+            ORDER BY {', '.join(column + direction for column in SORT_KEYS[sort_by])}
+            LIMIT ?
+            """
+            rows += self._execute(query, (*params, *keyset_params, limit - len(rows)))
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def get_sort_anchors(self, sort_by: str = 'date', descending: bool = True, every: int = 200,
+                         transaction_type: Optional[str] = None, category: Optional[str] = None,
+                         account: Optional[str] = None, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> List[Tuple]:
+        """
+        The `sort_key` of every `every`-th filtered row (positions 0, every, 2 * every, ...),
+        so that `get_sorted_page(start=anchors[n])` seeks straight to row n * every.
+        One pass over the sort index, numbered by a window function.
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Cannot sort by {sort_by!r}")
+        conditions, params = self._filter_conditions(transaction_type, category, account, start_date, end_date)
+        columns = ', '.join(SORT_KEYS[sort_by])
+        direction = " DESC" if descending else ""
+        # The few anchors are put in order here; an ORDER BY would add a sort step to the query.
+        query = f"""
+        SELECT position, {columns} FROM (
+            SELECT {columns}, ROW_NUMBER() OVER (ORDER BY {', '.join(column + direction for column in SORT_KEYS[sort_by])}) AS position
+            FROM {self.table_name}
+            WHERE {' AND '.join(conditions)}
+        )
+        WHERE (position - 1) % ? = 0
+        """
+        with get_db_connection() as conn:
+            return [tuple(row)[1:] for row in sorted(conn.execute(query, (*params, every)), key=lambda row: row[0])]
+
+    def get_total_by_type(self, transaction_type: str) -> Money:
         """Calculate total amount for a specific transaction type"""
         query = f"SELECT SUM(amount) as total FROM {self.table_name} WHERE type = ? AND is_active = 1"
-        result = self._fetch_one(query, (transaction_type,))
-        return result['total'] if result and result['total'] else 0.0
+        result = self._fetch_one(query, (transaction_type,), cache=True)
+        return result['total'] if result and result['total'] else Money(0)
 
     def get_total_count(self) -> int:
         """Get total count of active transactions"""
         query = f"SELECT COUNT(*) as count FROM {self.table_name} WHERE is_active = 1"
-        result = self._fetch_one(query)
+        result = self._fetch_one(query, cache=True)
         return result['count'] if result else 0
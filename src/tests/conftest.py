@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+
+import tools.money as money
+from database import engine
+from database.migrations import migration_2
+from services.category import category_cache
+from services.query_cache import query_cache
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A scratch database behind the shared pool, with the process-wide caches reset around it."""
+    path = str(tmp_path / "finance.db")
+    engine.configure_pool(path)
+    monkeypatch.setattr(money, "_scale", None)
+    query_cache.clear()
+    category_cache.invalidate()
+    yield path
+    engine.configure_pool(engine.DB_URL)
+    query_cache.clear()
+    category_cache.invalidate()
+
+
+@pytest.fixture
+def legacy_database(database):
+    """
+    Fills the scratch database as releases before the migration runner left it:
+    the initial schema plus migration 2's indexes, REAL amounts, and the version
+    kept in the schema_version table rather than PRAGMA user_version.
+    """
+    def create(transactions=(), categories=()):
+        _create_legacy_database(database, transactions, categories)
+    return create
+
+
+def _create_legacy_database(path: str, transactions, categories):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(engine.SCHEMA)
+    migration_2(conn)
+    conn.execute("INSERT INTO schema_version (version) VALUES (2)")
+    conn.executemany(
+        "INSERT INTO transactions (id, type, amount, date, category, account, description, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, '2024-01-01T00:00:00', '2024-01-01T00:00:00')", transactions)
+    conn.executemany(
+        "INSERT INTO categories (id, name, type, budget, description, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, '', '2024-01-01T00:00:00', '2024-01-01T00:00:00')", categories)
+    conn.commit()
+    conn.close()
@@ -0,0 +1,95 @@
+import pytest
+
+import database.migrations as migrations
+from database.engine import get_db_connection
+from database.migrations import LATEST_VERSION, MONEY_ROUNDED_UP_KEY, migrate
+from services.transaction import TransactionService
+from tools.money import Money
+from tools.utils import Utils
+
+
+LEGACY_TRANSACTIONS = [
+    ('t1', 'Expense', 12.34, '2024-03-05', 'Groceries', 'Checking', 'market'),
+    ('t2', 'Expense', 0.1 + 0.2, '2024-03-06', 'Groceries', 'Checking', 'float error'),
+    ('t3', 'Income', 2500.0, '2024-03-01', 'Salary', 'Checking', 'pay'),
+    ('t4', 'Expense', 0.004, '2024-03-07', 'Fees', 'Checking', 'under half a cent'),
+    ('t5', 'Expense', 12.34, '2024-03-05', 'Groceries', 'Checking', 'market'),
+]
+LEGACY_CATEGORIES = [('c1', 'Groceries', 'Expense', 500.5), ('c2', 'Salary', 'Income', None)]
+
+
+@pytest.fixture(autouse=True)
+def dollars(monkeypatch):
+    """Migration 6 picks its scale from the currency setting; pin it to cents."""
+    monkeypatch.setattr(Utils, "load_app_settings", staticmethod(lambda: {"currency": "$"}))
+
+
+def _quiet(message, done, total):
+    pass
+
+
+def _amounts(conn):
+    return {row['id']: row['amount'] for row in conn.execute("SELECT id, amount FROM transactions")}
+
+
+def test_migrate_adopts_legacy_schema_version(legacy_database):
+    legacy_database(LEGACY_TRANSACTIONS, LEGACY_CATEGORIES)
+
+    notices = migrate(progress=_quiet)
+
+    with get_db_connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+        assert _amounts(conn) == {'t1': 1234, 't2': 30, 't3': 250000, 't4': 1, 't5': 1234}
+        budgets = {row['name']: row['budget'] for row in conn.execute("SELECT name, budget FROM categories")}
+        assert budgets == {'Groceries': 50050, 'Salary': None}
+        fingerprints = [row[0] for row in conn.execute("SELECT fingerprint FROM transactions")]
+        assert None not in fingerprints and len(set(fingerprints)) == len(fingerprints)
+        assert conn.execute("SELECT 1 FROM preferences WHERE item = ?", (MONEY_ROUNDED_UP_KEY,)).fetchone() is None
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'migration_progress'").fetchone() is not None
+        assert conn.execute("SELECT COUNT(*) FROM migration_progress").fetchone()[0] == 0
+
+    assert notices == ["1 transaction amount(s) smaller than half a minor unit were rounded up to 0.01."]
+    summary = TransactionService().get_dashboard_summary(3, 2024)
+    assert summary['monthly_income'] == Money(250000)
+    assert summary['monthly_expenses'] == Money(1234 + 30 + 1 + 1234)
+
+    # An up-to-date database is left alone.
+    assert migrate(progress=_quiet) == []
+
+
+def test_batched_migration_resumes_after_a_failed_batch(legacy_database, monkeypatch):
+    transactions = [(f"t{i:03}", 'Expense', i + 0.25, '2024-02-10', 'Groceries', 'Cash', f"row {i}")
+                    for i in range(1, 12)]
+    legacy_database(transactions, LEGACY_CATEGORIES)
+
+    original_batch = migrations.migration_6.batch
+    calls = []
+
+    def failing_batch(db, position, size):
+        calls.append(position)
+        if len(calls) == 3:
+            raise RuntimeError("disk unplugged")
+        return original_batch(db, position, size)
+
+    monkeypatch.setattr(migrations.migration_6, "batch_size", 4)
+    monkeypatch.setattr(migrations.migration_6, "batch", failing_batch)
+    with pytest.raises(RuntimeError):
+        migrate(progress=_quiet)
+
+    with get_db_connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 5
+        progress = conn.execute("SELECT position, done FROM migration_progress WHERE version = 6").fetchone()
+        assert progress['done'] == 8
+        assert conn.execute("SELECT COUNT(*) FROM transactions_new").fetchone()[0] == 8
+        # The legacy table is untouched until the migration finalizes.
+        assert _amounts(conn)['t001'] == 1.25
+
+    monkeypatch.setattr(migrations.migration_6, "batch", original_batch)
+    migrate(progress=_quiet)
+
+    with get_db_connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+        assert _amounts(conn) == {f"t{i:03}": i * 100 + 25 for i in range(1, 12)}
+        assert conn.execute("SELECT COUNT(*) FROM migration_progress").fetchone()[0] == 0
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'transactions_new'").fetchone() is None
+    assert TransactionService().get_total_count() == 11
@@ -0,0 +1,6 @@
+from database.query_plans import check_query_plans
+
+
+def test_service_queries_use_their_indexes():
+    failures = check_query_plans()
+    assert not failures, "Query plan regressions:\n" + "\n".join(failures)
@@ -0,0 +1,140 @@
+"""
+Auto-categorisation throughput benchmark.
+
+Builds a synthetic rule set (substring, regex and amount rules), then measures
+the compiled matcher on its own, the same rules tried one by one, and
+`TransactionService.recategorise` over a scratch database. Figures are
+reported as rows/s and seconds per million rows.
+
+Run from `src/` with `python -m tools.categorise_benchmark [rules] [rows]`.
+"""
+import os
+import re
+import sys
+import time
+import random
+import tempfile
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from database import engine
+from database.migrations import migrate
+from tools.money import Money
+from tools.categoriser import CategoryRules
+from services.transaction import TransactionService
+from services.category_rule import CategoryRuleService
+
+
+WORDS = ["market", "coffee", "fuel", "power", "water", "online", "pharma", "diner", "rent", "payroll",
+         "store", "taxi", "hotel", "cinema", "books", "gym", "telecom", "insurance", "bakery", "garden"]
+
+
+def _rules(count: int) -> List[Dict]:
+    """Mostly merchant substrings, with a tenth regexes and a few amount rules, as users tend to write."""
+    rng = random.Random(11)
+    rules = []
+    for number in range(count):
+        category = f"Category {number % 40}"
+        word = f"{rng.choice(WORDS)}{number}"
+        if number % 10 == 0:
+            rules.append({'category': category, 'kind': 'regex', 'pattern': rf"\b{word}\s+#\d+"})
+        elif number % 25 == 1:
+            rules.append({'category': category, 'kind': 'amount', 'min_amount': Money(500000), 'transaction_type': 'Income'})
+        else:
+            rules.append({'category': category, 'kind': 'substring', 'pattern': word})
+        rules[-1].update(priority=100, created_at=f"{number:06d}")
+    return rules
+
+
+def _descriptions(rules: List[Dict], rows: int) -> List[Tuple[str, int, str]]:
+    """(description, amount in minor units, type); about half of the rows match some rule."""
+    rng = random.Random(5)
+    words = [rule['pattern'] for rule in rules if rule['kind'] == 'substring']
+    sample = []
+    for number in range(rows):
+        if number % 2:
+            description = f"POS {rng.choice(words).upper()} LONDON GB {number}"
+        else:
+            description = f"Card payment {rng.choice(WORDS)} ref {number}"
+        sample.append((description, rng.randint(100, 900000), rng.choice(["Expense", "Expense", "Income"])))
+    return sample
+
+
+def _one_by_one(rules: List[Dict]):
+    """The straightforward matcher the compiled one replaces: every rule tried in turn."""
+    compiled = [(rule, re.compile(rule['pattern'], re.IGNORECASE) if rule['kind'] == 'regex' else None) for rule in rules]
+
+    def match(description: str, amount: int, kind: str):
+        text = description.casefold()
+        for rule, pattern in compiled:
+            if rule.get('transaction_type') and rule['transaction_type'] != kind:
+                continue
+            if rule.get('min_amount') is not None and amount < int(rule['min_amount']):
+                continue
+            if rule['kind'] == 'substring' and rule['pattern'] not in text:
+                continue
+            if pattern is not None and not pattern.search(description):
+                continue
+            return rule
+        return None
+    return match
+
+
+def _timed(match, sample) -> Tuple[float, int]:
+    started = time.perf_counter()
+    matched = sum(1 for description, amount, kind in sample if match(description, amount, kind))
+    return time.perf_counter() - started, matched
+
+
+def run_benchmark(rule_count: int = 300, rows: int = 200000) -> List[Dict]:
+    rules = _rules(rule_count)
+    sample = _descriptions(rules, rows)
+
+    started = time.perf_counter()
+    compiled = CategoryRules(rules)
+    compile_seconds = time.perf_counter() - started
+
+    results = []
+    seconds, matched = _timed(compiled.match, sample)
+    results.append({'name': f"compiled matcher (compiled in {compile_seconds * 1000:.0f} ms)", 'rows': rows,
+                    'seconds': seconds, 'matched': matched})
+    seconds, matched = _timed(_one_by_one(rules), sample)
+    results.append({'name': "rules tried one by one", 'rows': rows, 'seconds': seconds, 'matched': matched})
+
+    with tempfile.TemporaryDirectory() as scratch:
+        engine.configure_pool(os.path.join(scratch, "categorise.db"))
+        try:
+            migrate(progress=lambda message, done, total: None)
+            rule_service = CategoryRuleService()
+            rule_service.create_many(
+                {key: rule.get(key) for key in ('category', 'kind', 'pattern', 'min_amount', 'max_amount',
+                                                'transaction_type', 'priority')}
+                for rule in rules)
+            service = TransactionService()
+            start = date.today() - timedelta(days=3650)
+            service.add_transactions(({
+                'type': kind, 'amount': amount / 100, 'date': (start + timedelta(days=number % 3650)).isoformat(),
+                'category': None, 'account': "Checking", 'description': description,
+            } for number, (description, amount, kind) in enumerate(sample)), chunk_size=10000, return_ids=False)
+
+            started = time.perf_counter()
+            outcome = service.recategorise(rule_service.compile_rules())
+            seconds = time.perf_counter() - started
+            results.append({'name': "recategorise (database)", 'rows': outcome['scanned'], 'seconds': seconds,
+                            'matched': outcome['updated']})
+        finally:
+            engine.configure_pool(engine.DB_URL)
+    return results
+
+
+def main():
+    rule_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    print(f"==> Categorising {rows:,} transactions with {rule_count} rules")
+    for result in run_benchmark(rule_count, rows):
+        print(f"  - {result['name']:<42} {result['rows'] / result['seconds']:>10,.0f} rows/s  "
+              f"{result['seconds'] / result['rows'] * 1e6:7.1f} s per million rows  matched: {result['matched']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from tools.money import Money
+
+
+RULE_KINDS = ('substring', 'regex', 'amount')
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    A regex matching any of `words`, built from their trie so that at every
+    position the engine follows a single branch per character (the effect of
+    Aho-Corasick inside the C regex engine). Longer words win over their prefixes.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        pattern = '(?:' + '|'.join(branches) + ')'
+        return pattern + '?' if '' in node else pattern
+
+    return build(trie)
+
+
+class CategoryRules:
+    """
+    A set of auto-categorisation rules compiled into one matcher.
+
+    Each rule maps to a category and is a case-insensitive substring or regex
+    on the description, or an amount range alone; pattern rules may also carry
+    an amount range and a transaction type. The rule with the lowest priority
+    wins. All substrings are folded into a single trie-shaped regex scanned
+    once per description, and unconstrained regex rules into one alternation
+    that is searched once before any of them is tried on its own, so the cost
+    per row barely grows with the number of rules.
+    """
+
+    def __init__(self, rules: Sequence[Dict]):
+        self.rules: List[Dict] = sorted(rules, key=lambda rule: (rule.get('priority') or 0, rule.get('created_at') or ''))
+        literals: Dict[str, List[int]] = {}
+        self._regex_ranks: List[int] = []
+        self._checked: List[int] = []
+
+        for rank, rule in enumerate(self.rules):
+            kind, pattern = rule['kind'], rule.get('pattern') or ''
+            if kind == 'substring' and pattern.strip():
+                literals.setdefault(pattern.strip().casefold(), []).append(rank)
+            elif kind == 'regex' and pattern and not self._is_constrained(rule) and not _BACKREFERENCE.search(pattern):
+                self._regex_ranks.append(rank)
+            else:
+                self._checked.append(rank)
+
+        # Every literal that is a prefix of a matched literal matched at the same position too.
+        self._candidates = {
+            literal: sorted(rank for other, ranks in literals.items() if literal.startswith(other) for rank in ranks)
+            for literal in literals
+        }
+        self._literal_re = re.compile(f"(?=({_trie_pattern(literals)}))") if literals else None
+        self._compiled = {
+            rank: re.compile(rule['pattern'], re.IGNORECASE)
+            for rank, rule in enumerate(self.rules) if rule['kind'] == 'regex' and rule.get('pattern')
+        }
+        # One search tells whether any regex matches at all; only then are they tried in turn.
+        # Capturing groups would stop the engine from optimising the alternation, so there are none.
+        self._regex_re = None
+        if self._regex_ranks:
+            try:
+                self._regex_re = re.compile(
+                    "|".join(f"(?:{self.rules[rank]['pattern']})" for rank in self._regex_ranks), re.IGNORECASE)
+            except re.error:
+                # e.g. inline global flags or clashing group names; such rules are checked one by one.
+                self._checked = sorted(self._checked + self._regex_ranks)
+                self._regex_ranks = []
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @staticmethod
+    def _is_constrained(rule: Dict) -> bool:
+        return any(rule.get(key) is not None for key in ('min_amount', 'max_amount', 'transaction_type'))
+
+    def _accepts(self, rank: int, amount_minor: int, transaction_type: Optional[str]) -> bool:
+        rule = self.rules[rank]
+        if rule.get('transaction_type') and rule['transaction_type'] != transaction_type:
+            return False
+        if rule.get('min_amount') is not None and amount_minor < int(rule['min_amount']):
+            return False
+        if rule.get('max_amount') is not None and amount_minor > int(rule['max_amount']):
+            return False
+        return True
+
+    def match(self, description: Optional[str], amount_minor: int,
+              transaction_type: Optional[str] = None) -> Optional[Dict]:
+        """The winning rule for one transaction, or None."""
+        best = len(self.rules)
+        text = description or ""
+
+        if self._literal_re is not None:
+            for found in self._literal_re.finditer(text.casefold()):
+                for rank in self._candidates[found.group(1)]:
+                    if rank >= best:
+                        break
+                    if self._accepts(rank, amount_minor, transaction_type):
+                        best = rank
+                        break
+
+        if self._regex_re is not None and self._regex_ranks[0] < best and self._regex_re.search(text):
+            for rank in self._regex_ranks:
+                if rank >= best:
+                    break
+                if self._compiled[rank].search(text):
+                    best = rank
+                    break
+
+        for rank in self._checked:
+            if rank >= best:
+                break
+            rule = self.rules[rank]
+            if rule['kind'] == 'regex' and not self._compiled[rank].search(text):
+                continue
+            if self._accepts(rank, amount_minor, transaction_type):
+                best = rank
+
+        return self.rules[best] if best < len(self.rules) else None
+
+    def categorise(self, description: Optional[str], amount, transaction_type: Optional[str] = None) -> Optional[str]:
+        """The category for one transaction (amount in major units or Money), or None when no rule matches."""
+        rule = self.match(description, Money.from_value(amount).minor, transaction_type)
+        return rule['category'] if rule else None
+
+    def apply(self, records: Iterable[Dict], overwrite: bool = False) -> int:
+        """Fill in `category` on records that have none (all with `overwrite`). Returns the number categorised."""
+        categorised = 0
+        if not self.rules:
+            return categorised
+        for record in records:
+            if record.get('category') and not overwrite:
+                continue
+            try:
+                category = self.categorise(record.get('description'), record['amount'], record.get('type'))
+            except (KeyError, ValueError):
+                continue
+            if category:
+                record['category'] = category
+                categorised += 1
+        return categorised
@@ -0,0 +1,102 @@
+import os
+import json
+import base64
+import hashlib
+import threading
+import tkinter as tk
+from io import BytesIO
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+# Upper bound (bytes) on the rendered PNGs kept in memory.
+CHART_CACHE_BYTES = int(os.getenv("CHART_CACHE_BYTES", str(8 * 1024 * 1024)))
+
+# Charts follow their container's size in steps of this many pixels, so small resizes reuse cached PNGs.
+CHART_SIZE_STEP = int(os.getenv("CHART_SIZE_STEP", "50"))
+# Smallest chart (pixels) rendered however small the container gets.
+MIN_CHART_PIXELS = (200, 150)
+
+# (width in inches, height in inches, dpi)
+ChartSize = Tuple[float, float, int]
+
+
+def fit_chart_size(width: int, height: int, dpi: int) -> ChartSize:
+    """The ChartSize for an area of `width` x `height` pixels, rounded down to CHART_SIZE_STEP."""
+    width = max(MIN_CHART_PIXELS[0], width // CHART_SIZE_STEP * CHART_SIZE_STEP)
+    height = max(MIN_CHART_PIXELS[1], height // CHART_SIZE_STEP * CHART_SIZE_STEP)
+    return width / dpi, height / dpi, dpi
+
+
+class ChartCache:
+    """
+    Rendered charts, keyed on a hash of the chart kind, its aggregated data,
+    the theme and the size. A chart is drawn with Agg into a PNG only when no
+    chart with the same inputs is cached, so pages re-show unchanged charts as
+    a `PhotoImage` instead of rebuilding figures and Tk canvases. Rendering
+    touches no Tk state and may run on a worker thread. Least recently used
+    PNGs are dropped once the total exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = CHART_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._charts: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(kind: str, data: Dict, theme: str, size: ChartSize) -> str:
+        payload = json.dumps([kind, [[str(label), str(value)] for label, value in data.items()], theme, list(size)])
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def render(self, kind: str, data: Dict, theme: str, size: ChartSize,
+               draw: Callable[[Figure, Dict, str], None]) -> bytes:
+        """The PNG of `draw(figure, data, theme)` at `size`, from the cache when the inputs are unchanged."""
+        key = self.key(kind, data, theme, size)
+        with self._lock:
+            png = self._charts.get(key)
+            if png is not None:
+                self._charts.move_to_end(key)
+                self.hits += 1
+                return png
+            self.misses += 1
+
+        width, height, dpi = size
+        figure = Figure(figsize=(width, height), dpi=dpi)
+        draw(figure, data, theme)
+        buffer = BytesIO()
+        FigureCanvasAgg(figure).print_png(buffer)
+        png = buffer.getvalue()
+
+        with self._lock:
+            if key not in self._charts:
+                self._charts[key] = png
+                self._size += len(png)
+            while self._size > self.max_bytes and len(self._charts) > 1:
+                _, evicted = self._charts.popitem(last=False)
+                self._size -= len(evicted)
+        return png
+
+    def clear(self):
+        with self._lock:
+            self._charts.clear()
+            self._size = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'charts': len(self._charts), 'bytes': self._size, 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    @staticmethod
+    def photo(png: bytes, master=None):
+        """A Tk image of a rendered chart; keep a reference to it for as long as it is shown."""
+        return tk.PhotoImage(master=master, data=base64.b64encode(png).decode('ascii'))
+
+
+chart_cache = ChartCache()
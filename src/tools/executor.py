@@ -0,0 +1,174 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "4"))
+# How often (ms) the Tk thread collects finished tasks while any are pending.
+COMPLETION_POLL_MS = 25
+
+
+class BackgroundExecutor:
+    """
+    The process-wide worker pool for database and other blocking work started
+    from the UI. Tk widgets must only be touched on the Tk thread, so pages go
+    through a `TaskScope`, which hands results back via `after()`.
+    """
+
+    def __init__(self, max_workers: int = WORKER_THREADS):
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db-worker")
+            return self._pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work; tasks not yet started are dropped."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=True)
+                self._pool = None
+
+
+executor = BackgroundExecutor()
+
+
+class TaskScope:
+    """
+    The background tasks of one page. `submit` runs a function on the shared
+    pool and calls `on_done(result)` or `on_error(error)` on the Tk thread once
+    it finishes. A task submitted under a `key` supersedes the previous task
+    with that key, whose result is dropped. Cancelling the scope, which pages
+    do when they are hidden and which happens automatically when `widget` is
+    destroyed, drops every pending result, cancels tasks that have not started
+    and sets `cancel_event` for long-running tasks that watch it. `on_busy(busy)` is
+    called when the scope goes from idle to busy and back.
+    """
+
+    def __init__(self, widget, on_busy: Optional[Callable[[bool], None]] = None,
+                 pool: BackgroundExecutor = executor):
+        self.widget = widget
+        # Polling runs on the toplevel, which outlives the page's own widgets.
+        self._root = widget.winfo_toplevel()
+        self.on_busy = on_busy
+        self.pool = pool
+        self.cancel_event = threading.Event()
+        self._pending: Set[Future] = set()
+        self._latest: Dict[str, Future] = {}
+        self._callbacks: Dict[Future, tuple] = {}
+        self._completed: "queue.SimpleQueue[Future]" = queue.SimpleQueue()
+        self._polling = False
+        self._closed = False
+        widget.bind('<Destroy>', self._on_destroy, add='+')
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._pending)
+
+    def submit(self, fn: Callable, *args, on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None, key: Optional[str] = None,
+               **kwargs) -> Optional[Future]:
+        """Run `fn(*args, **kwargs)` on the worker pool. Must be called on the Tk thread."""
+        if self._closed:
+            return None
+        was_busy = self.busy
+        if key is not None and key in self._latest:
+            self._discard(self._latest.pop(key), notify=False)
+
+        future = self.pool.submit(fn, *args, **kwargs)
+        self._pending.add(future)
+        self._callbacks[future] = (on_done, on_error, key)
+        if key is not None:
+            self._latest[key] = future
+        future.add_done_callback(self._completed.put)
+
+        if not was_busy:
+            self._set_busy(True)
+        if not self._polling:
+            self._polling = True
+            self._root.after(COMPLETION_POLL_MS, self._poll)
+        return future
+
+    def discard(self, key: str):
+        """Drop the pending task submitted under `key`, if any."""
+        if key in self._latest:
+            self._discard(self._latest.pop(key))
+
+    def cancel(self, keep: Iterable[str] = ()) -> bool:
+        """
+        Drop every pending task of this scope except those submitted under a key
+        in `keep` (e.g. a save the user asked for). Later submissions start a
+        fresh cancel_event; it is only set when no kept task is still pending.
+        Returns True if anything was dropped.
+        """
+        kept = {self._latest[key] for key in keep if key in self._latest}
+        dropped = [future for future in self._pending if future not in kept]
+        for future in dropped:
+            self._discard(future)
+        self._latest = {key: future for key, future in self._latest.items() if future in kept}
+        if not kept:
+            self.cancel_event.set()
+            self.cancel_event = threading.Event()
+        return bool(dropped)
+
+    def _discard(self, future: Future, notify: bool = True):
+        future.cancel()
+        self._callbacks.pop(future, None)
+        if future in self._pending:
+            self._pending.discard(future)
+            if notify and not self._pending:
+                self._set_busy(False)
+
+    def _set_busy(self, busy: bool):
+        if self.on_busy is not None and not self._closed:
+            try:
+                self.on_busy(busy)
+            except Exception as e:
+                print(f"Error updating loading state: {e}")
+
+    def _on_destroy(self, event):
+        if str(event.widget) == str(self.widget) and not self._closed:
+            self._closed = True
+            self.cancel()
+
+    def _poll(self):
+        while True:
+            try:
+                future = self._completed.get_nowait()
+            except queue.Empty:
+                break
+            self._deliver(future)
+
+        if self._pending and not self._closed:
+            self._root.after(COMPLETION_POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _deliver(self, future: Future):
+        callbacks = self._callbacks.pop(future, None)
+        if callbacks is None or future.cancelled():
+            return
+        on_done, on_error, key = callbacks
+        if key is not None and self._latest.get(key) is future:
+            del self._latest[key]
+        self._pending.discard(future)
+        if not self._pending:
+            self._set_busy(False)
+
+        error = future.exception()
+        try:
+            if error is None:
+                if on_done is not None:
+                    on_done(future.result())
+            elif on_error is not None:
+                on_error(error)
+            else:
+                print(f"Background task failed: {error}")
+        except Exception as e:
+            print(f"Error handling background task result: {e}")
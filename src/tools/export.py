@@ -0,0 +1,97 @@
+import os
+import csv
+import gzip
+import threading
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+
+# (header, key) pairs; the key is looked up in each row dict.
+ExportColumns = Sequence[Tuple[str, str]]
+# progress(done, total): total is 0 when unknown.
+ExportProgress = Callable[[int, int], None]
+
+TRANSACTION_EXPORT_COLUMNS: ExportColumns = (
+    ("ID", "id"),
+    ("Type", "type"),
+    ("Amount", "amount"),
+    ("Date", "date"),
+    ("Category", "category"),
+    ("Account", "account"),
+    ("Description", "description"),
+    ("Created At", "created_at"),
+    ("Updated At", "updated_at"),
+    ("External ID", "external_id"),
+)
+
+REPORT_EXPORT_COLUMNS: ExportColumns = (
+    ("ID", "id"),
+    ("Date", "date"),
+    ("Type", "type"),
+    ("Category", "category"),
+    ("Account", "account"),
+    ("Amount", "amount"),
+    ("Description", "description"),
+)
+
+CATEGORY_EXPORT_COLUMNS: ExportColumns = (
+    ("ID", "id"),
+    ("Name", "name"),
+    ("Type", "type"),
+    ("Budget", "budget"),
+    ("Description", "description"),
+    ("Created At", "created_at"),
+    ("Updated At", "updated_at"),
+)
+
+EXPORT_FILETYPES = [("CSV files", "*.csv"), ("Compressed CSV files", "*.csv.gz"), ("All files", "*.*")]
+EXPORT_PROGRESS_EVERY = 1000
+
+
+class ExportCancelled(Exception):
+    """Raised by `write_csv` when its cancel event is set; the partial file is removed."""
+
+
+def is_gzip_path(path: str) -> bool:
+    return path.lower().endswith(".gz")
+
+
+def open_text_output(path: str, compress: bool = False):
+    """Opens `path` for CSV writing, gzip-compressed when `compress` is set."""
+    if compress:
+        return gzip.open(path, 'wt', newline='', encoding='utf-8')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def write_csv(path: str, columns: ExportColumns, rows: Iterable[Dict], total: int = 0,
+              progress: Optional[ExportProgress] = None,
+              cancel: Optional[threading.Event] = None) -> int:
+    """
+    Write `rows` to `path` one at a time, so memory stays flat however many rows
+    the iterable yields. The file is written next to `path` and moved into place
+    only once complete; a `.gz` path is gzip-compressed. Returns the number of
+    rows written.
+    """
+    tmp = f"{path}.part"
+    written = 0
+    try:
+        with open_text_output(tmp, is_gzip_path(path)) as f:
+            writer = csv.writer(f)
+            writer.writerow([header for header, _ in columns])
+            for row in rows:
+                if cancel is not None and cancel.is_set():
+                    raise ExportCancelled(f"Export cancelled after {written} rows")
+                writer.writerow(['' if row.get(key) is None else row.get(key) for _, key in columns])
+                written += 1
+                if progress and written % EXPORT_PROGRESS_EVERY == 0:
+                    progress(written, total)
+        os.replace(tmp, path)
+    finally:
+        # Close a generator source now so its pooled connection goes back to the pool.
+        close = getattr(rows, "close", None)
+        if close:
+            close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    if progress:
+        progress(written, total)
+    return written
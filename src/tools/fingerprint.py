@@ -0,0 +1,64 @@
+"""
+Content fingerprints that identify a transaction across imports. Kept free of
+database and service imports so migrations and services share one definition.
+"""
+import hashlib
+from typing import Dict, Optional
+
+from tools.money import Money
+
+
+def _normalise(value) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def fingerprint_base(date: str, transaction_type: str, amount_minor: int, account: str,
+                     description: Optional[str], external_id: Optional[str]) -> bytes:
+    key = "\x1f".join([str(date)[:10], _normalise(transaction_type), str(int(amount_minor)),
+                       _normalise(account), _normalise(description), (external_id or "").strip()])
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+def with_occurrence(base: bytes, occurrence: int) -> str:
+    return base.hex() if not occurrence else f"{base.hex()}:{occurrence}"
+
+
+def transaction_fingerprint(date: str, transaction_type: str, amount_minor: int, account: str,
+                            description: Optional[str], external_id: Optional[str] = None,
+                            occurrence: int = 0) -> str:
+    """
+    Normalised content hash that identifies a transaction across imports: date,
+    type, amount in minor units, account and description (case and whitespace
+    folded), the source's external id (e.g. an OFX FITID) and, for otherwise
+    identical rows, which occurrence this is.
+    """
+    return with_occurrence(fingerprint_base(date, transaction_type, amount_minor, account,
+                                            description, external_id), occurrence)
+
+
+class TransactionFingerprinter:
+    """
+    Fingerprints a stream of incoming transactions. Identical rows without an
+    external id are numbered 0, 1, 2... in the order they appear, so a statement
+    that holds the same purchase twice imports both, and importing it again adds
+    neither. Share one instance across the batches of a single import.
+    """
+
+    def __init__(self):
+        self._seen: Dict[bytes, int] = {}
+
+    def __call__(self, record: Dict) -> Dict:
+        external_id = (record.get('external_id') or "").strip() or None
+        try:
+            amount_minor = Money.from_value(record['amount']).minor
+        except ValueError:
+            # Left for create_many to reject with the row's position.
+            return {**record, 'external_id': external_id, 'fingerprint': None}
+
+        base = fingerprint_base(record['date'], record['type'], amount_minor, record['account'],
+                                record.get('description'), external_id)
+        occurrence = 0
+        if external_id is None:
+            occurrence = self._seen.get(base, 0)
+            self._seen[base] = occurrence + 1
+        return {**record, 'external_id': external_id, 'fingerprint': with_occurrence(base, occurrence)}
@@ -0,0 +1,119 @@
+"""
+Import throughput benchmark.
+
+Writes synthetic multi-year statement files (CSV in our export format, OFX 1.x
+SGML, OFX 2.x XML and QIF), imports each into a fresh scratch database through
+the real importers, and prints rows/s and MB/s per format.
+
+Run from `src/` with `python -m tools.import_benchmark [rows] [years]`.
+"""
+import os
+import sys
+import csv
+import time
+import random
+import tempfile
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from database import engine
+from database.migrations import migrate
+from tools.importer import importer_for
+
+
+PAYEES = ["Grocery Mart", "City Power & Light", "Coffee House", "Fuel Stop", "Payroll ACME Corp",
+          "Online Store", "Pharmacy", "Restaurant", "Rent Payment", "Transfer to Savings"]
+
+
+def _sample(rows: int, years: int) -> Iterator[Tuple[int, date, int, str]]:
+    """(number, posted date, signed amount in cents, payee) spread evenly over `years`."""
+    rng = random.Random(7)
+    start = date.today() - timedelta(days=365 * years)
+    step = 365 * years / max(rows, 1)
+    for number in range(rows):
+        payee = rng.choice(PAYEES)
+        cents = rng.randint(100, 250000) if payee.startswith("Payroll") else -rng.randint(100, 40000)
+        yield number, start + timedelta(days=int(number * step)), cents, payee
+
+
+def write_csv_statement(path: str, rows: int, years: int):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["ID", "Type", "Amount", "Date", "Category", "Account", "Description", "Created At", "Updated At"])
+        for number, posted, cents, payee in _sample(rows, years):
+            writer.writerow([number, "Income" if cents > 0 else "Expense", f"{abs(cents) / 100:.2f}",
+                             posted.isoformat(), "", "Checking", payee, "", ""])
+
+
+def write_ofx_sgml(path: str, rows: int, years: int):
+    with open(path, 'w') as f:
+        f.write("OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\nENCODING:USASCII\nCHARSET:1252\n\n")
+        f.write("<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>USD\n"
+                "<BANKACCTFROM><BANKID>000000000<ACCTID>123456<ACCTTYPE>CHECKING</BANKACCTFROM>\n<BANKTRANLIST>\n")
+        for number, posted, cents, payee in _sample(rows, years):
+            f.write(f"<STMTTRN><TRNTYPE>{'CREDIT' if cents > 0 else 'DEBIT'}<DTPOSTED>{posted:%Y%m%d}120000.000"
+                    f"<TRNAMT>{cents / 100:.2f}<FITID>{number}<NAME>{payee.replace('&', '&amp;')}</STMTTRN>\n")
+        f.write("</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+
+
+def write_ofx_xml(path: str, rows: int, years: int):
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<?OFX OFXHEADER="200" VERSION="220"?>\n')
+        f.write("<OFX><CREDITCARDMSGSRSV1><CCSTMTTRNRS><CCSTMTRS><CURDEF>USD</CURDEF>\n"
+                "<CCACCTFROM><ACCTID>4111</ACCTID></CCACCTFROM>\n<BANKTRANLIST>\n")
+        for number, posted, cents, payee in _sample(rows, years):
+            f.write(f"<STMTTRN>\n<TRNTYPE>{'CREDIT' if cents > 0 else 'DEBIT'}</TRNTYPE>\n"
+                    f"<DTPOSTED>{posted:%Y%m%d}</DTPOSTED>\n<TRNAMT>{cents / 100:.2f}</TRNAMT>\n"
+                    f"<FITID>{number}</FITID>\n<NAME>{payee.replace('&', '&amp;')}</NAME>\n</STMTTRN>\n")
+        f.write("</BANKTRANLIST></CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1></OFX>\n")
+
+
+def write_qif(path: str, rows: int, years: int):
+    with open(path, 'w') as f:
+        f.write("!Type:Bank\n")
+        for number, posted, cents, payee in _sample(rows, years):
+            category = "[Savings]" if payee.startswith("Transfer") else ""
+            f.write(f"D{posted:%m/%d/%Y}\nT{cents / 100:,.2f}\nN{number}\nP{payee}\nL{category}\n^\n")
+
+
+FORMATS: List[Tuple[str, str, Callable[[str, int, int], None]]] = [
+    ("CSV", "statement.csv", write_csv_statement),
+    ("OFX 1.x (SGML)", "statement.ofx", write_ofx_sgml),
+    ("OFX 2.x (XML, credit card)", "statement.qfx", write_ofx_xml),
+    ("QIF", "statement.qif", write_qif),
+]
+
+
+def run_benchmark(rows: int = 200000, years: int = 10) -> List[Dict]:
+    """Imports one generated file per format into its own scratch database; returns one result per format."""
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        try:
+            for label, name, write in FORMATS:
+                path = os.path.join(scratch, name)
+                write(path, rows, years)
+                size = os.path.getsize(path)
+
+                engine.configure_pool(os.path.join(scratch, f"{name}.db"))
+                migrate(progress=lambda message, done, total: None)
+                started = time.perf_counter()
+                result = importer_for(path).import_file(path)
+                seconds = time.perf_counter() - started
+                results.append({'format': label, 'bytes': size, 'seconds': seconds, **result})
+        finally:
+            engine.configure_pool(engine.DB_URL)
+    return results
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"==> Importing {rows:,} transactions over {years} years per format")
+    for result in run_benchmark(rows, years):
+        print(f"  - {result['format']:<28} {result['inserted']:>9,} rows in {result['seconds']:7.2f}s  "
+              f"{result['inserted'] / result['seconds']:>9,.0f} rows/s  "
+              f"{result['bytes'] / 1048576 / result['seconds']:6.2f} MB/s  rejected: {result['rejected']}")
+
+
+if __name__ == "__main__":
+    main()
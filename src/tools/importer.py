@@ -0,0 +1,358 @@
+import io
+import os
+import csv
+import gzip
+import threading
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from tools.money import Money, CURRENCY_EXPONENTS
+from tools.export import TRANSACTION_EXPORT_COLUMNS, REPORT_EXPORT_COLUMNS, CATEGORY_EXPORT_COLUMNS
+from services.category import CategoryService
+from services.category_rule import CategoryRuleService
+from services.transaction import TransactionService
+from tools.fingerprint import TransactionFingerprinter
+
+
+IMPORT_BATCH_SIZE = 10000
+TRANSACTION_TYPES = ('Expense', 'Income', 'Transfer')
+CATEGORY_TYPES = ('Expense', 'Income', 'Transfer')
+
+# progress(done, total) in bytes of the source file while it is read, then
+# progress(total, total, IMPORT_WRITING) once before the rows are written, a step that
+# reports nothing further and can no longer be cancelled.
+ImportProgress = Callable[..., None]
+IMPORT_WRITING = "Writing to the database"
+# (line number, raw fields, record or None, error or None) as produced by a parser.
+ParsedRow = Tuple[int, Sequence[str], Optional[Dict], Optional[str]]
+
+_CURRENCY_SYMBOLS = "".join(CURRENCY_EXPONENTS)
+
+
+class ImportCancelled(Exception):
+    """
+    Raised when an import's cancel event is set. Transactions are only written
+    once the whole file has been read, so a cancelled transactions import
+    writes nothing; category batches already written stay committed.
+    """
+
+    def __init__(self, message: str, result: Dict):
+        super().__init__(message)
+        self.result = result
+
+
+def _header_aliases(*column_sets) -> Dict[str, str]:
+    aliases = {}
+    for columns in column_sets:
+        for header, key in columns:
+            aliases[header.strip().lower()] = key
+            aliases[key] = key
+    return aliases
+
+
+TRANSACTION_HEADERS = _header_aliases(TRANSACTION_EXPORT_COLUMNS, REPORT_EXPORT_COLUMNS)
+CATEGORY_HEADERS = _header_aliases(CATEGORY_EXPORT_COLUMNS)
+
+
+def parse_amount(value: str) -> Money:
+    """Parses an exported or hand-written amount such as '$1,234.50'."""
+    return Money.parse(value.strip().strip(_CURRENCY_SYMBOLS).strip())
+
+
+def parse_date(value: str) -> str:
+    """Validates an ISO date (a datetime is cut to its date) and returns it as YYYY-MM-DD."""
+    return date.fromisoformat(value.strip()[:10]).isoformat()
+
+
+def _parse_type(value: str, allowed: Tuple[str, ...]) -> str:
+    kind = value.strip().title()
+    if kind not in allowed:
+        raise ValueError(f"Invalid type: {value!r}")
+    return kind
+
+
+def _transaction_record(fields: Dict[str, str]) -> Dict:
+    amount = parse_amount(fields.get('amount') or "")
+    if amount.minor <= 0:
+        raise ValueError(f"Amount must be positive: {fields.get('amount')!r}")
+    account = (fields.get('account') or "").strip()
+    if not account:
+        raise ValueError("Account is required")
+    return {
+        'type': _parse_type(fields.get('type') or "", TRANSACTION_TYPES),
+        'amount': amount,
+        'date': parse_date(fields.get('date') or ""),
+        'category': (fields.get('category') or "").strip() or None,
+        'account': account,
+        'description': fields.get('description') or "",
+        'external_id': (fields.get('external_id') or "").strip() or None,
+    }
+
+
+def _category_record(fields: Dict[str, str]) -> Dict:
+    name = (fields.get('name') or "").strip()
+    if not name:
+        raise ValueError("Name is required")
+    budget = (fields.get('budget') or "").strip()
+    return {
+        'name': name,
+        'type': _parse_type(fields.get('type') or "", CATEGORY_TYPES),
+        'budget': parse_amount(budget) if budget else None,
+        'description': fields.get('description') or "",
+    }
+
+
+class RejectsWriter:
+    """Writes rejected rows (line, error, original fields) to a CSV side file, created on first use."""
+
+    def __init__(self, path: str, header: Sequence[str]):
+        self.path = path
+        self.header = list(header)
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, line: int, error: str, fields: Sequence[str]):
+        if self._writer is None:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["Line", "Error"] + self.header)
+        self._writer.writerow([line, error] + list(fields))
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class BatchWriter(ABC):
+    """
+    Where `write_batches` sends parsed records. `add` takes one batch and
+    `finish` runs once every batch was added; both return {"inserted",
+    "skipped", "errors"}, with errors indexed within the batch given to `add`.
+    `close` releases whatever the writer holds, finished or not.
+    """
+
+    @abstractmethod
+    def add(self, records: List[Dict]) -> Dict:
+        """Write or stage one batch."""
+
+    def finish(self) -> Dict:
+        return {'inserted': 0, 'skipped': 0, 'errors': []}
+
+    def close(self):
+        pass
+
+
+class CategoryWriter(BatchWriter):
+    """Inserts each batch of categories as it comes, skipping names already stored."""
+
+    def __init__(self, service: CategoryService):
+        self.service = service
+
+    def add(self, records: List[Dict]) -> Dict:
+        return self.service.create_many(records, chunk_size=len(records), return_ids=False, ignore_conflicts=True)
+
+
+class TransactionWriter(BatchWriter):
+    """
+    Auto-categorises and fingerprints each batch of transactions and stages
+    it; `finish` writes the whole import in one transaction, skipping rows
+    whose fingerprint is already stored (see StagedInsert).
+    """
+
+    def __init__(self, service: TransactionService):
+        self.rules = CategoryRuleService().compile_rules()
+        self.fingerprinter = TransactionFingerprinter()
+        self.staged = service.staged_insert(ignore_conflicts=True)
+
+    def add(self, records: List[Dict]) -> Dict:
+        self.rules.apply(records)
+        errors = self.staged.add([self.fingerprinter(record) for record in records])
+        return {'inserted': 0, 'skipped': 0, 'errors': errors}
+
+    def finish(self) -> Dict:
+        return {**self.staged.commit(), 'errors': []}
+
+    def close(self):
+        self.staged.close()
+
+
+def write_batches(writer: BatchWriter, rows: Iterable[ParsedRow], rejects: RejectsWriter,
+                  batch_size: int = IMPORT_BATCH_SIZE, progress: Optional[Callable[[], None]] = None,
+                  cancel: Optional[threading.Event] = None, writing: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    The shared write path for every importer: collects parsed rows into batches
+    and hands each to `writer`, then calls `writing()` and lets it finish. Rows
+    the parser or the writer rejected go to `rejects`; rows already stored are
+    counted as skipped. Returns {"read", "inserted", "skipped", "rejected"}.
+    """
+    result = {'read': 0, 'inserted': 0, 'skipped': 0, 'rejected': 0}
+    batch: List[Tuple[int, Sequence[str], Dict]] = []
+
+    def count(outcome: Dict):
+        result['inserted'] += outcome['inserted']
+        result['skipped'] += outcome['skipped']
+
+    def flush():
+        outcome = writer.add([record for _, _, record in batch])
+        count(outcome)
+        for error in outcome['errors']:
+            line, fields, _ = batch[error['index']]
+            rejects.write(line, error['error'], fields)
+        batch.clear()
+        if progress:
+            progress()
+
+    for line, fields, record, error in rows:
+        result['read'] += 1
+        if error is not None:
+            rejects.write(line, error, fields)
+        else:
+            batch.append((line, fields, record))
+            if len(batch) >= batch_size:
+                flush()
+        if cancel is not None and cancel.is_set():
+            result['rejected'] = rejects.count
+            raise ImportCancelled(f"Import cancelled after {result['inserted']} rows", result)
+    if batch:
+        flush()
+    if writing:
+        writing()
+    count(writer.finish())
+
+    result['rejected'] = rejects.count
+    return result
+
+
+IMPORTERS: Dict[str, type] = {}
+IMPORT_FILETYPES = [
+    ("All supported files", "*.csv *.csv.gz *.ofx *.qfx *.qif"),
+    ("CSV files", "*.csv *.csv.gz"),
+    ("Bank statements", "*.ofx *.qfx *.qif"),
+    ("All files", "*.*"),
+]
+
+
+def register_importer(*extensions: str):
+    """Class decorator registering a `FileImporter` for file extensions such as '.ofx'."""
+    def register(cls):
+        for extension in extensions:
+            IMPORTERS[extension.lower()] = cls
+        return cls
+    return register
+
+
+def importer_for(path: str, **options) -> "FileImporter":
+    """The importer registered for `path`'s extension (a trailing .gz is ignored)."""
+    import tools.statements  # registers the bank statement importers
+
+    base = path[:-3] if path.lower().endswith(".gz") else path
+    extension = os.path.splitext(base)[1].lower()
+    if extension not in IMPORTERS:
+        raise ValueError(f"Unsupported file type: {extension or path}")
+    return IMPORTERS[extension](**options)
+
+
+class FileImporter(ABC):
+    """
+    Base for file importers. `import_file` opens the file (gzip-aware) as a text
+    stream and hands it to `open_rows`, which a subclass implements to parse it
+    incrementally; the parsed rows go through `write_batches`. Rejected rows are
+    written next to the source as `<name>.rejected.csv` with their line number
+    and reason.
+    """
+    encoding = 'utf-8-sig'
+    errors = 'strict'
+
+    def __init__(self, batch_size: int = IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.transaction_service = TransactionService()
+        self.category_service = CategoryService()
+
+    @staticmethod
+    def rejects_path(path: str) -> str:
+        base = path[:-3] if path.lower().endswith(".gz") else path
+        return f"{os.path.splitext(base)[0]}.rejected.csv"
+
+    @abstractmethod
+    def open_rows(self, text: io.TextIOBase) -> Tuple[str, List[str], Iterator[ParsedRow]]:
+        """Returns (kind: 'transactions' or 'categories', header for the rejects file, parsed rows)."""
+
+    def writer(self, kind: str) -> BatchWriter:
+        """
+        The write step for one import. Both kinds skip rows already stored:
+        transactions by fingerprint, categories by name. Transactions without a
+        category are auto-categorised by the rules compiled once per import.
+        """
+        if kind == 'transactions':
+            return TransactionWriter(self.transaction_service)
+        return CategoryWriter(self.category_service)
+
+    def import_file(self, path: str, progress: Optional[ImportProgress] = None,
+                    cancel: Optional[threading.Event] = None) -> Dict:
+        """
+        Import `path`. Returns {"kind", "read", "inserted", "skipped", "rejected", "rejects_path"};
+        `skipped` counts rows already in the database, and `rejects_path` is None
+        when no row was rejected.
+        """
+        total = os.path.getsize(path)
+        with open(path, 'rb') as raw:
+            stream = gzip.GzipFile(fileobj=raw) if path.lower().endswith(".gz") else raw
+            text = io.TextIOWrapper(stream, encoding=self.encoding, errors=self.errors, newline='')
+            kind, header, rows = self.open_rows(text)
+
+            rejects = RejectsWriter(self.rejects_path(path), header)
+            if os.path.exists(rejects.path):
+                os.remove(rejects.path)
+            writer = self.writer(kind)
+            try:
+                result = write_batches(writer, rows, rejects, batch_size=self.batch_size, cancel=cancel,
+                                       progress=(lambda: progress(raw.tell(), total)) if progress else None,
+                                       writing=(lambda: progress(total, total, IMPORT_WRITING)) if progress else None)
+            finally:
+                writer.close()
+                rejects.close()
+
+        result.update(kind=kind, rejects_path=rejects.path if rejects.count else None)
+        return result
+
+
+@register_importer(".csv")
+class CsvImporter(FileImporter):
+    """
+    Streams a transactions or categories CSV (at least the format our own exports
+    write) into the database. Rows are parsed and validated one at a time and
+    written in batches of `batch_size`, so memory stays flat for any file size.
+    """
+
+    def _parse(self, reader: Iterator[List[str]], header: List[str], aliases: Dict[str, str],
+               build: Callable[[Dict[str, str]], Dict]) -> Iterator[ParsedRow]:
+        keys = [aliases.get(name.strip().lower()) for name in header]
+        for fields in reader:
+            if not any(fields):
+                continue
+            values = {key: value for key, value in zip(keys, fields) if key}
+            try:
+                yield reader.line_num, fields, build(values), None
+            except ValueError as e:
+                yield reader.line_num, fields, None, str(e)
+
+    def open_rows(self, text: io.TextIOBase) -> Tuple[str, List[str], Iterator[ParsedRow]]:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            raise ValueError("The file is empty")
+
+        names = {name.strip().lower() for name in header}
+        if 'name' in names:
+            kind, aliases, build = 'categories', CATEGORY_HEADERS, _category_record
+            required = {'name', 'type'}
+        else:
+            kind, aliases, build = 'transactions', TRANSACTION_HEADERS, _transaction_record
+            required = {'type', 'amount', 'date', 'account'}
+        missing = required - {aliases.get(name) for name in names}
+        if missing:
+            raise ValueError(f"Unrecognised CSV header, missing: {', '.join(sorted(missing))}")
+        return kind, header, self._parse(reader, header, aliases, build)
@@ -0,0 +1,146 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Optional, Union
+
+
+MONEY_SCALE_KEY = "money_scale"
+DEFAULT_MONEY_SCALE = 100
+
+CURRENCY_EXPONENTS = {
+    "$": 2,
+    "€": 2,
+    "£": 2,
+    "¥": 0,
+    "₹": 2,
+    "₦": 2,
+}
+
+_scale: Optional[int] = None
+
+
+def scale_for_currency(symbol: str) -> int:
+    """Number of minor units per major unit for a currency symbol."""
+    return 10 ** CURRENCY_EXPONENTS.get(symbol, 2)
+
+
+def get_money_scale() -> int:
+    """The minor-unit scale stored amounts were written with (read once from preferences)."""
+    global _scale
+    if _scale is None:
+        from services.theme import ThemeService
+        preference = ThemeService().get_by_item(MONEY_SCALE_KEY)
+        _scale = int(preference['data']) if preference and preference.get('data') else DEFAULT_MONEY_SCALE
+    return _scale
+
+
+def set_money_scale(scale: int):
+    """Overrides the cached scale; used by the migration that chooses it."""
+    global _scale
+    _scale = scale
+
+
+class Money:
+    """
+    An exact amount held as an integer number of minor units (e.g. cents).
+
+    Supports addition, subtraction, comparison with numbers, and format
+    specs like f"{money:,.2f}", so it can stand in for the floats the forms
+    used to receive.
+    """
+    __slots__ = ("minor",)
+
+    def __init__(self, minor: int = 0):
+        self.minor = int(minor)
+
+    @staticmethod
+    def scale() -> int:
+        return get_money_scale()
+
+    @classmethod
+    def from_value(cls, value: Union["Money", int, float, str, Decimal]) -> "Money":
+        """Converts a major-unit value (user input, float, Decimal) to Money, rounding half up."""
+        if isinstance(value, Money):
+            return value
+        try:
+            major = Decimal(str(value).strip().replace(",", ""))
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {value!r}")
+        if not major.is_finite():
+            raise ValueError(f"Invalid amount: {value!r}")
+        return cls(int((major * cls.scale()).quantize(Decimal(1), rounding=ROUND_HALF_UP)))
+
+    @classmethod
+    def parse(cls, text: str) -> "Money":
+        """Parses user-entered text such as '1,234.50'."""
+        return cls.from_value(text)
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.minor) / Decimal(self.scale())
+
+    def __float__(self) -> float:
+        return self.minor / self.scale()
+
+    def __int__(self) -> int:
+        return self.minor
+
+    def __str__(self) -> str:
+        exponent = len(str(self.scale())) - 1
+        return f"{self.to_decimal():.{exponent}f}"
+
+    def __repr__(self) -> str:
+        return f"Money({str(self)})"
+
+    def __format__(self, spec: str) -> str:
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+    def _other_minor(self, other) -> int:
+        if isinstance(other, Money):
+            return other.minor
+        if isinstance(other, (int, float, Decimal)):
+            return Money.from_value(other).minor
+        return NotImplemented
+
+    def __add__(self, other):
+        minor = self._other_minor(other)
+        return NotImplemented if minor is NotImplemented else Money(self.minor + minor)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        minor = self._other_minor(other)
+        return NotImplemented if minor is NotImplemented else Money(self.minor - minor)
+
+    def __rsub__(self, other):
+        minor = self._other_minor(other)
+        return NotImplemented if minor is NotImplemented else Money(minor - self.minor)
+
+    def __neg__(self):
+        return Money(-self.minor)
+
+    def __abs__(self):
+        return Money(abs(self.minor))
+
+    def __bool__(self) -> bool:
+        return self.minor != 0
+
+    def __eq__(self, other) -> bool:
+        minor = self._other_minor(other)
+        return NotImplemented if minor is NotImplemented else self.minor == minor
+
+    def __hash__(self) -> int:
+        return hash(self.minor)
+
+    def __lt__(self, other) -> bool:
+        minor = self._other_minor(other)
+        return NotImplemented if minor is NotImplemented else self.minor < minor
+
+    def __le__(self, other) -> bool:
+        minor = self._other_minor(other)
+        return NotImplemented if minor is NotImplemented else self.minor <= minor
+
+    def __gt__(self, other) -> bool:
+        minor = self._other_minor(other)
+        return NotImplemented if minor is NotImplemented else self.minor > minor
+
+    def __ge__(self, other) -> bool:
+        minor = self._other_minor(other)
+        return NotImplemented if minor is NotImplemented else self.minor >= minor
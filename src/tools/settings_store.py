@@ -0,0 +1,208 @@
+import os
+import json
+import tempfile
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from tools.utils import Utils
+from tools.executor import executor
+
+
+SETTINGS_PATH = Utils.resource_path("data/app_settings.json")
+DEFAULT_SETTINGS = {
+    "currency": "$",
+    "date_format": "YYYY-MM-DD",
+    "theme": "dark",
+    "default_account": "Checking",
+    "show_decimals": True,
+    "auto_backup": False
+}
+# How often (ms) the UI checks the settings file for edits made outside the app.
+SETTINGS_WATCH_MS = 1000
+
+
+class SettingsStore:
+    """
+    The app settings, loaded from `data/app_settings.json` once per process
+    and kept in memory. Values stored in the file override the defaults.
+
+    Changes made through `set`/`update`/`reset` apply immediately and are
+    written to disk on the worker pool, through a temporary file that
+    replaces the old one so a crash never leaves half a file behind. Edits
+    made to the file by anything else are picked up by `reload_if_changed`,
+    which compares the file's mtime and which the UI calls periodically.
+    `version` goes up with every change, and listeners registered with
+    `subscribe` receive the changed keys on the thread that made or noticed
+    the change (the Tk thread, in the app).
+    """
+
+    def __init__(self, path: str = SETTINGS_PATH, defaults: Dict[str, Any] = DEFAULT_SETTINGS):
+        self.path = path
+        self.defaults = dict(defaults)
+        self.version = 0
+        self._stored: Optional[Dict[str, Any]] = None
+        self._mtime: Optional[int] = None
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._dirty = False
+        self._writing = False
+        self._write: Optional[Future] = None
+
+    # Reading
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_file(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                settings = json.load(f)
+            return settings if isinstance(settings, dict) else {}
+        except Exception as e:
+            print(f"Error loading app settings: {e}")
+            return {}
+
+    def _loaded(self) -> Dict[str, Any]:
+        """The stored values, read from disk on first use. Caller holds the lock."""
+        if self._stored is None:
+            self._mtime = self._file_mtime()
+            self._stored = self._read_file()
+        return self._stored
+
+    def all(self) -> Dict[str, Any]:
+        """A copy of every setting, defaults included."""
+        with self._lock:
+            return {**self.defaults, **self._loaded()}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            stored = self._loaded()
+            if key in stored:
+                return stored[key]
+            return self.defaults.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        """Whether `key` has been set explicitly rather than left at its default."""
+        with self._lock:
+            return key in self._loaded()
+
+    def reload_if_changed(self) -> bool:
+        """Re-read the file if its mtime changed since it was last read or written. Returns True if any value changed."""
+        with self._lock:
+            if self._stored is None or self._writing:
+                return False
+            mtime = self._file_mtime()
+            if mtime == self._mtime:
+                return False
+            before = self.all()
+            self._mtime = mtime
+            self._stored = self._read_file()
+            after = self.all()
+        return self._changed(before, after)
+
+    # Writing
+
+    def set(self, key: str, value: Any):
+        self.update({key: value})
+
+    def update(self, values: Dict[str, Any]):
+        """Apply `values` now and save them in the background."""
+        with self._lock:
+            before = self.all()
+            self._stored = {**self._loaded(), **values}
+            after = self.all()
+        if self._changed(before, after):
+            self._schedule_write()
+
+    def reset(self):
+        """Put every setting back to its default and save that."""
+        with self._lock:
+            before = self.all()
+            self._stored = {}
+            after = self.all()
+        self._changed(before, after)
+        self._schedule_write()
+
+    def _schedule_write(self):
+        with self._lock:
+            self._dirty = True
+            if self._writing:
+                return
+            self._writing = True
+            self._write = executor.submit(self._write_pending)
+
+    def _write_pending(self):
+        """Write until no change is left unsaved, so a burst of changes costs one or two writes."""
+        while True:
+            with self._lock:
+                if not self._dirty:
+                    self._writing = False
+                    return
+                self._dirty = False
+                settings = dict(self._stored or {})
+            try:
+                self._write_file(settings)
+            except Exception as e:
+                print(f"Error saving app settings: {e}")
+
+    def _write_file(self, settings: Dict[str, Any]):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix=".app_settings.", suffix=".tmp")
+        try:
+            with os.fdopen(handle, 'w') as f:
+                json.dump(settings, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        with self._lock:
+            self._mtime = self._file_mtime()
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait for a pending background write, e.g. before the process exits."""
+        write = self._write
+        if write is not None:
+            try:
+                write.result(timeout)
+            except Exception as e:
+                print(f"Error saving app settings: {e}")
+
+    # Notifications
+
+    def subscribe(self, listener: Callable[[Dict[str, Any]], None]) -> Callable[[], None]:
+        """Call `listener(changed)` with {key: new value} after every change. Returns a function that unsubscribes."""
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe():
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+        return unsubscribe
+
+    def _changed(self, before: Dict[str, Any], after: Dict[str, Any]) -> bool:
+        changed = {key: after.get(key) for key in set(before) | set(after) if before.get(key) != after.get(key)}
+        if not changed:
+            return False
+        with self._lock:
+            self.version += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(changed)
+            except Exception as e:
+                print(f"Error applying settings change: {e}")
+        return True
+
+
+settings_store = SettingsStore()
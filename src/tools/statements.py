@@ -0,0 +1,323 @@
+import io
+import re
+import html
+from abc import abstractmethod
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from tools.money import Money
+from tools.importer import FileImporter, ParsedRow, IMPORT_BATCH_SIZE, register_importer
+
+
+STATEMENT_READ_SIZE = 64 * 1024
+
+OFX_ACCOUNT_TYPES = {
+    "CHECKING": "Checking",
+    "SAVINGS": "Savings",
+    "MONEYMRKT": "Savings",
+    "CREDITLINE": "Credit Card",
+    "CREDITCARD": "Credit Card",
+}
+
+QIF_ACCOUNT_TYPES = {
+    "bank": "Checking",
+    "cash": "Cash",
+    "ccard": "Credit Card",
+}
+# QIF sections that hold lists rather than account transactions.
+QIF_SKIPPED_TYPES = ("cat", "class", "memorized", "invst", "security", "prices")
+
+_OFX_TOKEN = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_QIF_DATE_SEPARATORS = re.compile(r"[/\-.']")
+
+
+def _decimal_separator(digits: str) -> Optional[str]:
+    """
+    Works out which of ',' and '.' is the decimal separator in an unsigned
+    amount. With both present the last one is; a separator that occurs more
+    than once groups thousands; a single one followed by exactly three digits
+    after a non-zero integer part ('1,500', '1.234') groups thousands too.
+    Otherwise the lone separator is the decimal point.
+    """
+    used = [separator for separator in ",." if separator in digits]
+    if len(used) == 2:
+        return max(used, key=digits.rindex)
+    if not used:
+        return None
+    separator = used[0]
+    whole, _, fraction = digits.rpartition(separator)
+    if digits.count(separator) > 1 or (len(fraction) == 3 and whole.strip("0")):
+        return None
+    return separator
+
+
+def _check_grouping(whole: str, separator: str, value: str):
+    """Rejects digit groups that are not thousands (or Indian lakh) groups, e.g. '1,50,0'."""
+    groups = whole.split(separator)
+    if len(groups) == 1:
+        return
+    if not 1 <= len(groups[0]) <= 3 or len(groups[-1]) != 3 or any(len(group) not in (2, 3) for group in groups[1:-1]):
+        raise ValueError(f"Invalid amount: {value!r}")
+
+
+def statement_amount(value: str, decimal_separator: Optional[str] = None) -> Money:
+    """
+    Parses a signed statement amount such as '-1,500', '1.234,56' or '(12.50)'.
+    The decimal separator is worked out from where the separators sit unless
+    `decimal_separator` is given; the other one (and spaces or apostrophes)
+    groups digits. Amounts with more decimals than the currency holds are
+    rejected rather than rounded.
+    """
+    text = value.strip().replace(" ", "").replace("\u00a0", "").replace("'", "")
+    negative = text.startswith("(") and text.endswith(")")
+    if negative:
+        text = text[1:-1]
+    elif text.startswith(("-", "+")):
+        negative, text = text[0] == "-", text[1:]
+    if not text or not all(char.isdigit() or char in ",." for char in text):
+        raise ValueError(f"Invalid amount: {value!r}")
+
+    separator = decimal_separator or _decimal_separator(text)
+    whole, fraction = text, ""
+    if separator and separator in text:
+        whole, _, fraction = text.rpartition(separator)
+    if separator:
+        grouping = "." if separator == "," else ","
+    else:
+        grouping = "." if "." in text else ","
+    if (separator and separator in whole) or (fraction and not fraction.isdigit()):
+        raise ValueError(f"Invalid amount: {value!r}")
+    _check_grouping(whole, grouping, value)
+    whole = whole.replace(grouping, "") or "0"
+    if not whole.isdigit():
+        raise ValueError(f"Invalid amount: {value!r}")
+
+    major = Decimal(f"{whole}.{fraction or 0}")
+    if negative:
+        major = -major
+    amount = Money.from_value(major)
+    if amount.to_decimal() != major:
+        raise ValueError(f"Amount has more decimal places than the currency allows: {value!r}")
+    return amount
+
+
+def statement_record(amount: Money, posted: str, account: str, description: str,
+                     transfer: bool = False, category: Optional[str] = None,
+                     external_id: Optional[str] = None) -> Dict:
+    """Maps one statement line onto the transactions schema: the sign of the amount picks the type."""
+    if not amount:
+        raise ValueError("Amount must be non-zero")
+    if transfer:
+        kind = "Transfer"
+    else:
+        kind = "Expense" if amount < 0 else "Income"
+    return {
+        'type': kind,
+        'amount': abs(amount),
+        'date': posted,
+        'category': category,
+        'account': account,
+        'description': description,
+        'external_id': external_id,
+    }
+
+
+def _describe(*parts: Optional[str]) -> str:
+    seen: List[str] = []
+    for part in parts:
+        if part and part not in seen:
+            seen.append(part)
+    return " - ".join(seen)
+
+
+def ofx_tokens(text: io.TextIOBase, read_size: int = STATEMENT_READ_SIZE) -> Iterator[Tuple[bool, str, str]]:
+    """
+    Yields (closing, TAG, value) for every tag in an OFX/QFX stream, reading it in
+    blocks. Handles both OFX 1.x SGML (unclosed elements, possibly no line breaks)
+    and OFX 2.x XML; the header before the first tag is skipped.
+    """
+    buffer = ""
+    while True:
+        block = text.read(read_size)
+        if not block:
+            break
+        buffer += block
+        last = buffer.rfind("<")
+        if last <= 0:
+            continue
+        body, buffer = buffer[:last], buffer[last:]
+        for match in _OFX_TOKEN.finditer(body):
+            yield match.group(1) == "/", match.group(2).upper(), html.unescape(match.group(3).strip())
+    for match in _OFX_TOKEN.finditer(buffer):
+        yield match.group(1) == "/", match.group(2).upper(), html.unescape(match.group(3).strip())
+
+
+def ofx_date(value: str) -> str:
+    """'20230115120000.000[-5:EST]' -> '2023-01-15'."""
+    digits = value.strip()[:8]
+    if len(digits) != 8 or not digits.isdigit():
+        raise ValueError(f"Invalid date: {value!r}")
+    return date(int(digits[:4]), int(digits[4:6]), int(digits[6:8])).isoformat()
+
+
+def qif_date(value: str, day_first: bool = False) -> str:
+    """Parses QIF dates such as '1/15/2023', "1/15'03", '15.01.2023' (day_first) or '2023-01-15'."""
+    parts = [part.strip() for part in _QIF_DATE_SEPARATORS.split(value.strip())]
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"Invalid date: {value!r}")
+    if len(parts[0]) == 4:
+        year, month, day = parts
+    elif day_first:
+        day, month, year = parts
+    else:
+        month, day, year = parts
+    year = int(year)
+    if year < 100:
+        year += 2000 if year < 70 else 1900
+    return date(year, int(month), int(day)).isoformat()
+
+
+class StatementImporter(FileImporter):
+    """
+    Base for bank statement importers; every statement line becomes a
+    transaction. `decimal_separator` (',' or '.') fixes how amounts are read
+    when a bank's format is known; by default it is worked out per amount.
+    """
+    encoding = 'utf-8-sig'
+    errors = 'replace'
+    reject_header: List[str] = []
+
+    def __init__(self, batch_size: int = IMPORT_BATCH_SIZE, account: Optional[str] = None,
+                 decimal_separator: Optional[str] = None):
+        super().__init__(batch_size)
+        self.account = account
+        self.decimal_separator = decimal_separator
+
+    @abstractmethod
+    def parse(self, text: io.TextIOBase) -> Iterator[ParsedRow]:
+        """Yields the statement's transactions as parsed rows."""
+
+    def open_rows(self, text: io.TextIOBase) -> Tuple[str, List[str], Iterator[ParsedRow]]:
+        return 'transactions', self.reject_header, self.parse(text)
+
+
+@register_importer(".ofx", ".qfx")
+class OfxImporter(StatementImporter):
+    """
+    OFX/QFX statements (bank and credit card). The account comes from the
+    statement's account type (checking, savings, credit card) unless `account`
+    is given. XFER lines import as transfers; otherwise a negative amount is an
+    expense and a positive one income. Rows are numbered by statement line.
+    """
+    reject_header = ["DTPOSTED", "TRNAMT", "TRNTYPE", "NAME", "MEMO", "FITID"]
+
+    def _row(self, number: int, fields: Dict[str, str], account: str) -> ParsedRow:
+        raw = [fields.get(tag, "") for tag in self.reject_header]
+        try:
+            record = statement_record(
+                statement_amount(fields.get("TRNAMT", ""), self.decimal_separator),
+                ofx_date(fields.get("DTPOSTED", "")),
+                account,
+                _describe(fields.get("NAME"), fields.get("MEMO")),
+                transfer=fields.get("TRNTYPE", "").upper() == "XFER",
+                external_id=fields.get("FITID"),
+            )
+        except ValueError as e:
+            return number, raw, None, str(e)
+        return number, raw, record, None
+
+    def parse(self, text: io.TextIOBase) -> Iterator[ParsedRow]:
+        account = self.account or "Checking"
+        current: Optional[Dict[str, str]] = None
+        number = 0
+        for closing, tag, value in ofx_tokens(text):
+            if tag == "STMTTRN":
+                if current is not None:
+                    number += 1
+                    yield self._row(number, current, account)
+                current = None if closing else {}
+            elif current is not None:
+                if not closing and value:
+                    current.setdefault(tag, value)
+            elif closing or self.account:
+                continue
+            elif tag == "CCACCTFROM":
+                account = OFX_ACCOUNT_TYPES["CREDITCARD"]
+            elif tag == "ACCTTYPE":
+                account = OFX_ACCOUNT_TYPES.get(value.upper(), account)
+        if current is not None:
+            number += 1
+            yield self._row(number, current, account)
+
+
+@register_importer(".qif")
+class QifImporter(StatementImporter):
+    """
+    QIF exports (Bank, Cash and CCard sections). Dates are month-first unless
+    `day_first` is set. A category in brackets ("[Savings]") marks a transfer;
+    any other category is kept as written. Category, class and investment
+    sections are skipped.
+    """
+    reject_header = ["D", "T", "P", "M", "L", "N"]
+
+    def __init__(self, batch_size: int = IMPORT_BATCH_SIZE, account: Optional[str] = None,
+                 day_first: bool = False, decimal_separator: Optional[str] = None):
+        super().__init__(batch_size, account, decimal_separator)
+        self.day_first = day_first
+
+    def _row(self, line: int, fields: Dict[str, str], account: str) -> ParsedRow:
+        raw = [fields.get(code, "") for code in self.reject_header]
+        category = fields.get("L", "").strip()
+        transfer = category.startswith("[") and category.endswith("]")
+        try:
+            record = statement_record(
+                statement_amount(fields.get("T") or fields.get("U") or "", self.decimal_separator),
+                qif_date(fields.get("D", ""), self.day_first),
+                account,
+                _describe(fields.get("P"), fields.get("M")),
+                transfer=transfer,
+                category=None if transfer else category or None,
+            )
+        except ValueError as e:
+            return line, raw, None, str(e)
+        return line, raw, record, None
+
+    def parse(self, text: io.TextIOBase) -> Iterator[ParsedRow]:
+        account = self.account or "Checking"
+        in_account_block = False
+        skipping = False
+        fields: Dict[str, str] = {}
+        start = 0
+        for number, line in enumerate(text, 1):
+            line = line.rstrip("\r\n")
+            if not line:
+                continue
+            if line.startswith("!"):
+                header = line[1:].strip().lower()
+                if header == "account":
+                    in_account_block = True
+                elif header.startswith("type:"):
+                    in_account_block = False
+                    section = header[5:].strip()
+                    skipping = section in QIF_SKIPPED_TYPES
+                    if not self.account:
+                        account = QIF_ACCOUNT_TYPES.get(section, account)
+                fields = {}
+                continue
+
+            code, value = line[0], line[1:].strip()
+            if code == "^":
+                if in_account_block:
+                    if not self.account and fields.get("T", "").lower() in QIF_ACCOUNT_TYPES:
+                        account = QIF_ACCOUNT_TYPES[fields["T"].lower()]
+                elif fields and not skipping:
+                    yield self._row(start, fields, account)
+                fields = {}
+                continue
+            if not fields:
+                start = number
+            # Split lines (S, E, $) repeat per split; the first value of each code wins.
+            fields.setdefault(code, value)
+        if fields and not in_account_block and not skipping:
+            yield self._row(start, fields, account)
@@ -2,6 +2,7 @@ import sys
 import sv_ttk
 import pywinstyles
 from services.theme import ThemeService 
+from tools.settings_store import settings_store
 
 
 THEME_PREFERENCE_KEY = "app_theme"
@@ -35,13 +36,16 @@ class ThemeManager:
 
 
     def save_theme_preference(self, theme: str):
-        """Save the user's theme preference to the database."""
-        self.theme_service.update(THEME_PREFERENCE_KEY, theme) 
+        """Save the user's theme preference to the app settings."""
         self.theme = theme
+        settings_store.set("theme", theme)
 
 
     def _load_theme_preference(self) -> str:
-        """Load the user's theme preference from the database."""
+        """Load the user's theme preference from the app settings; older versions kept it in the database."""
+        if "theme" in settings_store:
+            return settings_store.get("theme")
+
         preference = self.theme_service.get_by_item(THEME_PREFERENCE_KEY)
         
         if preference and preference.get('data'):
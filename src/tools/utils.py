@@ -1,7 +1,8 @@
 import os
 import sys
+import functools
 import tkinter as tk
-from typing import List
+from typing import List, Tuple
 from PIL import Image, ImageTk
 from dotenv import load_dotenv
 
@@ -9,6 +10,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+@functools.lru_cache(maxsize=None)
+def _default_categories() -> Tuple[str, ...]:
+    categories = os.getenv("DEFAULT_CATEGORIES", "").split(",")
+    return tuple(category.strip() for category in categories if category.strip())
+
+
 class Utils:
     @staticmethod
     def resource_path(relative_path: str) -> str:
@@ -47,31 +54,11 @@ class Utils:
 
     @staticmethod
     def get_default_categories() -> List[str]:
-        """Fetches all default categories."""
-        categories = os.getenv("DEFAULT_CATEGORIES", "").split(",")
-        return [category.strip() for category in categories if category.strip()]
+        """Fetches all default categories (parsed from the environment once)."""
+        return list(_default_categories())
 
     @staticmethod
     def load_app_settings() -> dict:
-        """Load application settings from a JSON file."""
-        import json
-        default_settings = {
-            "currency": "$",
-            "date_format": "YYYY-MM-DD",
-            "theme": "dark",
-            "default_account": "Checking",
-            "show_decimals": True,
-            "auto_backup": False
-        }
-
-        settings_path = Utils.resource_path("data/app_settings.json")
-        if not os.path.exists(settings_path):
-            return default_settings
-        
-        try:
-            with open(settings_path, 'r') as f:
-                settings = json.load(f)
-            return settings
-        except Exception as e:
-            print(f"Error loading app settings: {e}")
-            return default_settings
+        """The application settings (defaults merged with `data/app_settings.json`), from the in-memory store."""
+        from tools.settings_store import settings_store
+        return settings_store.all()